@@ -95,6 +95,67 @@ CREATE TABLE `performance` (
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `perf_rollup_game_period`
+--
+
+CREATE TABLE `perf_rollup_game_period` (
+  `game_id` int(11) NOT NULL,
+  `period` date NOT NULL,
+  `games` int(11) NOT NULL DEFAULT '0',
+  `kills` bigint(20) NOT NULL DEFAULT '0',
+  `deaths` bigint(20) NOT NULL DEFAULT '0',
+  `wins` int(11) NOT NULL DEFAULT '0',
+  `minutes` bigint(20) NOT NULL DEFAULT '0',
+  `margin` bigint(20) NOT NULL DEFAULT '0'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `perf_rollup_user_game`
+--
+
+CREATE TABLE `perf_rollup_user_game` (
+  `user_id` bigint(20) NOT NULL,
+  `game_id` int(11) NOT NULL,
+  `games` int(11) NOT NULL DEFAULT '0',
+  `kills` bigint(20) NOT NULL DEFAULT '0',
+  `deaths` bigint(20) NOT NULL DEFAULT '0',
+  `wins` int(11) NOT NULL DEFAULT '0',
+  `minutes` bigint(20) NOT NULL DEFAULT '0',
+  `margin` bigint(20) NOT NULL DEFAULT '0'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `rating`
+--
+
+CREATE TABLE `rating` (
+  `user_id` bigint(20) NOT NULL,
+  `game_id` int(11) NOT NULL,
+  `rating` double NOT NULL,
+  `games` int(11) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `rating_history`
+--
+
+CREATE TABLE `rating_history` (
+  `user_id` bigint(20) NOT NULL,
+  `game_id` int(11) NOT NULL,
+  `event_id` bigint(20) NOT NULL,
+  `rating_before` double NOT NULL,
+  `rating_after` double NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `registration`
 --
@@ -102,11 +163,47 @@ CREATE TABLE `performance` (
 CREATE TABLE `registration` (
   `user_id` bigint(20) NOT NULL,
   `event_id` bigint(20) NOT NULL,
-  `date` datetime NOT NULL DEFAULT current_timestamp()
+  `date` datetime NOT NULL DEFAULT current_timestamp(),
+  `team` int(11) DEFAULT NULL,
+  `slot` int(11) DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `reminder`
+--
+
+CREATE TABLE `reminder` (
+  `event_id` bigint(20) NOT NULL,
+  `offset_minutes` int(11) NOT NULL,
+  `sent_at` datetime DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `schema_migrations`
+--
+
+CREATE TABLE `schema_migrations` (
+  `version` int(11) NOT NULL,
+  `name` varchar(100) NOT NULL,
+  `applied_at` datetime NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+--
+-- Dumping data for table `schema_migrations`
+--
+
+INSERT INTO `schema_migrations` (`version`, `name`) VALUES
+(2, 'registration_team_slots'),
+(3, 'reminders'),
+(4, 'stats_rollups'),
+(5, 'ratings');
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `user`
 --
@@ -152,12 +249,49 @@ ALTER TABLE `membership`
 ALTER TABLE `performance`
   ADD PRIMARY KEY (`user_id`,`event_id`);
 
+--
+-- Indexes for table `perf_rollup_game_period`
+--
+ALTER TABLE `perf_rollup_game_period`
+  ADD PRIMARY KEY (`game_id`,`period`);
+
+--
+-- Indexes for table `perf_rollup_user_game`
+--
+ALTER TABLE `perf_rollup_user_game`
+  ADD PRIMARY KEY (`user_id`,`game_id`);
+
+--
+-- Indexes for table `rating`
+--
+ALTER TABLE `rating`
+  ADD PRIMARY KEY (`user_id`,`game_id`);
+
+--
+-- Indexes for table `rating_history`
+--
+ALTER TABLE `rating_history`
+  ADD PRIMARY KEY (`user_id`,`event_id`),
+  ADD KEY `game_event` (`game_id`,`event_id`);
+
 --
 -- Indexes for table `registration`
 --
 ALTER TABLE `registration`
   ADD PRIMARY KEY (`user_id`,`event_id`);
 
+--
+-- Indexes for table `reminder`
+--
+ALTER TABLE `reminder`
+  ADD PRIMARY KEY (`event_id`,`offset_minutes`);
+
+--
+-- Indexes for table `schema_migrations`
+--
+ALTER TABLE `schema_migrations`
+  ADD PRIMARY KEY (`version`);
+
 --
 -- Indexes for table `user`
 --
@@ -79,10 +79,25 @@ CREATE TABLE IF NOT EXISTS `LFJ`.`registration` (
   `user_id` BIGINT(20) NOT NULL,
   `event_id` BIGINT(20) NOT NULL,
   `date` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `team` INT NULL,
+  `slot` INT NULL,
   PRIMARY KEY (`user_id`, `event_id`))
 ENGINE = InnoDB;
 
 
+-- -----------------------------------------------------
+-- Table `LFJ`.`reminder`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `LFJ`.`reminder` ;
+
+CREATE TABLE IF NOT EXISTS `LFJ`.`reminder` (
+  `event_id` BIGINT(20) NOT NULL,
+  `offset_minutes` INT NOT NULL,
+  `sent_at` DATETIME NULL,
+  PRIMARY KEY (`event_id`, `offset_minutes`))
+ENGINE = InnoDB;
+
+
 -- -----------------------------------------------------
 -- Table `LFJ`.`performance`
 -- -----------------------------------------------------
@@ -101,6 +116,85 @@ CREATE TABLE IF NOT EXISTS `LFJ`.`performance` (
 ENGINE = InnoDB;
 
 
+-- -----------------------------------------------------
+-- Table `LFJ`.`perf_rollup_user_game`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `LFJ`.`perf_rollup_user_game` ;
+
+CREATE TABLE IF NOT EXISTS `LFJ`.`perf_rollup_user_game` (
+  `user_id` BIGINT(20) NOT NULL,
+  `game_id` INT NOT NULL,
+  `games` INT NOT NULL DEFAULT 0,
+  `kills` BIGINT(20) NOT NULL DEFAULT 0,
+  `deaths` BIGINT(20) NOT NULL DEFAULT 0,
+  `wins` INT NOT NULL DEFAULT 0,
+  `minutes` BIGINT(20) NOT NULL DEFAULT 0,
+  `margin` BIGINT(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`, `game_id`))
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `LFJ`.`perf_rollup_game_period`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `LFJ`.`perf_rollup_game_period` ;
+
+CREATE TABLE IF NOT EXISTS `LFJ`.`perf_rollup_game_period` (
+  `game_id` INT NOT NULL,
+  `period` DATE NOT NULL,
+  `games` INT NOT NULL DEFAULT 0,
+  `kills` BIGINT(20) NOT NULL DEFAULT 0,
+  `deaths` BIGINT(20) NOT NULL DEFAULT 0,
+  `wins` INT NOT NULL DEFAULT 0,
+  `minutes` BIGINT(20) NOT NULL DEFAULT 0,
+  `margin` BIGINT(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`game_id`, `period`))
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `LFJ`.`rating`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `LFJ`.`rating` ;
+
+CREATE TABLE IF NOT EXISTS `LFJ`.`rating` (
+  `user_id` BIGINT(20) NOT NULL,
+  `game_id` INT NOT NULL,
+  `rating` DOUBLE NOT NULL,
+  `games` INT NOT NULL,
+  PRIMARY KEY (`user_id`, `game_id`))
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `LFJ`.`rating_history`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `LFJ`.`rating_history` ;
+
+CREATE TABLE IF NOT EXISTS `LFJ`.`rating_history` (
+  `user_id` BIGINT(20) NOT NULL,
+  `game_id` INT NOT NULL,
+  `event_id` BIGINT(20) NOT NULL,
+  `rating_before` DOUBLE NOT NULL,
+  `rating_after` DOUBLE NOT NULL,
+  PRIMARY KEY (`user_id`, `event_id`),
+  INDEX `game_event` (`game_id`, `event_id`))
+ENGINE = InnoDB;
+
+
+-- -----------------------------------------------------
+-- Table `LFJ`.`schema_migrations`
+-- -----------------------------------------------------
+DROP TABLE IF EXISTS `LFJ`.`schema_migrations` ;
+
+CREATE TABLE IF NOT EXISTS `LFJ`.`schema_migrations` (
+  `version` INT NOT NULL,
+  `name` VARCHAR(100) NOT NULL,
+  `applied_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`version`))
+ENGINE = InnoDB;
+
+
 SET SQL_MODE=@OLD_SQL_MODE;
 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;
 SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;
@@ -137,3 +231,15 @@ INSERT INTO `LFJ`.`membership` (`user_id`, `game_id`, `skill_level`) VALUES (849
 
 COMMIT;
 
+
+-- -----------------------------------------------------
+-- Data for table `LFJ`.`schema_migrations` (the migrations whose tables and columns are created above)
+-- -----------------------------------------------------
+START TRANSACTION;
+USE `LFJ`;
+INSERT INTO `LFJ`.`schema_migrations` (`version`, `name`) VALUES (2, 'registration_team_slots');
+INSERT INTO `LFJ`.`schema_migrations` (`version`, `name`) VALUES (3, 'reminders');
+INSERT INTO `LFJ`.`schema_migrations` (`version`, `name`) VALUES (4, 'stats_rollups');
+INSERT INTO `LFJ`.`schema_migrations` (`version`, `name`) VALUES (5, 'ratings');
+
+COMMIT;
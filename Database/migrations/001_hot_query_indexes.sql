@@ -0,0 +1,12 @@
+-- Secondary indexes for the lookups the bot runs on nearly every command.
+-- Game names and event titles are already kept unique by the bot (add_game and create_event refuse duplicates).
+
+ALTER TABLE `game` ADD UNIQUE INDEX `name_UNIQUE` (`name`);
+
+ALTER TABLE `event` ADD UNIQUE INDEX `title_UNIQUE` (`title`);
+
+ALTER TABLE `event` ADD INDEX `date_idx` (`date`);
+
+ALTER TABLE `user` ADD INDEX `display_name_idx` (`display_name`);
+
+ALTER TABLE `registration` ADD INDEX `event_id_idx` (`event_id`);
@@ -0,0 +1,4 @@
+-- Team and slot of each registration, so event messages are rendered from the database instead of parsed.
+-- Registrations made before this migration get their slots when the bot first loads their event.
+
+ALTER TABLE `registration` ADD COLUMN `team` INT NULL, ADD COLUMN `slot` INT NULL;
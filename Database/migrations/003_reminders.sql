@@ -0,0 +1,8 @@
+-- Reminders sent (or due) per event and offset, so reminders survive restarts and are never sent twice.
+
+CREATE TABLE IF NOT EXISTS `reminder` (
+  `event_id` BIGINT(20) NOT NULL,
+  `offset_minutes` INT NOT NULL,
+  `sent_at` DATETIME NULL,
+  PRIMARY KEY (`event_id`, `offset_minutes`))
+ENGINE = InnoDB;
@@ -0,0 +1,42 @@
+-- Per-player and per-month totals that game_stats, player_stats and leaderboard read instead of the performance
+-- table, filled from the performance recorded so far (the same sums as the rebuild_rollups command).
+
+CREATE TABLE IF NOT EXISTS `perf_rollup_user_game` (
+  `user_id` BIGINT(20) NOT NULL,
+  `game_id` INT NOT NULL,
+  `games` INT NOT NULL DEFAULT 0,
+  `kills` BIGINT(20) NOT NULL DEFAULT 0,
+  `deaths` BIGINT(20) NOT NULL DEFAULT 0,
+  `wins` INT NOT NULL DEFAULT 0,
+  `minutes` BIGINT(20) NOT NULL DEFAULT 0,
+  `margin` BIGINT(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`, `game_id`))
+ENGINE = InnoDB;
+
+CREATE TABLE IF NOT EXISTS `perf_rollup_game_period` (
+  `game_id` INT NOT NULL,
+  `period` DATE NOT NULL,
+  `games` INT NOT NULL DEFAULT 0,
+  `kills` BIGINT(20) NOT NULL DEFAULT 0,
+  `deaths` BIGINT(20) NOT NULL DEFAULT 0,
+  `wins` INT NOT NULL DEFAULT 0,
+  `minutes` BIGINT(20) NOT NULL DEFAULT 0,
+  `margin` BIGINT(20) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`game_id`, `period`))
+ENGINE = InnoDB;
+
+INSERT INTO `perf_rollup_user_game` (`user_id`, `game_id`, `games`, `kills`, `deaths`, `wins`, `minutes`, `margin`)
+SELECT performance.user_id, event.game_id, count(*), sum(performance.kills), sum(performance.deaths),
+       sum(performance.win), sum(performance.length),
+       sum(case when performance.win = 1 then performance.win_score - performance.lose_score
+           else performance.lose_score - performance.win_score end)
+FROM performance INNER JOIN event ON performance.event_id = event.event_id
+GROUP BY 1, 2;
+
+INSERT INTO `perf_rollup_game_period` (`game_id`, `period`, `games`, `kills`, `deaths`, `wins`, `minutes`, `margin`)
+SELECT event.game_id, DATE_SUB(event.date, INTERVAL DAYOFMONTH(event.date) - 1 DAY), count(*),
+       sum(performance.kills), sum(performance.deaths), sum(performance.win), sum(performance.length),
+       sum(case when performance.win = 1 then performance.win_score - performance.lose_score
+           else performance.lose_score - performance.win_score end)
+FROM performance INNER JOIN event ON performance.event_id = event.event_id
+GROUP BY 1, 2;
@@ -0,0 +1,20 @@
+-- Per-game player ratings and their history.  Ratings are computed by the bot, not in SQL: after this migration,
+-- an admin runs the recompute_ratings command once to rate the performance recorded so far.
+
+CREATE TABLE IF NOT EXISTS `rating` (
+  `user_id` BIGINT(20) NOT NULL,
+  `game_id` INT NOT NULL,
+  `rating` DOUBLE NOT NULL,
+  `games` INT NOT NULL,
+  PRIMARY KEY (`user_id`, `game_id`))
+ENGINE = InnoDB;
+
+CREATE TABLE IF NOT EXISTS `rating_history` (
+  `user_id` BIGINT(20) NOT NULL,
+  `game_id` INT NOT NULL,
+  `event_id` BIGINT(20) NOT NULL,
+  `rating_before` DOUBLE NOT NULL,
+  `rating_after` DOUBLE NOT NULL,
+  PRIMARY KEY (`user_id`, `event_id`),
+  INDEX `game_event` (`game_id`, `event_id`))
+ENGINE = InnoDB;
@@ -0,0 +1,95 @@
+"""
+Measures rows per second of writing a performance sheet, row by row as perf_update used to and as batched upserts.
+
+Run from the repository root:  python -m backend.benchmarks.bench_perf_update [ROWS]
+"""
+import sys
+
+from backend.benchmarks.common import connect, CountingCursor, CountingConnection, Timer
+from backend.lib.performance_queries import sql_perf_upsert, PERF_CHUNK_SIZE
+
+EVENT_ID = 999000002
+FIRST_USER_ID = 990000000
+
+
+def legacy_perf_update(data_insert, cursor, cnx):
+    """
+    The per-row write perf_update used before sheets were written in bulk, kept for comparison
+    """
+    cursor.execute('select count(*) from performance '
+                   'where event_id = %(event_id)s and user_id = %(user_id)s', data_insert)
+    qty = cursor.fetchall()
+    u = False
+    if qty[0][0] == 0:
+        cursor.execute('insert into performance '
+                       '(event_id, user_id, kills, deaths, win, length, win_score, lose_score) '
+                       'values (%(event_id)s, %(user_id)s, %(kills)s, %(deaths)s, %(win)s, %(length)s, '
+                       '%(win_score)s, %(lose_score)s)', data_insert)
+    else:
+        cursor.execute('update performance '
+                       'set kills = %(kills)s, deaths=%(deaths)s, win=%(win)s, length=%(length)s, '
+                       'win_score = %(win_score)s, lose_score=%(lose_score)s '
+                       'where event_id = %(event_id)s and user_id = %(user_id)s', data_insert)
+        u = True
+    cnx.commit()
+    return u
+
+
+def legacy(records, cursor, cnx):
+    inserts, updates = 0, 0
+    for record in records:
+        if legacy_perf_update(record, cursor, cnx):
+            updates += 1
+        else:
+            inserts += 1
+    return inserts, updates
+
+
+def bulk(records, cursor, cnx):
+    inserts, updates = 0, 0
+    for start in range(0, len(records), PERF_CHUNK_SIZE):
+        i, u = sql_perf_upsert(records[start:start + PERF_CHUNK_SIZE], cursor)
+        inserts, updates = inserts + i, updates + u
+    cnx.commit()
+    return inserts, updates
+
+
+def sheet(count, kills):
+    return [{'user_id': FIRST_USER_ID + i, 'event_id': EVENT_ID, 'kills': kills, 'deaths': 3, 'win': i % 2,
+             'length': 35, 'win_score': 16, 'lose_score': 12} for i in range(count)]
+
+
+def run(write, records, cursor, cnx):
+    """
+    Write a sheet
+    :return: (inserts, updates, round trips, rows per second)
+    """
+    counting_cursor = CountingCursor(cursor)
+    counting_cnx = CountingConnection(cnx)
+    with Timer() as timer:
+        inserts, updates = write(records, counting_cursor, counting_cnx)
+    return inserts, updates, counting_cursor.statements + counting_cnx.commits, len(records) / timer.elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    cnx = connect()
+    cursor = cnx.cursor()
+    try:
+        print('path\tsheet\tinserted\tupdated\tround trips\trows/s')
+        for name, write in (('legacy', legacy), ('bulk', bulk)):
+            cursor.execute('delete from performance where event_id = %s', (EVENT_ID,))
+            cnx.commit()
+            for label, records in (('new', sheet(count, 5)), ('re-upload', sheet(count, 7))):
+                inserts, updates, round_trips, rate = run(write, records, cursor, cnx)
+                print('%s\t%s\t%d\t%d\t%d\t%.0f' % (name, label, inserts, updates, round_trips, rate))
+    finally:
+        cursor.execute('delete from performance where event_id = %s', (EVENT_ID,))
+        cnx.commit()
+        cursor.close()
+        cnx.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures what timing a statement costs: executing through the InstrumentedCursor against executing on the cursor
+directly, with a cursor that does no work so only the instrumentation is timed.  Fails if the cost per statement is
+over the budget.  A statement round trip to MySQL takes a few hundred microseconds at best.
+
+Run from the repository root:  python -m backend.benchmarks.bench_query_stats [STATEMENTS ...]
+"""
+import sys
+
+from backend.benchmarks.common import Timer
+from backend.lib.query_stats import QueryStats, InstrumentedCursor
+
+BUDGET_US = 10.0        # most instrumentation time allowed per statement, in microseconds
+STATEMENTS = [
+    'select user_id from user where display_name = %s',
+    'select admin from user where user_id = %s',
+    'select * from registration where event_id = %s',
+    'select event_id, game_id, date from event where event_id in (%s, %s, %s)',
+    'insert into rating (user_id, game_id, rating, games) values (%s, %s, %s, %s), (%s, %s, %s, %s)',
+]
+
+
+class NullCursor:
+    """
+    Cursor that returns at once
+    """
+    def execute(self, operation, params=None, multi=False):
+        return None
+
+
+def run(cursor, count):
+    for i in range(count):
+        cursor.execute(STATEMENTS[i % len(STATEMENTS)], (i,))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+
+    print('statements\traw ms\tinstrumented ms\toverhead us/statement')
+    for count in sizes:
+        with Timer() as raw:
+            run(NullCursor(), count)
+        with Timer() as timed:
+            run(InstrumentedCursor(NullCursor(), QueryStats()), count)
+        overhead = (timed.elapsed - raw.elapsed) * 1e6 / count
+        print('%d\t%.1f\t%.1f\t%.2f' % (count, raw.elapsed * 1000, timed.elapsed * 1000, overhead))
+        assert overhead <= BUDGET_US, 'instrumentation costs %.2f us per statement, budget is %.1f' % \
+                                      (overhead, BUDGET_US)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures a full rating recompute: the vectorized replay, rating every event of a round at once, against rating the
+events one at a time in a Python loop, for growing numbers of past results.
+
+Run from the repository root:  python -m backend.benchmarks.bench_ratings [EVENTS ...]
+"""
+import sys
+
+import numpy as np
+
+from backend.benchmarks.common import Timer
+from backend.lib.ratings import replay_ratings, RATING_START, RATING_K, RATING_SCALE
+
+PLAYERS = 5000
+LOBBY = 10
+
+
+def legacy_replay(events, players, wins, ratings):
+    """
+    Rate events one at a time the straightforward way
+    """
+    start = 0
+    while start < len(events):
+        end = start
+        while end < len(events) and events[end] == events[start]:
+            end += 1
+        winners = [players[row] for row in range(start, end) if wins[row] == 1]
+        losers = [players[row] for row in range(start, end) if wins[row] == 0]
+        if len(winners) > 0 and len(losers) > 0:
+            winning = sum(ratings[player] for player in winners) / len(winners)
+            losing = sum(ratings[player] for player in losers) / len(losers)
+            gain = RATING_K * (1 - 1 / (1 + 10 ** ((losing - winning) / RATING_SCALE)))
+            for player in winners:
+                ratings[player] += gain
+            for player in losers:
+                ratings[player] -= gain
+        start = end
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    rng = np.random.RandomState(0)
+
+    print('results\tlegacy ms\treplay ms\tspeedup')
+    for count in sizes:
+        events = np.repeat(np.arange(count), LOBBY)
+        players = np.concatenate([rng.choice(PLAYERS, LOBBY, replace=False) for _ in range(count)])
+        wins = np.tile(np.arange(LOBBY) < LOBBY // 2, count).astype(np.int64)
+
+        legacy = np.full(PLAYERS, RATING_START)
+        with Timer() as slow:
+            legacy_replay(events.tolist(), players.tolist(), wins.tolist(), legacy)
+        ratings = np.full(PLAYERS, RATING_START)
+        with Timer() as fast:
+            replay_ratings(events, players, wins, ratings)
+        assert np.allclose(legacy, ratings)
+        print('%d\t%.1f\t%.1f\t%.1fx' % (len(events), slow.elapsed * 1000, fast.elapsed * 1000,
+                                         slow.elapsed / fast.elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Counts database round trips and measures latency of registering users for an event.
+
+Run from the repository root:  python -m backend.benchmarks.bench_registration [REGISTRATIONS]
+"""
+import sys
+import datetime
+
+from backend.benchmarks.common import connect, CountingCursor, CountingConnection, Timer
+from backend.lib.event_queries import sql_create_registration, sql_get_team_size
+from backend.lib.helper_commands import check_event_exists, check_user_exists, get_id_from_name
+from backend.lib.user_queries import sql_add_user
+
+EVENT_ID = 999000001
+FIRST_USER_ID = 990000000
+
+
+def legacy_registration(event_id, user_id, display_name, cursor, cnx):
+    """
+    The reaction registration path as it was before it was folded into one transaction, kept for comparison
+    """
+    if check_event_exists(event_id, cursor) == -1:
+        return
+    if check_event_exists(event_id, cursor) == -1:
+        return
+    if check_user_exists(user_id, cursor) == -1:
+        sql_add_user(None, user_id, display_name, 'false', cursor, cnx)
+
+    user_id = get_id_from_name(display_name, cursor)
+    cursor.execute('select user_id from registration where user_id = %s and event_id = %s', (user_id, event_id))
+    cursor.fetchall()
+    cursor.execute('insert into registration (user_id, event_id) values (%s, %s)', (user_id, event_id))
+    cnx.commit()
+    cursor.execute('select count(*) from registration where event_id = %s', (event_id,))
+    cursor.fetchall()
+    sql_get_team_size(event_id, cursor)
+
+
+def single_transaction_registration(event_id, user_id, display_name, cursor, cnx):
+    sql_create_registration(event_id, user_id, display_name, (user_id - FIRST_USER_ID) % 2,
+                            (user_id - FIRST_USER_ID) // 2, cursor, cnx)
+
+
+def run(register, count, cursor, cnx):
+    """
+    Register count new users for the benchmark event
+    :return: (round trips per registration, milliseconds per registration)
+    """
+    counting_cursor = CountingCursor(cursor)
+    counting_cnx = CountingConnection(cnx)
+    with Timer() as timer:
+        for i in range(count):
+            user_id = FIRST_USER_ID + i
+            register(EVENT_ID, user_id, 'bench#%d' % user_id, counting_cursor, counting_cnx)
+
+    round_trips = counting_cursor.statements + counting_cnx.commits
+    return round_trips / count, timer.elapsed * 1000 / count
+
+
+def reset(cursor, cnx, count):
+    cursor.execute('delete from registration where event_id = %s', (EVENT_ID,))
+    cursor.execute('delete from user where user_id >= %s and user_id < %s', (FIRST_USER_ID, FIRST_USER_ID + count))
+    cnx.commit()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    cnx = connect()
+    cursor = cnx.cursor()
+    cursor.execute('insert into event (event_id, date, game_id, title, team_size) values (%s, %s, 1, %s, %s)',
+                   (EVENT_ID, datetime.date.today(), 'registration benchmark', count))
+    cnx.commit()
+
+    try:
+        print('path\tround trips/registration\tms/registration')
+        for name, register in (('legacy', legacy_registration), ('single transaction', single_transaction_registration)):
+            reset(cursor, cnx, count)
+            round_trips, latency = run(register, count, cursor, cnx)
+            print('%s\t%.1f\t%.2f' % (name, round_trips, latency))
+    finally:
+        reset(cursor, cnx, count)
+        cursor.execute('delete from event where event_id = %s', (EVENT_ID,))
+        cnx.commit()
+        cursor.close()
+        cnx.close()
+
+
+if __name__ == '__main__':
+    main()
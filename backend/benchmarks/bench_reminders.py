@@ -0,0 +1,89 @@
+"""
+Measures reminder fan-out time against the number of registrations, sending to fake channels that enforce Discord's
+per-channel rate limit (5 messages per window) the way discord.py does: a request over the limit costs a rejected
+round trip and then waits out the window.  Windows are scaled down from 5 seconds to keep runs short.
+
+Run from the repository root:  python -m backend.benchmarks.bench_reminders [REGISTRATIONS ...]
+"""
+import sys
+import asyncio
+import time
+
+from backend.benchmarks.common import Timer
+from backend.lib.channel_sender import ChannelSender, pack_mentions
+
+LATENCY = 0.02      # seconds per API round trip
+WINDOW = 0.25       # seconds per rate limit window (5 seconds on Discord)
+RATE = 5        # messages per window
+EVENTS = 4
+FIRST_USER_ID = 480122056114044939
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []      # monotonic times of accepted messages
+        self.messages = 0
+        self.rejected = 0
+
+    async def send(self, content):
+        while True:
+            await asyncio.sleep(LATENCY)
+            now = time.monotonic()
+            recent = [sent_at for sent_at in self.sent if sent_at > now - WINDOW]
+            if len(recent) < RATE:
+                self.sent = recent + [now]
+                self.messages += 1
+                return
+            self.rejected += 1      # 429: wait for the window to pass and try again
+            await asyncio.sleep(recent[0] + WINDOW - now)
+
+
+def registrations(count):
+    """
+    Spread count registrations over the benchmark events
+    :return: list of (user_id, game name, event title, formatted date) rows
+    """
+    return [(FIRST_USER_ID + i, 'Valorant', 'event %d' % (i % EVENTS), 'May 01 2020') for i in range(count)]
+
+
+async def legacy(rows, channel):
+    for user_id, game_name, title, date_text in rows:
+        await channel.send("Reminding <@%d> you are registered to play %s in '%s' on %s " %
+                           (user_id, game_name, title, date_text))
+
+
+async def batched(rows, channel):
+    events = {}
+    for user_id, game_name, title, date_text in rows:
+        events.setdefault((game_name, title, date_text), []).append(user_id)
+
+    sender = ChannelSender(channel_rate=RATE, channel_per=WINDOW)
+    batches = [pack_mentions("Reminder: you are registered to play %s in '%s' on %s" % event, user_ids)
+               for event, user_ids in events.items()]
+    await asyncio.gather(*(sender.send_many(channel, batch) for batch in batches))
+
+
+def run(fan_out, count):
+    """
+    Send reminders for count registrations
+    :return: (messages, rejected requests, seconds)
+    """
+    channel = FakeChannel(1)
+    with Timer() as timer:
+        asyncio.run(fan_out(registrations(count), channel))
+    return channel.messages, channel.rejected, timer.elapsed
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 50, 200]
+
+    print('registrations\tpath\tmessages\t429s\tseconds')
+    for count in counts:
+        for name, fan_out in (('legacy', legacy), ('batched', batched)):
+            messages, rejected, elapsed = run(fan_out, count)
+            print('%d\t%s\t%d\t%d\t%.2f' % (count, name, messages, rejected, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures team operations of the slot-indexed Roster against the padded list scans it replaced, for growing lobbies.
+
+Run from the repository root:  python -m backend.benchmarks.bench_roster [TEAM_SIZE ...]
+"""
+import sys
+import random
+
+from backend.benchmarks.common import Timer
+from backend.lib.roster import Roster
+
+EMPTY = '-----'
+
+
+class LegacyTeams:
+    """
+    Two teams as padded lists of display names, operated on by list scans the way event messages used to be edited
+    """
+    def __init__(self, team_size):
+        self.team_size = team_size
+        self.teams = [[EMPTY] * team_size for _ in range(2)]
+
+    def count(self, team):
+        return len([player for player in self.teams[team] if player != EMPTY])
+
+    def __contains__(self, player):
+        return player in self.teams[0] or player in self.teams[1]
+
+    def add(self, player):
+        team = self.teams[0] if self.count(0) <= self.count(1) else self.teams[1]
+        for position, name in enumerate(team):
+            if name == EMPTY:
+                team[position] = player
+                return
+        return -1
+
+    def remove(self, player):
+        for team in self.teams:
+            for position, name in enumerate(team):
+                if name == player:
+                    team[position] = EMPTY
+                    return
+
+
+def run(teams, players, departures):
+    """
+    Fill a lobby, check every player's membership, remove some players and fill their slots again
+    :return: milliseconds taken
+    """
+    with Timer() as timer:
+        for player in players:
+            teams.add(player)
+        for player in players:
+            assert player in teams
+        for player in departures:
+            teams.remove(player)
+        for player in departures:
+            teams.add(player)
+    return timer.elapsed * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5, 50, 500, 5000]
+
+    print('players\tlegacy ms\troster ms\tspeedup')
+    for team_size in sizes:
+        players = ['player%d' % i for i in range(2 * team_size)]
+        departures = random.sample(players, max(1, len(players) // 4))
+        legacy = run(LegacyTeams(team_size), players, departures)
+        roster = run(Roster(2, team_size), players, departures)
+        print('%d\t%.2f\t%.2f\t%.1fx' % (len(players), legacy, roster, legacy / roster))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Measures balanced team sorting for growing lobbies: time to split, and how far apart the team skill totals end up
+compared with the full and random shuffles sort_teams already had.
+
+Run from the repository root:  python -m backend.benchmarks.bench_team_balance [PLAYERS ...]
+"""
+import sys
+import random
+
+from backend.benchmarks.common import Timer
+from backend.lib.team_balance import balance_teams
+
+MAX_SKILL = 3000
+
+
+def difference(skills, teams):
+    return abs(sum(skills[player] for player in teams[0]) - sum(skills[player] for player in teams[1]))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 16, 50, 200, 500, 2000]
+
+    print('players\tbalanced ms\tbalanced diff\tshuffled diff')
+    for count in sizes:
+        skills = {player: random.randint(0, MAX_SKILL) for player in range(count)}
+        with Timer() as timer:
+            teams = balance_teams(skills)
+
+        shuffled = list(skills)
+        random.shuffle(shuffled)
+        print('%d\t%.2f\t%d\t%d' % (count, timer.elapsed * 1000, difference(skills, teams),
+                                    difference(skills, (shuffled[count // 2:], shuffled[:count // 2]))))
+
+
+if __name__ == '__main__':
+    main()
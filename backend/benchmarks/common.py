@@ -0,0 +1,76 @@
+import configparser
+import time
+
+import mysql.connector
+
+
+def connect():
+    """
+    Connect to the database named in the test configuration file (or configuration.conf for local runs)
+    :return: connection object
+    """
+    config = configparser.ConfigParser()  # read and parse configuration file
+    config.read(r'backend/tests/test_configuration.conf')
+
+    try:        # for CI benchmarking
+        return mysql.connector.connect(user=config['Database']['username'],
+                                       password=config['Database']['password'],
+                                       host=config['Database']['host'],
+                                       database=config['Database']['database'])
+    except mysql.connector.errors.DatabaseError:        # for local benchmarking
+        config.read(r'configuration.conf')
+        return mysql.connector.connect(user=config['Database']['username'],
+                                       password=config['Database']['password'],
+                                       host=config['Database']['host'],
+                                       database=config['Database']['database'])
+
+
+class CountingCursor:
+    def __init__(self, cursor):
+        """
+        Cursor wrapper that counts the statements sent to the server
+        :param cursor: cursor object to wrap
+        """
+        self.cursor = cursor
+        self.statements = 0
+
+    def execute(self, operation, params=None):
+        self.statements += 1
+        return self.cursor.execute(operation, params)
+
+    def executemany(self, operation, seq_params):
+        self.statements += 1
+        return self.cursor.executemany(operation, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class CountingConnection:
+    def __init__(self, cnx):
+        """
+        Connection wrapper that counts commits and rollbacks (each one is a round trip too)
+        :param cnx: connection object to wrap
+        """
+        self.cnx = cnx
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+        return self.cnx.commit()
+
+    def rollback(self):
+        self.commits += 1
+        return self.cnx.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self.cnx, name)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from backend.lib.entity_cache import as_id
+
+ADMIN_TTL = 600.0       # seconds a bulk load of admin flags is trusted before it is read again
+UNKNOWN = object()      # admin flag of a user that has to be read from the database
+
+
+class AdminCache:
+    def __init__(self, ttl=ADMIN_TTL, clock=time.monotonic):
+        """
+        Admin flag of every user, loaded from the user table in one query and kept current by the functions that
+        change admin flags.  The whole table is read again once the load is older than the TTL, in case it was
+        changed some other way.
+        :param ttl: seconds a load is trusted
+        :param clock: function returning the current time in seconds
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self.flags = {}     # user id -> value of the admin column
+        self.expires = None     # time the current load stops being trusted, None before the first load
+        self.lock = threading.Lock()
+        self.generation = 0     # bumped by every write
+
+    def get(self, user_id):
+        """
+        Gets a user's admin flag
+        :param user_id: int id of the user
+        :return: value of the admin column, None if the user does not exist, UNKNOWN if the cache is not loaded
+        """
+        with self.lock:
+            if self.expires is None or self.clock() >= self.expires:
+                return UNKNOWN
+            return self.flags.get(user_id)
+
+    def load(self, rows, generation):
+        """
+        Replaces every flag with the user table's, unless a flag was written while the table was read
+        :param rows: list of (user_id, admin) rows of every user
+        :param generation: value of self.generation before the rows were read
+        :return: void
+        """
+        with self.lock:
+            if generation == self.generation:
+                self.flags = dict(rows)
+                self.expires = self.clock() + self.ttl
+
+    def set(self, user_id, admin):
+        """
+        Writes a user's admin flag through to the cache
+        :param user_id: id of the user
+        :param admin: new value of the admin column, None if the user was deleted
+        :return: void
+        """
+        with self.lock:
+            self.generation += 1
+            if as_id(user_id) is None:      # MySQL matched an id that is not a number somehow: read everything again
+                self.expires = None
+            elif admin is None:
+                self.flags.pop(as_id(user_id), None)
+            else:
+                self.flags[as_id(user_id)] = admin
+
+    def clear(self):
+        """
+        Forgets every flag, for when the user table was changed some other way
+        :return: void
+        """
+        with self.lock:
+            self.generation += 1
+            self.flags = {}
+            self.expires = None
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import deque
+
+
+class RateBucket:
+    def __init__(self, rate, per):
+        """
+        Sliding window rate limit: at most rate sends in any per seconds
+        :param rate: number of sends allowed in a window
+        :param per: length of the window in seconds
+        """
+        self.rate = rate
+        self.per = per
+        self.sent = deque()     # monotonic times of the sends in the current window
+
+    async def wait(self):
+        """
+        Wait until one more send fits in the window, then count it
+        :return: void
+        """
+        while True:
+            now = time.monotonic()
+            while len(self.sent) > 0 and self.sent[0] <= now - self.per:
+                self.sent.popleft()
+            if len(self.sent) < self.rate:
+                self.sent.append(now)
+                return
+            await asyncio.sleep(self.sent[0] + self.per - now)
+
+
+class ChannelSender:
+    def __init__(self, channel_rate=5, channel_per=5.0, global_rate=50, global_per=1.0):
+        """
+        Sends messages without running into Discord's rate limits instead of relying on 429 retries.  Every channel
+        has its own bucket (Discord allows 5 messages per 5 seconds per channel) and all channels share a global
+        bucket, so batches for different channels go out concurrently while each channel's messages stay in order.
+        :param channel_rate: messages allowed per channel in a window
+        :param channel_per: length of a channel's window in seconds
+        :param global_rate: messages allowed over all channels in a window
+        :param global_per: length of the global window in seconds
+        """
+        self.channel_rate = channel_rate
+        self.channel_per = channel_per
+        self.buckets = {}       # channel id -> RateBucket
+        self.locks = {}     # channel id -> lock keeping one batch at a time per channel
+        self.global_bucket = RateBucket(global_rate, global_per)
+
+    async def send_many(self, channel, contents, sent=None):
+        """
+        Send messages to a channel in order
+        :param channel: channel object (anything with an id and an async send)
+        :param contents: list of message texts
+        :param sent: function called with the index of each message once it is sent, or None
+        :return: void
+        """
+        bucket = self.buckets.get(channel.id)
+        if bucket is None:
+            bucket = self.buckets[channel.id] = RateBucket(self.channel_rate, self.channel_per)
+            self.locks[channel.id] = asyncio.Lock()
+
+        async with self.locks[channel.id]:
+            for index, content in enumerate(contents):
+                await bucket.wait()
+                await self.global_bucket.wait()
+                await channel.send(content)
+                if sent is not None:
+                    sent(index)
+
+    async def send_all(self, batches):
+        """
+        Send batches of messages, different channels concurrently
+        :param batches: list of (channel, list of message texts)
+        :return: list with None or the exception raised for each batch
+        """
+        return await asyncio.gather(*(self.send_many(channel, contents) for channel, contents in batches),
+                                    return_exceptions=True)
+
+
+def pack_mentions(header, user_ids, limit=2000):
+    """
+    Packs mentions of users into as few messages as fit Discord's message length limit
+    :param header: text starting the first message
+    :param user_ids: ids of users to mention
+    :param limit: maximum length of a message
+    :return: list of message texts
+    """
+    messages = []
+    current = header
+    for user_id in user_ids:
+        mention = '<@%d>' % user_id
+        if len(current) + 1 + len(mention) > limit:
+            messages.append(current)
+            current = mention
+        else:
+            current = current + ' ' + mention if len(current) > 0 else mention
+    messages.append(current)
+    return messages
+
+
+def pack_lines(lines, limit=2000):
+    """
+    Packs lines of text into as few messages as fit Discord's message length limit
+    :param lines: lines of text, each shorter than limit
+    :return: list of message texts
+    """
+    messages = []
+    current = ''
+    for line in lines:
+        if len(current) > 0 and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = current + '\n' + line if len(current) > 0 else line
+    if len(current) > 0:
+        messages.append(current)
+    return messages
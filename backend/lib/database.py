@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import pooling
+
+from backend.lib.query_stats import QueryStats, InstrumentedCursor, SLOW_QUERY_MS
+from backend.lib.tracing import span
+
+
+class Database:
+    def __init__(self, username, password, host, database, pool_size=5, slow_query_ms=SLOW_QUERY_MS):
+        """
+        Pool of MySQL connections shared by every cog.  All blocking connector calls are run on a worker thread so
+        the bot's event loop never waits on a database round trip.
+        :param username: database username
+        :param password: database password
+        :param host: database host
+        :param database: name of the database to use
+        :param pool_size: number of connections kept open (and number of units of work that may run at once)
+        :param slow_query_ms: statements taking longer than this many milliseconds are logged as slow
+        """
+        self.pool_size = pool_size
+        self.pool = pooling.MySQLConnectionPool(pool_name='lfj',
+                                                pool_size=pool_size,
+                                                user=username,
+                                                password=password,
+                                                host=host,
+                                                database=database)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.available = None       # semaphore guarding the pool, created on first use inside the running loop
+        self.stats = QueryStats(slow_query_ms)      # timings of every statement run through a unit of work
+
+    def unit_of_work(self):
+        """
+        Create a new unit of work.  Use it as an async context manager: a connection is acquired on entry and
+        released back to the pool on exit (rolled back first if an exception escaped the block).
+        :return: UnitOfWork object
+        """
+        return UnitOfWork(self)
+
+    async def acquire(self):
+        """
+        Wait for a free connection slot and take a connection out of the pool
+        :return: pooled connection object
+        """
+        if self.available is None:
+            self.available = asyncio.Semaphore(self.pool_size)
+
+        with span('db', 'pool_wait'):
+            await self.available.acquire()
+        try:
+            return await self.execute(self.pool.get_connection)
+        except Exception:
+            self.available.release()
+            raise
+
+    async def release(self, cnx, cursor, rollback):
+        """
+        Return a connection to the pool
+        :param cnx: pooled connection object
+        :param cursor: cursor opened on cnx, or None
+        :param rollback: True if uncommitted work on the connection should be discarded
+        :return: void
+        """
+        try:
+            await self.execute(close_connection, cnx, cursor, rollback)
+        finally:
+            self.available.release()
+
+    async def execute(self, func, *args):
+        """
+        Run a blocking function on the database worker threads, in a copy of the caller's context so the worker
+        knows which command it is working for.  The call is a span of the command's trace, if it is traced.
+        :param func: function to run
+        :param args: positional arguments for func
+        :return: result of func
+        """
+        loop = asyncio.get_event_loop()
+        context = contextvars.copy_context()
+        with span('db', func.__name__):
+            return await loop.run_in_executor(self.executor, functools.partial(context.run, func, *args))
+
+    def close(self):
+        """
+        Stop the database worker threads
+        :return: void
+        """
+        self.executor.shutdown(wait=False)
+
+
+class UnitOfWork:
+    def __init__(self, database):
+        """
+        One command's worth of database work, carried out on a single pooled connection
+        :param database: Database object to take the connection from
+        """
+        self.database = database
+        self.cnx = None
+        self.cursor = None
+
+    async def __aenter__(self):
+        self.cnx = await self.database.acquire()
+        try:
+            self.cursor = InstrumentedCursor(await self.database.execute(self.cnx.cursor), self.database.stats)
+        except Exception:
+            await self.database.release(self.cnx, None, True)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.database.release(self.cnx, self.cursor, exc_type is not None)
+
+    async def run(self, func, *args):
+        """
+        Run a blocking sql function on this unit of work's connection without blocking the event loop.
+        Pass self.cursor and self.cnx in args wherever func expects them.
+        :param func: function to run
+        :param args: positional arguments for func
+        :return: result of func
+        """
+        return await self.database.execute(func, *args)
+
+
+def close_connection(cnx, cursor, rollback):
+    """
+    Close a cursor, roll back (if requested) and close a pooled connection, which hands it back to its pool
+    :param cnx: pooled connection object
+    :param cursor: cursor opened on cnx, or None
+    :param rollback: True if uncommitted work should be discarded
+    :return: void
+    """
+    try:
+        if cursor is not None:
+            cursor.close()
+        if rollback:
+            cnx.rollback()
+    finally:
+        cnx.close()
@@ -0,0 +1,66 @@
+import asyncio
+
+from discord.errors import NotFound
+
+
+class EditCoalescer:
+    def __init__(self, bot, delay=1.0):
+        """
+        Collects roster changes for each event message over a short window and edits the message once with the final
+        teams.  The number of edits grows with time rather than with the number of reactions.
+        :param bot: bot client
+        :param delay: seconds to wait for more changes before editing an event message
+        """
+        self.bot = bot
+        self.delay = delay
+        self.pending = {}       # event id -> task waiting to edit that event's message
+
+    def request(self, roster):
+        """
+        Ask for an event message to show its roster's current teams.  Requests made while an edit is already waiting
+        are folded into that edit.
+        :param roster: EventRoster object whose teams changed
+        :return: void
+        """
+        if roster.event_id not in self.pending:
+            self.pending[roster.event_id] = asyncio.ensure_future(self.flush_later(roster))
+
+    async def flush_later(self, roster):
+        """
+        Wait out the coalescing window, then edit the event message
+        :param roster: EventRoster object to render
+        :return: void
+        """
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            # changes made while the edit is in flight schedule a new edit
+            if self.pending.get(roster.event_id) is asyncio.current_task():
+                del self.pending[roster.event_id]
+        await self.flush(roster)
+
+    async def flush(self, roster):
+        """
+        Edit an event message right away, unless it already shows the roster's current teams
+        :param roster: EventRoster object to render
+        :return: void
+        """
+        teams = roster.snapshot()
+        if teams == roster.rendered:    # nothing changed since the last edit
+            return
+
+        try:    # edit by id, the message itself is never downloaded
+            await self.bot.http.edit_message(roster.channel_id, roster.event_id, embed=roster.embed().to_dict())
+        except NotFound:    # event message was deleted in the meantime
+            return
+        roster.rendered = teams
+
+    def cancel(self, event_id):
+        """
+        Drop a waiting edit, e.g. because its event was deleted
+        :param event_id: id of the event
+        :return: void
+        """
+        task = self.pending.pop(event_id, None)
+        if task is not None:
+            task.cancel()
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+
+ENTITY_CACHE_SIZE = 4096        # pairs kept per kind of entity
+
+
+class BiMap:
+    def __init__(self, size):
+        """
+        Bounded name <-> id mapping that evicts the least recently used pair
+        :param size: most pairs kept
+        """
+        self.size = size
+        self.ids = OrderedDict()        # name -> id, least recently used first
+        self.names = {}     # id -> name
+
+    def get_id(self, name):
+        """
+        Gets the id paired with a name
+        :param name: name to look up
+        :return: id, None if not cached
+        """
+        entity_id = self.ids.get(name)
+        if entity_id is not None:
+            self.ids.move_to_end(name)
+        return entity_id
+
+    def get_name(self, entity_id):
+        """
+        Gets the name paired with an id
+        :param entity_id: id to look up
+        :return: name, None if not cached
+        """
+        name = self.names.get(entity_id)
+        if name is not None:
+            self.ids.move_to_end(name)
+        return name
+
+    def put(self, name, entity_id):
+        """
+        Pairs a name with an id, dropping older pairs of either
+        :param name: name of the entity
+        :param entity_id: id of the entity
+        :return: void
+        """
+        self.discard(name, entity_id)
+        self.ids[name] = entity_id
+        self.names[entity_id] = name
+        while len(self.ids) > self.size:
+            _, evicted = self.ids.popitem(last=False)
+            del self.names[evicted]
+
+    def discard(self, name=None, entity_id=None):
+        """
+        Drops the pairs of a name and of an id
+        :param name: name to drop, None to only drop by id
+        :param entity_id: id to drop, None to only drop by name
+        :return: void
+        """
+        if name in self.ids:
+            del self.names[self.ids.pop(name)]
+        if entity_id in self.names:
+            del self.ids[self.names.pop(entity_id)]
+
+
+class EntityCache:
+    def __init__(self, size=ENTITY_CACHE_SIZE):
+        """
+        Read-through cache of user, game and event lookups shared by every cog.  Lookups run in the database
+        executor's threads, so every access takes a lock, and a lookup only caches its result if nothing was
+        invalidated while it queried the database.
+        :param size: pairs kept per kind of entity
+        """
+        self.maps = {kind: BiMap(size) for kind in ('user', 'game', 'event')}      # display name, name and title
+        self.lock = threading.Lock()
+        self.generation = 0     # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def get_id(self, kind, name):
+        """
+        Gets a cached id
+        :param kind: 'user', 'game' or 'event'
+        :param name: display name, game name or event title
+        :return: id, None if not cached
+        """
+        with self.lock:
+            return self.count(self.maps[kind].get_id(name))
+
+    def get_name(self, kind, entity_id):
+        """
+        Gets a cached name
+        :param kind: 'user', 'game' or 'event'
+        :param entity_id: id of the entity
+        :return: name, None if not cached
+        """
+        with self.lock:
+            return self.count(self.maps[kind].get_name(entity_id))
+
+    def count(self, value):
+        """
+        Counts a lookup as a hit or a miss
+        :param value: result of the lookup
+        :return: value
+        """
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, kind, name, entity_id, generation):
+        """
+        Caches a pair read from the database, unless an invalidation happened since
+        :param kind: 'user', 'game' or 'event'
+        :param name: display name, game name or event title
+        :param entity_id: id of the entity
+        :param generation: value of self.generation before the pair was read
+        :return: void
+        """
+        with self.lock:
+            if generation == self.generation:
+                self.maps[kind].put(name, entity_id)
+
+    def invalidate(self, kind, name=None, entity_id=None):
+        """
+        Drops the pairs of an entity that was written
+        :param kind: 'user', 'game' or 'event'
+        :param name: name to drop, None to only drop by id
+        :param entity_id: id to drop, None to only drop by name
+        :return: void
+        """
+        with self.lock:
+            self.generation += 1
+            self.maps[kind].discard(name, as_id(entity_id))
+
+    def clear(self):
+        """
+        Drops every pair, for when the tables were changed outside these functions
+        :return: void
+        """
+        with self.lock:
+            self.generation += 1
+            for cached in self.maps.values():
+                cached.ids.clear()
+                cached.names.clear()
+
+
+def as_id(value):
+    """
+    Normalizes an id given as a number or as text (as command arguments are)
+    :param value: id
+    :return: int id, None if value is not a whole number
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    return None
@@ -1,106 +1,129 @@
 from discord.ext import commands
-from backend.lib.event_queries import sql_create_registration, get_team_player_count, sql_get_team_size, \
-    get_teams_from_embed, add_player_to_team, modify_embed_message_teams, sql_delete_registration, \
-    remove_player_from_team, ExistingRegistrationError, EventNotFoundError, sql_delete_all_registrations
-from backend.lib.helper_commands import check_event_exists, check_user_exists
-from backend.lib.user_queries import UserNotFoundError, sql_add_user
+from backend.lib.event_queries import sql_create_registration, sql_delete_registration, \
+    ExistingRegistrationError, EventNotFoundError, TeamFullError, sql_delete_all_registrations
+from backend.lib.helper_commands import check_event_exists, entities
+from backend.lib.reminders import sql_delete_reminders
+from backend.lib.perf_rollups import sql_remove_event_rollups, removed_rollups
 from discord.errors import Forbidden
 
 
 class EventActions(commands.Cog):
-    def __init__(self, bot, cursor, cnx, event_channel_id):
+    def __init__(self, bot, db, event_channel_id, rosters, reactions, reminders):
         self.bot = bot
-        self.cursor = cursor
-        self.cnx = cnx
+        self.db = db
         self.event_channel_id = event_channel_id
+        self.rosters = rosters
+        self.reactions = reactions      # ReactionQueue that does the actual work for reaction events
+        self.reminders = reminders
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """
+        Cache the rosters of upcoming events once the bot can reach the event channel
+        :return: void
+        """
+        await self.rosters.load_all()
+
+    @commands.command()
+    async def reaction_stats(self, ctx):
+        """
+        Show reaction queue metrics
+        :return: queue depth, wait times and counters
+        """
+        stats = self.reactions.stats()
+        await ctx.send('\n'.join('%s: %s' % (name, round(value, 1)) for name, value in stats.items()))
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
+        """
+        Event to queue reactions on event messages
+        :param payload: contains event variables
+        :return: void
+        """
         # Test if human sender and if reaction occurred in event channel
         if payload.user_id != self.bot.user.id and payload.channel_id == self.event_channel_id:
-            channel = self.bot.get_channel(payload.channel_id)
-            msg = await channel.fetch_message(payload.message_id)
-            user = self.bot.get_user(payload.user_id)
+            await self.reactions.put((payload.user_id, payload.message_id, str(payload.emoji)),
+                                     self.handle_reaction_add, payload)
 
-            if payload.emoji.name == '☑' or payload.emoji.name == '🇽':
-                if check_event_exists(payload.message_id, self.cursor) == -1:    # If event does not exist return
-                    return
+    async def handle_reaction_add(self, payload):
+        """
+        Register or unregister the reacting user, called by the reaction queue's workers
+        :param payload: contains event variables
+        :return: void
+        """
+        user = self.bot.get_user(payload.user_id)
 
-            if check_event_exists(payload.message_id, self.cursor) == -1:  # If event does not exist return
+        # Registrations and roster of one event change one reaction at a time
+        async with self.rosters.locks.hold(payload.message_id):
+            roster = await self.rosters.get(payload.message_id)
+            if roster is None:  # If event does not exist return
                 return
 
-            if check_user_exists(payload.user_id, self.cursor) == -1: # If user does not exist return
-                sql_add_user(None, payload.user_id, str(user), "false", self.cursor, self.cnx)
-
             if payload.emoji.name == '☑':
+                placement = roster.free_slot()     # Team slot the user will take
+                if placement is None:   # Teams are full
+                    return
+
                 try:
-                    sql_create_registration(payload.message_id, str(user), self.cursor, self.cnx)
-                except UserNotFoundError:
+                    async with self.db.unit_of_work() as uow:
+                        await uow.run(sql_create_registration, payload.message_id, payload.user_id, str(user),
+                                      placement[0], placement[1], uow.cursor, uow.cnx)
+                except EventNotFoundError:
                     # Do nothing here
                     pass
                 except ExistingRegistrationError:
                     # Do nothing here
                     pass
+                except TeamFullError:   # Teams are full
+                    return
                 except Forbidden:
                     pass
-                else:   # Attempt to add user to team
-                    team_size = sql_get_team_size(payload.message_id, self.cursor)  # Get size of teams from event
-                    teams = get_teams_from_embed(msg.embeds[0], team_size)  # Get teams of event
-
-                    if get_team_player_count(teams[0]) <= get_team_player_count(teams[1]):
-                        teams[0] = add_player_to_team(teams[0], str(user))  # Attempt to add player to team
-                        if teams[0] == -1:  # Teams are full
-                            return
-                    else:
-                        teams[1] = add_player_to_team(teams[1], str(user))  # Add player to second team
+                else:   # Add user to team
+                    roster.place(payload.user_id, str(user), placement[0], placement[1])
 
                     # Update teams in event channel
-                    embed = modify_embed_message_teams(msg.embeds[0], teams)
-                    await msg.edit(embed=embed)
+                    self.rosters.edits.request(roster)
+                    await self.reminders.ensure(payload.message_id)
 
             elif payload.emoji.name == '🇽':
                 try:
-                    sql_delete_registration(payload.message_id, str(user), self.cursor, self.cnx)
-                except UserNotFoundError:
-                    # Do nothing here
-                    pass
+                    async with self.db.unit_of_work() as uow:
+                        await uow.run(sql_delete_registration, payload.message_id, payload.user_id,
+                                      uow.cursor, uow.cnx)
                 except Forbidden:
                     pass
                 else:
-                    event_channel = self.bot.get_channel(self.event_channel_id)  # Get event channel
-                    msg = await event_channel.fetch_message(payload.message_id)  # Get event message
+                    roster.remove_player(payload.user_id)     # Remove player from team
+                    self.rosters.edits.request(roster)
 
-                    team_size = sql_get_team_size(payload.message_id, self.cursor)  # Get size of teams from event
-                    teams = get_teams_from_embed(msg.embeds[0], team_size)  # Get teams of event
-
-                    # Remove player from team, if error we return
-                    teams[0] = remove_player_from_team(teams[0], team_size, str(user), 1)
-                    teams[1] = remove_player_from_team(teams[1], team_size, str(user), 1)
-
-                    embed = modify_embed_message_teams(msg.embeds[0], teams)
-                    await msg.edit(embed=embed)
-
-            try:
-                await msg.remove_reaction(payload.emoji, user)
-            except Forbidden:
-                pass
+        try:
+            await self.bot.http.remove_reaction(payload.channel_id, payload.message_id,
+                                                reaction_emoji(payload.emoji), payload.user_id)
+        except Forbidden:
+            pass
 
     @commands.Cog.listener()
     async def on_raw_reaction_clear(self, payload):
         """
-        Event to handle reaction clearing from event messages
+        Event to queue reaction clearing from event messages
         :param payload: contains event variables
         :return: void
         """
-        if check_event_exists(payload.message_id, self.cursor) == -1:  # If event does not exist return
-            return
+        await self.reactions.put((None, payload.message_id, None), self.handle_reaction_clear, payload)
 
-        channel = self.bot.get_channel(payload.channel_id)
-        msg = await channel.fetch_message(payload.message_id)
+    async def handle_reaction_clear(self, payload):
+        """
+        Put the event reactions back on a cleared event message, called by the reaction queue's workers
+        :param payload: contains event variables
+        :return: void
+        """
+        async with self.db.unit_of_work() as uow:
+            if await uow.run(check_event_exists, payload.message_id, uow.cursor) == -1:  # If event does not exist return
+                return
 
         # Add reactions back to event message
-        await msg.add_reaction('☑')  # Add accept emoji to message
-        await msg.add_reaction('🇽')  # Add decline emoji to message
+        await self.bot.http.add_reaction(payload.channel_id, payload.message_id, '☑')  # Add accept emoji to message
+        await self.bot.http.add_reaction(payload.channel_id, payload.message_id, '🇽')  # Add decline emoji to message
 
     @commands.Cog.listener()
     async def on_raw_message_delete(self, payload):
@@ -109,10 +132,27 @@ class EventActions(commands.Cog):
         :param payload: contains event variables
         :return: void
         """
-        if check_event_exists(payload.message_id, self.cursor) == -1:  # If event does not exist return
-            return
+        async with self.db.unit_of_work() as uow:
+            if await uow.run(check_event_exists, payload.message_id, uow.cursor) == -1:  # If event does not exist return
+                return
+
+            # Delete event if user has message remove perms
+            await uow.run(sql_delete_event, payload.message_id, uow.cursor, uow.cnx)
+            await uow.run(sql_delete_reminders, payload.message_id, uow.cursor, uow.cnx)
 
-        sql_delete_event(payload.message_id, self.cursor, self.cnx)  # Delete event if user has message remove perms
+        self.rosters.discard(payload.message_id)
+        self.reminders.cancel(payload.message_id)
+
+
+def reaction_emoji(emoji):
+    """
+    Formats a reaction's emoji the way Discord's reaction endpoints expect it
+    :param emoji: PartialEmoji object from a reaction payload
+    :return: emoji string
+    """
+    if emoji.id is None:    # unicode emoji
+        return emoji.name
+    return '%s:%s' % (emoji.name, emoji.id)     # custom emoji
 
 
 def sql_delete_event(event_id, cursor, cnx):
@@ -125,7 +165,10 @@ def sql_delete_event(event_id, cursor, cnx):
     :return: void
     """
 
+    sql_remove_event_rollups(event_id, cursor)     # its performance no longer counts
     cursor.execute('delete from event where event_id = %s', (event_id, ))  # execute deletion query
     cnx.commit()  # commit changes to database
+    removed_rollups.bump()      # cached stats and leaderboards still count the event
+    entities.invalidate('event', entity_id=event_id)
 
     sql_delete_all_registrations(event_id, cursor, cnx)
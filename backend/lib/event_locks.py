@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class EventLocks:
+    def __init__(self):
+        """
+        One lock per event, so that changes to the same event's registrations and roster are applied one at a time
+        while changes to different events still run in parallel.  A lock only exists while someone holds or waits
+        for it.
+        """
+        self.locks = {}     # event id -> [lock, number of holders and waiters]
+
+    @asynccontextmanager
+    async def hold(self, event_id):
+        """
+        Hold an event's lock for the duration of an async with block
+        :param event_id: id of the event
+        :return: void
+        """
+        entry = self.locks.get(event_id)
+        if entry is None:
+            entry = self.locks[event_id] = [asyncio.Lock(), 0]
+
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:   # nobody else wants this event, forget its lock
+                del self.locks[event_id]
@@ -7,19 +7,21 @@ import discord
 from discord.ext import commands
 
 from backend.lib.game_queries import get_game_id
-from backend.lib.helper_commands import check_admin_status, get_id_from_name, \
-    get_id_from_title, get_game_name, AdminPermissionError, GameNotFoundError, check_event_exists, \
-    InvalidEventTitleError
+from backend.lib.helper_commands import check_admin_status, \
+    get_id_from_title, get_game_name, AdminPermissionError, GameNotFoundError, InvalidEventTitleError, entities
 from mysql.connector.errors import IntegrityError
-from backend.lib.user_queries import UserNotFoundError
+from backend.lib.reminders import sql_delete_reminders
+from backend.lib.perf_rollups import sql_remove_event_rollups, removed_rollups
+from backend.lib.team_balance import balance_teams, sql_get_event_skills
 
 
 class EventQueries(commands.Cog):
-    def __init__(self, bot, cursor, cnx, event_channel_id):
+    def __init__(self, bot, db, event_channel_id, rosters, reminders):
         self.bot = bot
-        self.cursor = cursor
-        self.cnx = cnx
+        self.db = db
         self.event_channel_id = event_channel_id
+        self.rosters = rosters
+        self.reminders = reminders
 
     @commands.command()
     async def create_event(self, ctx, event_title, event_date, game_name, team_size):
@@ -32,24 +34,25 @@ class EventQueries(commands.Cog):
         :return: new event table or error message
         """
         try:
-            game_id = get_game_id(game_name, self.cursor)
-            check_date_format(event_date)
-            data_insert = {  # prepare data insert
-                'event_id': -1,
-                'date': date.fromtimestamp(int(time.mktime(time.strptime(event_date, '%m/%d/%Y')))),  # create date
-                'game_id': game_id,  # get game's ID number
-                'title': event_title,  # event's title
-                'team_size': team_size, # individual team size
-            }
-
-            sql_create_event(data_insert, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                game_id = await uow.run(get_game_id, game_name, uow.cursor)
+                check_date_format(event_date)
+                data_insert = {  # prepare data insert
+                    'event_id': -1,
+                    'date': date.fromtimestamp(int(time.mktime(time.strptime(event_date, '%m/%d/%Y')))),  # create date
+                    'game_id': game_id,  # get game's ID number
+                    'title': event_title,  # event's title
+                    'team_size': team_size, # individual team size
+                }
+
+                await uow.run(sql_create_event, data_insert, uow.cursor, uow.cnx)
+                game_name = await uow.run(get_game_name, data_insert['game_id'], uow.cursor)
 
             team_size = int(data_insert['team_size'])
             teams = create_blank_teams(team_size)
 
             embed = create_embed_message(data_insert['title'], data_insert['date'],
-                                         get_game_name(data_insert['game_id'], self.cursor),
-                                         teams, ctx)  # Created embeded message
+                                         game_name, teams, ctx)  # Created embeded message
         except DateFormatError:
             await ctx.send("Error: your date is invalid.  Please use MM/DD/YYYY format")
         except GameNotFoundError:
@@ -63,7 +66,10 @@ class EventQueries(commands.Cog):
         else:
             event_channel = self.bot.get_channel(self.event_channel_id)
             msg = await event_channel.send(embed=embed)
-            sql_update_event_id(msg.id, event_title, self.cursor, self.cnx) # Set event_id in database
+            async with self.db.unit_of_work() as uow:
+                await uow.run(sql_update_event_id, msg.id, event_title, uow.cursor, uow.cnx) # Set event_id in database
+            self.rosters.create(msg.id, event_title, data_insert['date'], game_name, team_size)    # Cache new roster
+            await self.reminders.schedule(msg.id, data_insert['date'])
             await msg.add_reaction('☑')   # Add accept emoji to message
             await msg.add_reaction('🇽')    # Add decline emoji to message
 
@@ -78,17 +84,20 @@ class EventQueries(commands.Cog):
         """
 
         try:
-            event_id = get_id_from_title(event_title, self.cursor)
-            sql_delete_event(ctx.author.id, event_id, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                event_id = await uow.run(get_id_from_title, event_title, uow.cursor)
+                await uow.run(sql_delete_event, ctx.author.id, event_id, uow.cursor, uow.cnx)
+                # Remove all registrations for event
+                await uow.run(sql_delete_all_registrations, event_id, uow.cursor, uow.cnx)
+                await uow.run(sql_delete_reminders, event_id, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission error: only admins may delete events")
         except InvalidEventTitleError:
             await ctx.send("Error: trying to delete an event that does not exist")
         else:
-            sql_delete_all_registrations(event_id, self.cursor, self.cnx)   # Remove all registrations for event
-            event_channel = self.bot.get_channel(self.event_channel_id)     # Get event channel
-            msg = await event_channel.fetch_message(event_id)       # Get event message
-            await msg.delete()
+            self.rosters.discard(event_id)
+            self.reminders.cancel(event_id)
+            await self.bot.http.delete_message(self.event_channel_id, event_id)     # Delete event message by id
 
             await ctx.send("Successfully deleted event " + event_title + "!")
 
@@ -98,7 +107,9 @@ class EventQueries(commands.Cog):
         Get all events
         :return: list of all scheduled events
         """
-        await ctx.send(sql_get_events(self.cursor, past))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_get_events, uow.cursor, past)
+        await ctx.send(result)
 
     @commands.command()
     async def sort_teams(self, ctx, event_title, sort_type):
@@ -111,35 +122,39 @@ class EventQueries(commands.Cog):
         """
         sort_type = sort_type.lower()
         try:
-            event_id = get_id_from_title(event_title, self.cursor)
-
-            event_channel = self.bot.get_channel(self.event_channel_id)  # Get event channel
-            msg = await event_channel.fetch_message(event_id)  # Get event message
-
-            team_size = sql_get_team_size(event_id, self.cursor)  # Get size of teams from event
-            teams = get_teams_from_embed(msg.embeds[0], team_size)  # Get teams of event
-
-            if sort_type == 'full':
-                a = [x for x in teams[0] if x != '-----']
-                b = [x for x in teams[1] if x != '-----']
-                c = a + b
-                random.shuffle(c)
-                clen = int(len(c)/2)
-                teams[0] = c[clen:]
-                teams[1] = c[:clen]
-
-            elif sort_type == 'random':
-                random.shuffle(teams[0])
-                random.shuffle(teams[1])
-
-            else:
-                await ctx.send(sort_type + " is not a valid shuffle type!")
-                return
-
-            teams[0] = rebase_team(teams[0], team_size)    # Order team 0
-            teams[1] = rebase_team(teams[1], team_size)    # Order team 1
-            embed = modify_embed_message_teams(msg.embeds[0], teams)
-            await msg.edit(embed=embed)
+            async with self.db.unit_of_work() as uow:
+                event_id = await uow.run(get_id_from_title, event_title, uow.cursor)
+
+            async with self.rosters.locks.hold(event_id):     # Keep reactions from changing teams mid-sort
+                roster = await self.rosters.get(event_id)
+                if roster is None:
+                    raise InvalidEventTitleError
+
+                if sort_type == 'full':
+                    c = roster.players(0) + roster.players(1)
+                    random.shuffle(c)
+                    clen = int(len(c)/2)
+                    roster.arrange([c[clen:], c[:clen]])
+
+                elif sort_type == 'random':
+                    teams = [roster.players(0), roster.players(1)]
+                    random.shuffle(teams[0])
+                    random.shuffle(teams[1])
+                    roster.arrange(teams)
+
+                elif sort_type == 'balanced':
+                    players = roster.players(0) + roster.players(1)
+                    async with self.db.unit_of_work() as uow:
+                        skills = await uow.run(sql_get_event_skills, event_id, players, uow.cursor)
+                    roster.arrange(list(balance_teams(skills)))
+
+                else:
+                    await ctx.send(sort_type + " is not a valid shuffle type!")
+                    return
+
+                async with self.db.unit_of_work() as uow:   # Store the new team slots
+                    await uow.run(sql_set_team_slots, event_id, roster.assignments(), uow.cursor, uow.cnx)
+                await self.rosters.edits.flush(roster)
             await ctx.send("Successfully sorted teams in event " + event_title + " with shuffle type " + sort_type + "!")
 
         except InvalidEventTitleError:
@@ -153,7 +168,9 @@ class EventQueries(commands.Cog):
         :param event_name: event's title
         :return: information about that event
         """
-        await ctx.send(sql_query_event(event_name, self.cursor))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_query_event, event_name, uow.cursor)
+        await ctx.send(result)
 
 
 def check_date_format(date_string):
@@ -184,6 +201,7 @@ def sql_create_event(data_insert, cursor, cnx):
                    'values (%(event_id)s, %(date)s, %(game_id)s, '
                    '%(title)s, %(team_size)s)', data_insert)        # add new event
     cnx.commit()  # commit changes to database
+    entities.invalidate('event', data_insert['title'], data_insert['event_id'])
 
     cursor.execute('select * from event where title = %s', (data_insert['title'],))
 
@@ -191,10 +209,15 @@ def sql_create_event(data_insert, cursor, cnx):
 
 
 def sql_update_event_id(event_id, title, cursor, cnx):
+    cursor.execute('select event_id from event where title = %s', (title,))
+    old_ids = [row[0] for row in cursor.fetchall()]
     cursor.execute('update event '
                    'set event_id = %s '
                    'where title = %s', (event_id, title))
     cnx.commit()  # commit changes to user table
+    for old_id in old_ids:      # by id: title may be cased unlike the cached one
+        entities.invalidate('event', entity_id=old_id)
+    entities.invalidate('event', title, event_id)
 
 
 def sql_delete_event(auth_user, event_id, cursor, cnx):
@@ -208,8 +231,11 @@ def sql_delete_event(auth_user, event_id, cursor, cnx):
     """
     check_admin_status(auth_user, True, cursor)  # see if the authorizing user is an admin
 
+    sql_remove_event_rollups(event_id, cursor)     # its performance no longer counts
     cursor.execute('delete from event where event_id = %s', (event_id, ))  # execute deletion query
     cnx.commit()  # commit changes to database
+    removed_rollups.bump()      # cached stats and leaderboards still count the event
+    entities.invalidate('event', entity_id=event_id)
 
     cursor.execute('select * from event where event_id = %s', (event_id,))
     return cursor.fetchall()
@@ -230,49 +256,58 @@ def sql_get_events(cursor, include_past = False):
     return 'Event ID\tDate\tEvent Title\tGame\n' + event_list
 
 
-def sql_create_registration(event_id, user, cursor, cnx):
+def sql_create_registration(event_id, user_id, display_name, team, slot, cursor, cnx):
     """
-    Register user for event based on title
+    Register user for event in a single transaction: the user is added to the user table if they are not in it yet,
+    the registration is inserted unless it already exists, and the event's team size and registration count are read
+    back before committing.  Raises EventNotFoundError, ExistingRegistrationError or TeamFullError (after rolling back)
+    if the registration cannot be made
     :param event_id: event id to create registration for
-    :param user: the user to register for
+    :param user_id: id of the user to register
+    :param display_name: display name of the user, used if the user has to be added
+    :param team: index of the team the user is placed on
+    :param slot: index of the user's slot on that team
     :param cursor: cursor object for executing command
     :param cnx: connection object for verifying change
-    :return: count of users registered for the event
+    :return: (team size of the event, count of users registered for the event)
     """
-
-    user_id = get_id_from_name(user, cursor)
-    if user_id == -1:
-        raise UserNotFoundError
-
-    cursor.execute('select user_id from registration where user_id = %s and event_id = %s', (user_id, event_id))
+    cursor.execute('insert into user '
+                   '(user_id, display_name, admin) '
+                   'values (%s, %s, 0) '
+                   'on duplicate key update user_id = user_id', (user_id, display_name))     # add user if missing
+    cursor.execute('insert ignore into registration '
+                   '(user_id, event_id, team, slot) '
+                   'select %s, event_id, %s, %s from event where event_id = %s',
+                   (user_id, team, slot, event_id))    # register if event exists
+    registered = cursor.rowcount        # 1 if a registration was inserted, 0 if it already existed
+
+    cursor.execute('select team_size, (select count(*) from registration where event_id = %s) '
+                   'from event where event_id = %s', (event_id, event_id))      # get team size and registration count
     result = cursor.fetchall()
 
-    if len(result) != 0:  # user already registered for event
+    if len(result) == 0:  # event not found
+        cnx.rollback()
+        raise EventNotFoundError
+    if registered == 0:  # user already registered for event
+        cnx.rollback()
         raise ExistingRegistrationError
+    if result[0][1] > result[0][0] * 2:  # both teams are already full
+        cnx.rollback()
+        raise TeamFullError
 
-    cursor.execute('insert into registration '
-                   '(user_id, event_id) '
-                   'values (%s, %s)', (user_id, event_id,))  # add new event
     cnx.commit()  # commit changes to database
-    cursor.execute('select count(*) from registration where event_id = %s', (event_id,))        # Get registration count
-    result = cursor.fetchall()
+    return result[0]
 
-    return result
 
-
-def sql_delete_registration(event_id, user, cursor, cnx):
+def sql_delete_registration(event_id, user_id, cursor, cnx):
     """
-    Delete user registration for event based on title
+    Delete user registration for event
     :param event_id: id of the event to delete registration for
-    :param user: the user to delete registration for
+    :param user_id: id of the user to delete registration for
     :param cursor: cursor object for executing command
     :param cnx: connection object for verifying change
     :return: count of users registered for the event
     """
-    user_id = get_id_from_name(user, cursor)
-    if user_id == -1:
-        raise UserNotFoundError
-
     cursor.execute('delete from registration where '
                    'user_id = %s and event_id = %s', (user_id, event_id))  # delete user registration
     cnx.commit()    # commit changes to database
@@ -304,6 +339,76 @@ def sql_get_team_size(event_id, cursor):
     return result[0][0]  # return event id
 
 
+def sql_get_event_details(event_id, cursor):
+    """
+    Gets everything shown in an event's embeded message except its teams
+    :param event_id: id of the event
+    :param cursor: cursor object for executing command
+    :return: (title, date, game name, team size) of the event
+    """
+    cursor.execute('select event.title, event.date, game.name, event.team_size from event '
+                   'inner join game on event.game_id = game.game_id where event.event_id = %s', (event_id,))
+    result = cursor.fetchall()
+
+    if len(result) == 0:  # event not found
+        raise EventNotFoundError
+
+    return result[0]
+
+
+def sql_get_event_players(event_id, cursor):
+    """
+    Gets the registered players of an event and their team slots
+    :param event_id: id of the event
+    :param cursor: cursor object for executing command
+    :return: list of (user_id, display_name, team, slot) rows; team and slot are None for unplaced players
+    """
+    cursor.execute('select registration.user_id, user.display_name, registration.team, registration.slot '
+                   'from registration inner join user on user.user_id = registration.user_id '
+                   'where registration.event_id = %s order by registration.date, registration.user_id', (event_id,))
+    return cursor.fetchall()
+
+
+def sql_get_upcoming_event_details(cursor):
+    """
+    Gets the details of every event that has not happened yet
+    :param cursor: cursor object for executing command
+    :return: list of (event_id, title, date, game name, team size) rows
+    """
+    cursor.execute('select event.event_id, event.title, event.date, game.name, event.team_size from event '
+                   'inner join game on event.game_id = game.game_id where event.date >= CURDATE()')
+    return cursor.fetchall()
+
+
+def sql_get_upcoming_event_players(cursor):
+    """
+    Gets the registered players and team slots of every event that has not happened yet
+    :param cursor: cursor object for executing command
+    :return: list of (event_id, user_id, display_name, team, slot) rows
+    """
+    cursor.execute('select registration.event_id, registration.user_id, user.display_name, '
+                   'registration.team, registration.slot from registration '
+                   'inner join user on user.user_id = registration.user_id '
+                   'inner join event on event.event_id = registration.event_id '
+                   'where event.date >= CURDATE() order by registration.date, registration.user_id')
+    return cursor.fetchall()
+
+
+def sql_set_team_slots(event_id, assignments, cursor, cnx):
+    """
+    Stores the team slots of an event's registered players
+    :param event_id: id of the event
+    :param assignments: list of (team, slot, user_id) tuples
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for verifying change
+    :return: void
+    """
+    cursor.executemany('update registration set team = %s, slot = %s '
+                       'where event_id = %s and user_id = %s',
+                       [(team, slot, event_id, user_id) for team, slot, user_id in assignments])
+    cnx.commit()    # commit changes to database
+
+
 def sql_query_event(event_title, cursor):
     if event_title == "ALL":
         return sql_get_events(cursor)
@@ -344,27 +449,13 @@ def create_embed_message(title, game_date, game_name, teams, ctx):
     return embed
 
 
-def modify_embed_message_teams(embed, teams):
-    """
-    Modifies an embeded message to send in Discord
-    :param embed: embeded message to modify
-    :param teams: teams to include in embeded message
-    :return: embeded message ready to be sent in Discord containing event details
-    """
-    embed.clear_fields()
-    embed.add_field(name="Team 1", value=convert_team_to_text(teams[0]), inline=True)
-    embed.add_field(name="Team 2", value=convert_team_to_text(teams[1]), inline=True)
-
-    return embed
-
-
 def create_blank_teams(team_size):
     """
     Creates a set of 2 blank teams
     :param team_size: size of team to be created
     :return: blank team array of size team_size
     """
-    teams = [['-----'] * team_size] * 2
+    teams = [['-----'] * team_size for _ in range(2)]
 
     return teams
 
@@ -381,73 +472,6 @@ def rebase_team(team, team_size):
         team.append('-----')
     return team
 
-def add_player_to_team(team, display_name):
-    """
-    Adds a player to a team
-    :param team: team array to add player to
-    :param display_name: display_name of player to be added to team
-    :return: team array if successful, -1 if unsuccessful (full team)
-    """
-    count = 0
-    for player in team:
-        if player == '-----':
-            team[count] = display_name
-            return team
-        count += 1
-
-    return -1
-
-
-def remove_player_from_team(team, team_size, display_name, rebase):
-    """
-        Removes a player from a team
-        :param team: team array to remove player from
-        :param team_size: total size of team
-        :param display_name: display name of player to be removed from a team
-        :param rebase: 1 if we want to rebase teams after removing player, 0 if we don't
-        :return: team array
-        """
-    count = 0
-    for player in team:
-        if player == display_name:
-            team[count] = '-----'
-
-            if rebase == 1:
-                return rebase_team(team, team_size)
-
-            return team
-        count += 1
-
-    return team
-
-
-def is_player_on_team(team, display_name):
-    """
-    Gets if player is on a team or not
-    :param team: team array to check if player is in
-    :param display_name: display name of player to check if they belong to a team
-    :return: 1 if player is on team, -1 if player isn't on team
-    """
-    for player in team:
-        if player == display_name:
-            return 1
-
-    return -1
-
-
-def get_team_player_count(team):
-    """
-    Gets the count of players in a given team
-    :param team: team to get count for
-    :return: count of players in team
-    """
-    count = 0
-    for player in team:
-        if player != '-----':
-            count += 1
-
-    return count
-
 
 def convert_team_to_text(team):
     """
@@ -462,23 +486,6 @@ def convert_team_to_text(team):
     return team_text
 
 
-def get_teams_from_embed(embed, team_size):
-    """
-    Gets teams from embeded message
-    :param embed: embeded message to decode teams from
-    :param team_size: team size for event
-    :return: two lists for Team 1 and Team 2 containing display_names for registered players
-    """
-    teams = create_blank_teams(team_size)  # Blank team arrays for Team 1 and Team 2
-    for field in embed.fields:  # Only sets values for certain Embed values sent from bot
-        if field.name == 'Team 1':
-            teams[0] = str(field.value).split('\n')
-        elif field.name == 'Team 2':
-            teams[1] = str(field.value).split('\n')
-
-    return teams    # Return team arrays
-
-
 # ERRORS #
 
 
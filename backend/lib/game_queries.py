@@ -1,14 +1,13 @@
 from discord.ext import commands
 from mysql.connector.errors import IntegrityError
 from backend.lib.helper_commands import check_admin_status, get_id_from_name, get_game_id, \
-    AdminPermissionError, GameNotFoundError
+    AdminPermissionError, GameNotFoundError, entities
 
 
 class GameQueries(commands.Cog):
-    def __init__(self, bot, cursor, cnx):
+    def __init__(self, bot, db):
         self.bot = bot
-        self.cursor = cursor
-        self.cnx = cnx
+        self.db = db
 
     @commands.command()
     async def add_game(self, ctx, game_id, name):
@@ -19,7 +18,8 @@ class GameQueries(commands.Cog):
         :return: new game table or error message
         """
         try:
-            message = sql_add_game(str(ctx.author), game_id, name, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                message = await uow.run(sql_add_game, ctx.author.id, game_id, name, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission error encountered: only admins can add games")
         except ExistingGameError:
@@ -37,7 +37,8 @@ class GameQueries(commands.Cog):
         :return: new game table or error message
         """
         try:
-            message = sql_delete_game(str(ctx.author), name, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                message = await uow.run(sql_delete_game, ctx.author.id, name, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission error: must be an admin to delete a game")
         except GameNotFoundError:
@@ -54,7 +55,8 @@ class GameQueries(commands.Cog):
         :return: new game table or error message
         """
         try:
-            message = sql_edit_name(str(ctx.author), old_name, new_name, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                message = await uow.run(sql_edit_name, ctx.author.id, old_name, new_name, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission error: must be an admin to edit the database")
         except GameNotFoundError:
@@ -73,7 +75,8 @@ class GameQueries(commands.Cog):
         :return: new game table or error message
         """
         try:
-            message = sql_edit_id(str(ctx.author), name, game_id, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                message = await uow.run(sql_edit_id, ctx.author.id, name, game_id, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission error: must be an admin to edit the database")
         except GameNotFoundError:
@@ -90,7 +93,9 @@ class GameQueries(commands.Cog):
         :param name: game's title | ALL
         :return: result of query
         """
-        await ctx.send(sql_query_game(name, self.cursor))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_query_game, name, uow.cursor)
+        await ctx.send(result)
 
     @commands.command()
     async def list_games(self, ctx):
@@ -98,7 +103,9 @@ class GameQueries(commands.Cog):
         List all games
         :return: list of all games
         """
-        await ctx.send(sql_list_games(self.cursor))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_list_games, uow.cursor)
+        await ctx.send(result)
 
     @commands.command()
     async def create_membership(self, ctx, game_name, skill_level):
@@ -108,7 +115,9 @@ class GameQueries(commands.Cog):
         :param skill_level: player's skill level
         :return: confirmation or error message
         """
-        await ctx.send(sql_set_membership(str(ctx.author), game_name, skill_level, self.cursor, self.cnx))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_set_membership, str(ctx.author), game_name, skill_level, uow.cursor, uow.cnx)
+        await ctx.send(result)
 
     @commands.command()
     async def delete_membership(self, ctx, display_name, game_name):
@@ -118,7 +127,9 @@ class GameQueries(commands.Cog):
         :param game_name: game's title
         :return: confirmation or error message
         """
-        await ctx.send(sql_delete_membership(display_name, game_name, self.cursor, self.cnx))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_delete_membership, display_name, game_name, uow.cursor, uow.cnx)
+        await ctx.send(result)
 
 
 def sql_add_game(auth_user, game_id, name, cursor, cnx):
@@ -130,6 +141,7 @@ def sql_add_game(auth_user, game_id, name, cursor, cnx):
                    '(game_id, name) '
                    'values (%s, %s)', (game_id, name))  # add new user
     cnx.commit()  # commit changes to database
+    entities.invalidate('game', name, game_id)
 
     cursor.execute('select * from game where name = %s', (name,))  # get new user table
     return cursor.fetchall()
@@ -138,11 +150,13 @@ def sql_add_game(auth_user, game_id, name, cursor, cnx):
 def sql_delete_game(auth_user, name, cursor, cnx):
     check_admin_status(auth_user, True, cursor)  # see if the authorizing user is an admin
 
-    if len(sql_query_game(name, cursor)) == 0:
+    game = sql_query_game(name, cursor)
+    if len(game) == 0:
         raise GameNotFoundError
 
     cursor.execute('delete from game where name = %s', (name,))  # execute deletion query
     cnx.commit()  # commit changes to database
+    entities.invalidate('game', entity_id=game[0][0])     # by id: name may be cased unlike the cached one
     cursor.execute('select * from game')  # get new user table
     return cursor.fetchall()
 
@@ -150,7 +164,8 @@ def sql_delete_game(auth_user, name, cursor, cnx):
 def sql_edit_name(auth_user, old_name, new_name, cursor, cnx):
     check_admin_status(auth_user, True, cursor)  # see if the authorizing user is an admin
 
-    if len(sql_query_game(old_name, cursor)) == 0:
+    game = sql_query_game(old_name, cursor)
+    if len(game) == 0:
         raise GameNotFoundError
     if len(sql_query_game(new_name, cursor)) > 0:
         raise ExistingGameError
@@ -159,6 +174,7 @@ def sql_edit_name(auth_user, old_name, new_name, cursor, cnx):
                    'set name = %s '
                    'where name = %s', (new_name, old_name))  # change the game table with new game name
     cnx.commit()  # commit changes to user table
+    entities.invalidate('game', entity_id=game[0][0])     # by id: old_name may be cased unlike the cached one
     cursor.execute('select * from game where name = %s', (new_name,))  # get new user table
     return cursor.fetchall()
 
@@ -166,13 +182,16 @@ def sql_edit_name(auth_user, old_name, new_name, cursor, cnx):
 def sql_edit_id(auth_user, name, game_id, cursor, cnx):
     check_admin_status(auth_user, True, cursor)  # see if the authorizing user is an admin
 
-    if len(sql_query_game(name, cursor)) == 0:
+    game = sql_query_game(name, cursor)
+    if len(game) == 0:
         raise GameNotFoundError
 
     cursor.execute('update game '
                    'set game_id = %s '
                    'where name = %s', (game_id, name))  # change the game table with game id
     cnx.commit()  # commit changes to user table
+    entities.invalidate('game', entity_id=game[0][0])     # the old id, under whatever casing it was cached
+    entities.invalidate('game', entity_id=game_id)
     cursor.execute('select * from game where name = %s', (name,))  # get new user table
     return cursor.fetchall()
 
@@ -1,11 +1,67 @@
 from discord.ext import commands
+from backend.lib.entity_cache import EntityCache, as_id
+from backend.lib.admin_cache import AdminCache, UNKNOWN
+from backend.lib.channel_sender import pack_lines
+from backend.lib.query_stats import format_query_stats
+from backend.lib.tracing import summarize, format_summary
+
+QUERY_STATS_DEFAULT = 10        # statements listed by query_stats when no count is given
+
+entities = EntityCache()     # user, game and event lookups shared by every cog
+admins = AdminCache()       # admin flags shared by every cog
 
 
 class HelperCommands(commands.Cog):
-    def __init__(self, bot, cursor, cnx):
+    def __init__(self, bot, db, tracer=None):
         self.bot = bot
-        self.cursor = cursor
-        self.cnx = cnx
+        self.db = db
+        self.tracer = tracer        # Tracer object sampling commands, None if commands are not traced
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """
+        Load every user's admin flag before the first privileged command
+        :return: void
+        """
+        async with self.db.unit_of_work() as uow:
+            await uow.run(load_admins, uow.cursor)
+
+    @commands.command()
+    async def query_stats(self, ctx, n=str(QUERY_STATS_DEFAULT)):
+        """
+        Show the SQL statements that took the most time since the bot started, and the latest slow ones
+        :param n: number of statements to show
+        :return: count, total time and p50/p95/p99 latency of each statement
+        """
+        if not n.isdigit() or int(n) < 1:
+            await ctx.send("Error: n must be a positive number")
+            return
+        try:
+            async with self.db.unit_of_work() as uow:
+                await uow.run(check_admin_status, ctx.author.id, True, uow.cursor)
+        except AdminPermissionError:
+            await ctx.send("You do not have the necessary permissions")
+        else:
+            for msg in pack_lines(format_query_stats(self.db.stats, int(n))):
+                await ctx.send(msg)
+
+    @commands.command()
+    async def trace_summary(self, ctx):
+        """
+        Show how long traced commands and reactions took, and how much of it was spent in MySQL and Discord calls
+        :return: traces, p50/p99 latency and p50/p99 time per kind of span of each command
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                await uow.run(check_admin_status, ctx.author.id, True, uow.cursor)
+        except AdminPermissionError:
+            await ctx.send("You do not have the necessary permissions")
+        else:
+            if self.tracer is None or len(self.tracer.traces) == 0:
+                await ctx.send("No commands have been traced")
+            else:
+                for msg in pack_lines(format_summary(summarize(self.tracer.traces))):
+                    await ctx.send(msg)
 
     @commands.command(name='exit')
     async def exit_bot(self, ctx):
@@ -13,8 +69,9 @@ class HelperCommands(commands.Cog):
         Prompt bot to logout
         :return: none
         """
-        self.cursor.close()
-        self.cnx.close()
+        self.db.close()
+        if self.tracer is not None:
+            self.tracer.close()
         await self.bot.logout()  # log the bot out
 
 
@@ -29,15 +86,35 @@ def check_admin_status(user_id, add, cursor):
     :param cursor: cursor object for executing search query
     :return: Raise AdminPermissionError if user is not admin or does not exist,Nothing if the user is an admin
     """
-    cursor.execute('select admin from user where user_id = %s', (user_id,))
-    result = cursor.fetchall()
-
-    if add and (len(result) == 0 or result[0][0] == 0):  # adding to the database
+    admin = UNKNOWN
+    if as_id(user_id) is not None:
+        admin = admins.get(as_id(user_id))
+        if admin is UNKNOWN:    # not loaded yet, or loaded longer ago than the TTL
+            load_admins(cursor)
+            admin = admins.get(as_id(user_id))
+
+    if admin is UNKNOWN:    # ids that are not numbers are left to MySQL to compare
+        cursor.execute('select admin from user where user_id = %s', (user_id,))
+        result = cursor.fetchall()
+        admin = result[0][0] if len(result) > 0 else None
+
+    if add and (admin is None or admin == 0):  # adding to the database
         raise AdminPermissionError(user_id)
-    elif not add and (len(result) > 0 and result[0][0] == 1):  # removing from the database
+    elif not add and admin == 1:  # removing from the database
         raise AdminPermissionError(user_id)
 
 
+def load_admins(cursor):
+    """
+    Loads the admin flag of every user into the admin cache with one query
+    :param cursor: cursor object for executing search query
+    :return: void
+    """
+    generation = admins.generation
+    cursor.execute('select user_id, admin from user')
+    admins.load(cursor.fetchall(), generation)
+
+
 def get_id_from_name(display_name, cursor):
     """
     Gets a user id from display name of a user
@@ -45,12 +122,18 @@ def get_id_from_name(display_name, cursor):
     :param cursor: cursor object for executing search query
     :return: Raise UserNotFoundError if user does not exist, user_id if user is found
     """
-    cursor.execute('select user_id from user where display_name = %s', (display_name,))
+    user_id = entities.get_id('user', display_name)
+    if user_id is not None:
+        return user_id
+
+    generation = entities.generation
+    cursor.execute('select user_id, display_name from user where display_name = %s', (display_name,))
     result = cursor.fetchall()
 
     if len(result) == 0:  # user not found
         raise UserNotFoundError
 
+    entities.put('user', result[0][1], result[0][0], generation)     # stored name, which may differ in case
     return result[0][0]  # return user id
 
 
@@ -61,12 +144,19 @@ def get_name_from_id(user_id, cursor):
     :param cursor: cursor object for executing search query
     :return: Raise InvalidUserIDError, display_name if user is found
     """
+    display_name = entities.get_name('user', as_id(user_id))
+    if display_name is not None:
+        return display_name
+
+    generation = entities.generation
     cursor.execute('select display_name from user where user_id = %s', (user_id,))
     result = cursor.fetchall()
 
     if len(result) == 0:  # user not found
         raise InvalidUserIDError
 
+    if as_id(user_id) is not None:
+        entities.put('user', result[0][0], as_id(user_id), generation)
     return result[0][0]  # return display name
 
 
@@ -77,9 +167,9 @@ def check_user_exists(user_id, cursor):
     :param cursor: cursor object for executing query
     :return: -1 if event does not exist, 1 if event exists
     """
-    cursor.execute('select * from user where user_id = %s', (user_id,))
-    result = cursor.fetchall()
-    if len(result) == 0:  # user not found
+    try:
+        get_name_from_id(user_id, cursor)
+    except InvalidUserIDError:  # user not found
         return -1
     return 1
 
@@ -91,11 +181,17 @@ def get_id_from_title(title, cursor):
     :param cursor: cursor object for executing search query
     :return: Raise invalid event title error, event_id if event is found
     """
+    event_id = entities.get_id('event', title)
+    if event_id is not None:
+        return event_id
 
-    cursor.execute('select event_id from event where title = %s', (title,))
+    generation = entities.generation
+    cursor.execute('select event_id, title from event where title = %s', (title,))
     result = cursor.fetchall()
     if len(result) == 0:  # event not found
         raise InvalidEventTitleError
+
+    entities.put('event', result[0][1], result[0][0], generation)     # stored title, which may differ in case
     return result[0][0]  # return event id
 
 
@@ -106,10 +202,17 @@ def check_event_exists(event_id, cursor):
     :param cursor: cursor object for executing query
     :return: -1 if event does not exist, 1 if event exists
     """
-    cursor.execute('select * from event where event_id = %s', (event_id,))
+    if entities.get_name('event', as_id(event_id)) is not None:
+        return 1
+
+    generation = entities.generation
+    cursor.execute('select title from event where event_id = %s', (event_id,))
     result = cursor.fetchall()
     if len(result) == 0:  # event not found
         return -1
+
+    if as_id(event_id) is not None:
+        entities.put('event', result[0][0], as_id(event_id), generation)
     return 1
 
 
@@ -120,12 +223,18 @@ def get_game_id(game_name, cursor):
     :param cursor: cursor object for executing search query
     :return: Raise Game not found error if not found, game_id if game is found
     """
-    cursor.execute('select game_id from game where name = %s', (game_name,))
+    game_id = entities.get_id('game', game_name)
+    if game_id is not None:
+        return game_id
+
+    generation = entities.generation
+    cursor.execute('select game_id, name from game where name = %s', (game_name,))
     result = cursor.fetchall()
 
     if len(result) == 0:  # game not found
         raise GameNotFoundError
 
+    entities.put('game', result[0][1], result[0][0], generation)     # stored name, which may differ in case
     return result[0][0]  # return game id
 
 
@@ -136,13 +245,20 @@ def get_game_name(game_id, cursor):
     :param cursor: cursor object for executing search query
     :return: Raise Error if Game not found, game_id if game is found
     """
+    game_name = entities.get_name('game', as_id(game_id))
+    if game_name is not None:
+        return game_name
+
+    generation = entities.generation
     cursor.execute('select name from game where game_id = %s', (game_id,))
     result = cursor.fetchall()
 
     if len(result) == 0:  # game not found
         raise GameNotFoundError
 
-    return result[0][0]  # return game id
+    if as_id(game_id) is not None:
+        entities.put('game', result[0][0], as_id(game_id), generation)
+    return result[0][0]  # return game name
 
 
 def get_registrations(cursor, event_id):
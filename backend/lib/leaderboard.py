@@ -0,0 +1,202 @@
+import heapq
+import numpy as np
+
+from backend.lib.perf_rollups import ROLLUP_COLUMNS, removed_rollups
+from backend.lib.player_stats import aggregate
+
+LEADERBOARD_SIZE = 25       # entries kept per board, and so the largest k a leaderboard can show
+LEADERBOARD_DEFAULT = 10        # entries shown when k is not given
+LEADERBOARD_METRICS = ('kills', 'deaths', 'games', 'kd', 'win_rate', 'avg_margin', 'kills_per_minute',
+                       'deaths_per_minute')
+
+
+class TopK:
+    def __init__(self, size, entries):
+        """
+        The best scores of a game's players in one metric.  The heap's root is the lowest kept (score, user id), so a
+        new score is only compared against it.  A board holding fewer than size entries holds every player of the game.
+        :param size: most entries kept
+        :param entries: list of (score, user id, name), at most size of the best ones
+        """
+        self.size = size
+        self.names = {user_id: name for _, user_id, name in entries}
+        self.scores = {user_id: score for score, user_id, _ in entries}
+        self.heap = [(score, user_id) for score, user_id, _ in entries]     # min-heap of kept (score, user id)
+        heapq.heapify(self.heap)
+
+    def offer(self, user_id, name, score):
+        """
+        Takes a player's new score into account
+        :param user_id: id of the player
+        :param name: display name of the player
+        :param score: the player's new score
+        :return: False if the board can no longer tell its top entries and must be rebuilt, True otherwise
+        """
+        old = self.scores.get(user_id)
+        if old is not None:
+            if score < old and len(self.heap) == self.size:     # a player left off the board may now rank higher
+                return False
+            self.names[user_id], self.scores[user_id] = name, score
+            self.heap = [(score, user_id) for user_id, score in self.scores.items()]
+            heapq.heapify(self.heap)
+        elif len(self.heap) < self.size:
+            self.names[user_id], self.scores[user_id] = name, score
+            heapq.heappush(self.heap, (score, user_id))
+        elif (score, user_id) > self.heap[0]:
+            _, dropped = heapq.heapreplace(self.heap, (score, user_id))
+            del self.names[dropped], self.scores[dropped]
+            self.names[user_id], self.scores[user_id] = name, score
+        return True
+
+    def top(self, k):
+        """
+        Gets the best entries
+        :param k: number of entries
+        :return: list of (name, score), best first
+        """
+        return [(self.names[user_id], score) for score, user_id in heapq.nlargest(k, self.heap)]
+
+
+class Leaderboards:
+    def __init__(self, size=LEADERBOARD_SIZE, changes=removed_rollups):
+        """
+        Top-k boards per game and metric, built on first use and updated as performance is written.  Deleted
+        events cannot be taken out of a board, so every board is dropped once one is deleted.  Memory is bounded by
+        size entries per tracked game and metric.
+        :param size: entries kept per board
+        :param changes: RollupChanges object counting event deletions
+        """
+        self.size = size
+        self.boards = {}        # (game_id, metric) -> TopK
+        self.version = 0        # bumped by every update
+        self.writing = 0        # performance writes in progress, whose rows may not be committed yet
+        self.changes = changes
+        self.generation = changes.generation        # deletions the boards account for
+
+    def sync(self):
+        """
+        Drops every board if an event was deleted since the last check
+        :return: void
+        """
+        generation = self.changes.generation
+        if generation != self.generation:
+            self.invalidate_all()
+            self.generation = generation
+
+    def get(self, game_id, metric):
+        """
+        Gets a cached board
+        :param game_id: id of the game
+        :param metric: name of the metric
+        :return: TopK object, None if not cached
+        """
+        self.sync()
+        return self.boards.get((game_id, metric))
+
+    def put(self, game_id, rows, version):
+        """
+        Builds and caches every metric's board of a game, unless performance changed or was being written while the
+        rows were read
+        :param game_id: id of the game
+        :param rows: list of (user_id, name, games, kills, deaths, wins, minutes, margin) rows of every player
+        :param version: value of self.version before the rows were read from the database
+        :return: dictionary of metric -> TopK object
+        """
+        stats = row_stats(rows)
+        boards = {metric: TopK(self.size, heapq.nlargest(self.size, ((score, row[0], row[1]) for row, score
+                                                                     in zip(rows, stats[metric].tolist()))))
+                  for metric in LEADERBOARD_METRICS}
+        self.sync()
+        if version == self.version and self.writing == 0:
+            self.boards.update(((game_id, metric), board) for metric, board in boards.items())
+        return boards
+
+    def games(self):
+        """
+        Gets the games that have cached boards
+        :return: set of game ids
+        """
+        self.sync()
+        return {game_id for game_id, _ in self.boards}
+
+    def begin(self):
+        """
+        Marks the start of a performance write, before the games to update are taken from games().  Until end is
+        called, boards are built but not cached, since their rows may have been read before the write committed.
+        :return: void
+        """
+        self.writing += 1
+        self.version += 1
+
+    def end(self):
+        """
+        Marks the end of a performance write started with begin, whether it committed or not
+        :return: void
+        """
+        self.writing -= 1
+        self.version += 1
+
+    def update(self, rows):
+        """
+        Offers players' new rollup totals to the cached boards of their games, dropping boards that cannot follow
+        :param rows: list of (user_id, game_id, name, games, kills, deaths, wins, minutes, margin) rows
+        :return: void
+        """
+        self.sync()
+        self.version += 1
+        stats = row_stats(rows)
+        for metric in LEADERBOARD_METRICS:
+            for row, score in zip(rows, stats[metric].tolist()):
+                board = self.boards.get((row[1], metric))
+                if board is not None and not board.offer(row[0], row[2], score):
+                    del self.boards[(row[1], metric)]
+
+    def invalidate_all(self):
+        """
+        Drops every cached board
+        :return: void
+        """
+        self.version += 1
+        self.boards.clear()
+
+
+def row_stats(rows):
+    """
+    Computes the stats of rollup rows, one player and game each
+    :param rows: list of rows ending with games, kills, deaths, wins, minutes, margin
+    :return: dictionary of stat name -> array with one value per row
+    """
+    table = np.array([row[-len(ROLLUP_COLUMNS):] for row in rows], dtype=np.float64).reshape(-1, len(ROLLUP_COLUMNS))
+    _, stats = aggregate(np.arange(len(rows)), {column: table[:, i] for i, column in enumerate(ROLLUP_COLUMNS)})
+    return stats
+
+
+def sql_get_game_rollups(game_id, cursor):
+    """
+    Gets the rollup totals of every player of a game
+    :param game_id: id of the game
+    :param cursor: cursor object for executing command
+    :return: list of (user_id, display name, games, kills, deaths, wins, minutes, margin) rows
+    """
+    cursor.execute('select rollup.user_id, user.display_name, %s from perf_rollup_user_game rollup '
+                   'inner join user on rollup.user_id = user.user_id where rollup.game_id = %%s and rollup.games > 0' %
+                   ', '.join('rollup.' + column for column in ROLLUP_COLUMNS), (game_id,))
+    return cursor.fetchall()
+
+
+def sql_get_player_rollups(user_ids, game_ids, cursor):
+    """
+    Gets the rollup totals of some players in some games
+    :param user_ids: list of user ids
+    :param game_ids: list of game ids
+    :param cursor: cursor object for executing command
+    :return: list of (user_id, game_id, display name, games, kills, deaths, wins, minutes, margin) rows
+    """
+    if len(user_ids) == 0 or len(game_ids) == 0:
+        return []
+    cursor.execute('select rollup.user_id, rollup.game_id, user.display_name, %s from perf_rollup_user_game rollup '
+                   'inner join user on rollup.user_id = user.user_id '
+                   'where rollup.user_id in (%s) and rollup.game_id in (%s)' %
+                   (', '.join('rollup.' + column for column in ROLLUP_COLUMNS), ', '.join(['%s'] * len(user_ids)),
+                    ', '.join(['%s'] * len(game_ids))), list(user_ids) + list(game_ids))
+    return cursor.fetchall()
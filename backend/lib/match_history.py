@@ -0,0 +1,127 @@
+import time
+from collections import OrderedDict
+
+HISTORY_PAGE_SIZE = 10      # events listed per page
+PAGE_TTL = 300.0        # seconds a rendered page is kept
+HISTORY_TIMEOUT = 120.0     # seconds a history message keeps turning pages after the last turn
+PREVIOUS_PAGE = '◀'
+NEXT_PAGE = '▶'
+
+
+class PageCache:
+    def __init__(self, ttl=PAGE_TTL, clock=time.monotonic):
+        """
+        Rendered history pages, kept for a short while so paging back and forth does not query the database
+        :param ttl: seconds a page is kept
+        :param clock: function returning the current time in seconds
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self.pages = OrderedDict()      # (user_id, game_id, start) -> (expiry, page), oldest first
+        self.version = 0        # bumped by every invalidation
+
+    def get(self, key):
+        """
+        Gets a cached page
+        :param key: (user_id, game_id or None, start of the page)
+        :return: page, None if not cached or expired
+        """
+        self.expire()
+        entry = self.pages.get(key)
+        return None if entry is None else entry[1]
+
+    def put(self, key, page, version):
+        """
+        Caches a page, unless performance changed while it was read
+        :param key: (user_id, game_id or None, start of the page)
+        :param page: page to cache
+        :param version: value of self.version before the page was read from the database
+        :return: void
+        """
+        if version == self.version:
+            self.pages[key] = (self.clock() + self.ttl, page)
+            self.pages.move_to_end(key)
+
+    def expire(self):
+        """
+        Drops expired pages, which are always the oldest ones
+        :return: void
+        """
+        now = self.clock()
+        while len(self.pages) > 0 and next(iter(self.pages.values()))[0] <= now:
+            self.pages.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        """
+        Drops the pages of users whose performance changed
+        :param user_ids: iterable of user ids
+        :return: void
+        """
+        self.version += 1
+        user_ids = set(user_ids)
+        for key in [key for key in self.pages if key[0] in user_ids]:
+            del self.pages[key]
+
+
+def format_history_row(row):
+    """
+    Formats one past event of a player as a line of text
+    :param row: (event_id, date, title, game name, kills, deaths, win, length, win_score, lose_score) row, the
+    performance columns being None if no performance was recorded
+    :return: line of text
+    """
+    event_id, event_date, title, game_name, kills, deaths, win, length, win_score, lose_score = row
+    line = '%s  %s (%s)' % (event_date.strftime('%m/%d/%Y'), title, game_name)
+    if kills is None:
+        return line + ': no performance recorded'
+    return line + ': %s %d-%d, %d/%d K/D, %d min' % ('won' if win == 1 else 'lost', win_score, lose_score, kills,
+                                                     deaths, length)
+
+
+def format_history_page(display_name, page, number):
+    """
+    Formats a page of a player's history as a message
+    :param display_name: display name of the player
+    :param page: (list of rows, start of the next page or None)
+    :param number: page number, starting at 1
+    :return: message text
+    """
+    rows, next_start = page
+    lines = ['History of %s, page %d%s:' % (display_name, number, '' if next_start is None else ' (%s for more)'
+                                            % NEXT_PAGE)]
+    lines.extend(format_history_row(row) for row in rows)
+    return '\n'.join(lines)
+
+
+def sql_history_page(user_id, game_id, start, cursor, size=HISTORY_PAGE_SIZE):
+    """
+    Gets one page of a player's past events, newest first.  Pages are found by the (date, event_id) of the last
+    event of the previous page rather than an offset, so deep pages cost the same as the first.
+    :param user_id: id of the player
+    :param game_id: only list this game's events, None for every game
+    :param start: (date, event_id) of the last event of the previous page, None for the first page
+    :param cursor: cursor object for executing command
+    :param size: events per page
+    :return: (list of rows for format_history_row, start of the next page or None if this is the last page)
+    """
+    command = 'select event.event_id, event.date, event.title, game.name, performance.kills, performance.deaths, ' \
+              'performance.win, performance.length, performance.win_score, performance.lose_score ' \
+              'from registration inner join event on registration.event_id = event.event_id ' \
+              'inner join game on event.game_id = game.game_id ' \
+              'left join performance on performance.event_id = registration.event_id ' \
+              'and performance.user_id = registration.user_id ' \
+              'where registration.user_id = %s and event.date <= CURDATE()'
+    params = [user_id]
+    if game_id is not None:
+        command += ' and event.game_id = %s'
+        params.append(game_id)
+    if start is not None:
+        command += ' and (event.date < %s or (event.date = %s and event.event_id < %s))'
+        params.extend([start[0], start[0], start[1]])
+
+    cursor.execute(command + ' order by event.date desc, event.event_id desc limit %s', params + [size + 1])
+    rows = cursor.fetchall()
+    if len(rows) <= size:       # the extra row only tells whether another page follows
+        return rows, None
+    rows = rows[:size]
+    return rows, (rows[-1][1], rows[-1][0])
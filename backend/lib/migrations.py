@@ -0,0 +1,119 @@
+import configparser
+import os
+import re
+
+import mysql.connector
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Database', 'migrations')
+MIGRATION_NAME = re.compile(r'^(\d+)_(\w+)\.sql$')      # 001_hot_query_indexes.sql
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """
+    Lists the migration files of a directory in the order they are applied
+    :param directory: directory of NNN_name.sql files
+    :return: list of (version, name, path) sorted by version
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_NAME.match(filename)
+        if match is not None:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(set(versions)) != len(versions):
+        raise DuplicateMigrationError(versions)
+    return migrations
+
+
+def split_statements(text):
+    """
+    Splits a migration file into statements, dropping comment lines
+    :param text: contents of the migration file
+    :return: list of statements without their trailing semicolons
+    """
+    lines = [line for line in text.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip() != '']
+
+
+def sql_applied_migrations(cursor):
+    """
+    Gets the versions of the migrations already applied, creating the table that records them if needed
+    :param cursor: cursor object for executing command
+    :return: set of versions
+    """
+    cursor.execute('create table if not exists schema_migrations ('
+                   'version INT NOT NULL, '
+                   'name VARCHAR(100) NOT NULL, '
+                   'applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, '
+                   'PRIMARY KEY (version))')
+    cursor.execute('select version from schema_migrations')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def sql_migrate(cursor, cnx, directory=MIGRATIONS_DIR):
+    """
+    Applies every migration that has not been applied yet, in version order.  MySQL commits schema changes as they
+    run, so a migration that fails halfway is not recorded and has to be fixed by hand before it is run again.
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :param directory: directory of NNN_name.sql files
+    :return: list of names of the migrations applied
+    """
+    applied = sql_applied_migrations(cursor)
+    names = []
+    for version, name, path in list_migrations(directory):
+        if version in applied:
+            continue
+        with open(path) as migration:
+            for statement in split_statements(migration.read()):
+                cursor.execute(statement)
+        cursor.execute('insert into schema_migrations (version, name) values (%s, %s)', (version, name))
+        cnx.commit()
+        names.append('%03d_%s' % (version, name))
+    return names
+
+
+async def migrate(db, directory=MIGRATIONS_DIR):
+    """
+    Applies pending migrations on one of the bot's pooled connections
+    :param db: Database object
+    :param directory: directory of NNN_name.sql files
+    :return: list of names of the migrations applied
+    """
+    async with db.unit_of_work() as uow:
+        return await uow.run(sql_migrate, uow.cursor, uow.cnx, directory)
+
+
+def main():
+    config = configparser.ConfigParser()  # read and parse configuration file
+    config.read(r'configuration.conf')
+
+    cnx = mysql.connector.connect(user=config['Database']['username'],
+                                  password=config['Database']['password'],
+                                  host=config['Database']['host'],
+                                  database=config['Database']['database'])  # connect to the database
+    cursor = cnx.cursor()
+    for name in sql_migrate(cursor, cnx):
+        print('Applied ' + name)
+    cursor.close()
+    cnx.close()
+
+
+# ERRORS #
+
+
+class Error(Exception):
+    """Base class for exceptions in this module."""
+
+
+class DuplicateMigrationError(Error):
+    """Two migration files have the same version"""
+
+    def __init__(self, versions):
+        self.versions = versions
+
+
+if __name__ == '__main__':
+    main()
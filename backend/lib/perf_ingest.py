@@ -0,0 +1,139 @@
+import codecs
+import csv
+import io
+import zipfile
+
+PERF_HEADER = ('user_id', 'event_id', 'kills', 'deaths', 'win', 'length', 'win_score', 'lose_score')
+MAX_SHEET_SIZE = 64 * 2 ** 20       # bytes a sheet inside an archive may unpack to
+
+
+async def csv_rows(chunks):
+    """
+    Parses CSV rows out of a stream of bytes as it arrives.  Only the current record is held in memory; a quoted
+    field may contain commas and line breaks, even across chunks.
+    :param chunks: async iterable of bytes chunks of a UTF-8 CSV file
+    :return: async generator of rows (lists of strings); blank lines are skipped
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''        # text after the last line break
+    record = []     # lines of the record being read
+    quotes = 0      # quote characters in those lines, odd while inside a quoted field
+
+    async for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                row = parse_record(record)
+                record, quotes = [], 0
+                if row:
+                    yield row
+
+    record.append(pending + decoder.decode(b'', final=True))
+    row = parse_record(record)
+    if row:
+        yield row
+
+
+def parse_record(lines):
+    """
+    Parses one CSV record
+    :param lines: lines of the record, without line breaks
+    :return: list of field strings, empty list for a blank line
+    """
+    text = '\n'.join(lines)
+    if text.endswith('\r'):
+        text = text[:-1]
+    if text.strip() == '':
+        return []
+    return next(csv.reader([text]))
+
+
+async def perf_records(rows):
+    """
+    Turns parsed CSV rows of a performance sheet into performance records
+    :param rows: async iterable of rows, the first being the header
+    :return: async generator of record dictionaries keyed by header column
+    """
+    head = None
+    async for row in rows:
+        if head is None:
+            head = perf_head(row)
+        else:
+            yield perf_record(head, row)
+
+    if head is None:    # empty file
+        raise MissingHeaderError
+
+
+def read_perf_sheet(text):
+    """
+    Reads every performance record of a sheet from a text file
+    :param text: text file object opened with newline=''
+    :return: list of record dictionaries
+    """
+    rows = (row for row in csv.reader(text) if any(field.strip() != '' for field in row))
+    head = perf_head(next(rows, None))
+    return [perf_record(head, row) for row in rows]
+
+
+def read_perf_archive(archive, name):
+    """
+    Reads the performance sheets in a zip archive.  A sheet that cannot be read does not stop the others.
+    :param archive: file object of the zip archive
+    :param name: name of the archive, prefixed to the names of its sheets
+    :return: list of (sheet name, list of records or None, error message or None)
+    """
+    sheets = []
+    with zipfile.ZipFile(archive) as zipped:
+        for info in zipped.infolist():
+            sheet_name = '%s/%s' % (name, info.filename)
+            if info.is_dir():
+                continue
+            if not info.filename.lower().endswith('.csv'):
+                sheets.append((sheet_name, None, 'not a csv file'))
+            elif info.file_size > MAX_SHEET_SIZE:
+                sheets.append((sheet_name, None, 'larger than %d MB' % (MAX_SHEET_SIZE // 2 ** 20)))
+            else:
+                try:
+                    with zipped.open(info) as raw:
+                        records = read_perf_sheet(io.TextIOWrapper(raw, 'utf-8-sig', newline=''))
+                except MissingHeaderError:
+                    sheets.append((sheet_name, None, 'no header'))
+                except (csv.Error, UnicodeDecodeError, zipfile.BadZipFile, RuntimeError, NotImplementedError):
+                    # RuntimeError: encrypted sheet, NotImplementedError: unsupported compression such as deflate64
+                    sheets.append((sheet_name, None, 'could not be read'))
+                else:
+                    sheets.append((sheet_name, records, None))
+    return sheets
+
+
+def perf_head(row):
+    """
+    Checks the header row of a performance sheet
+    :param row: first row of the sheet, None if the sheet is empty
+    :return: list of column names
+    """
+    if row is None:
+        raise MissingHeaderError
+    head = [column.strip() for column in row]
+    if not set(PERF_HEADER).issubset(head):
+        raise MissingHeaderError
+    return head
+
+
+def perf_record(head, row):
+    """
+    Turns a row of a performance sheet into a performance record, leaving values to be checked by perf_validation
+    :param head: column names of the sheet
+    :param row: list of field strings
+    :return: record dictionary of field strings keyed by column name
+    """
+    return dict(zip(head, row))
+
+
+class MissingHeaderError(Exception):
+    """Performance sheet does not start with the performance columns"""
+    pass
@@ -0,0 +1,193 @@
+import threading
+
+ROLLUP_COLUMNS = ('games', 'kills', 'deaths', 'wins', 'minutes', 'margin')
+REBUILD_CHUNK_SIZE = 500        # rollup rows written per statement by a rebuild
+ROLLUP_TABLES = {       # rollup table -> key columns
+    'perf_rollup_user_game': ('user_id', 'game_id'),
+    'perf_rollup_game_period': ('game_id', 'period'),
+}
+ROLLUP_KEYS = {      # rollup table -> its key columns computed from performance joined with event
+    'perf_rollup_user_game': 'performance.user_id, event.game_id',
+    'perf_rollup_game_period': 'event.game_id, DATE_SUB(event.date, INTERVAL DAYOFMONTH(event.date) - 1 DAY)',
+}
+ROLLUP_SUMS = 'count(*), sum(performance.kills), sum(performance.deaths), sum(performance.win), ' \
+              'sum(performance.length), sum(case when performance.win = 1 ' \
+              'then performance.win_score - performance.lose_score ' \
+              'else performance.lose_score - performance.win_score end)'
+
+
+class RollupChanges:
+    def __init__(self):
+        """
+        Counts rollup changes the stats caches cannot follow row by row (events deleted with their performance).
+        Caches built from the rollups compare the count with the one they were built at and drop everything when
+        it moved.  Deletes run on the database worker threads, so bumping takes a lock.
+        """
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def bump(self):
+        """
+        Records a committed rollup change
+        :return: void
+        """
+        with self.lock:
+            self.generation += 1
+
+
+removed_rollups = RollupChanges()       # bumped once an event's performance was taken out of the rollups
+
+
+class RollupDelta:
+    def __init__(self, events):
+        """
+        Changes to the rollup tables caused by a batch of performance writes
+        :param events: dictionary of event id -> (game id, first day of the event's month)
+        """
+        self.events = events
+        self.tables = {table: {} for table in ROLLUP_TABLES}      # table -> key -> list of column changes
+
+    def add(self, record, sign=1):
+        """
+        Adds (or, with sign -1, subtracts) a performance record's contribution
+        :param record: performance record dictionary
+        :param sign: 1 to add, -1 to subtract
+        :return: void
+        """
+        if record['event_id'] not in self.events:   # performance of deleted events is not rolled up
+            return
+
+        game_id, period = self.events[record['event_id']]
+        margin = record['win_score'] - record['lose_score']
+        if record['win'] != 1:
+            margin = -margin
+        values = (1, record['kills'], record['deaths'], record['win'], record['length'], margin)
+
+        for table, key in (('perf_rollup_user_game', (record['user_id'], game_id)),
+                           ('perf_rollup_game_period', (game_id, period))):
+            totals = self.tables[table].setdefault(key, [0] * len(ROLLUP_COLUMNS))
+            for i, value in enumerate(values):
+                totals[i] += sign * value
+
+    def remove(self, record):
+        """
+        Subtracts a performance record's contribution
+        :param record: performance record dictionary
+        :return: void
+        """
+        self.add(record, -1)
+
+
+def sql_get_event_periods(event_ids, cursor):
+    """
+    Gets the game and month of events
+    :param event_ids: list of event ids
+    :param cursor: cursor object for executing command
+    :return: dictionary of event id -> (game id, first day of the event's month)
+    """
+    if len(event_ids) == 0:
+        return {}
+    cursor.execute('select event_id, game_id, date from event where event_id in (%s)' %
+                   ', '.join(['%s'] * len(event_ids)), list(event_ids))
+    return {event_id: (game_id, event_date.replace(day=1)) for event_id, game_id, event_date in cursor.fetchall()}
+
+
+def sql_apply_rollup_delta(delta, cursor):
+    """
+    Adds a batch's changes to the rollup tables, without committing
+    :param delta: RollupDelta object
+    :param cursor: cursor object for executing command
+    :return: void
+    """
+    for table in ROLLUP_TABLES:
+        sql_add_rollup_rows(table, [key + tuple(totals) for key, totals in delta.tables[table].items()
+                                    if any(totals)], cursor)
+
+
+def sql_add_rollup_rows(table, rows, cursor):
+    """
+    Adds totals to rows of a rollup table, creating missing rows
+    :param table: name of the rollup table
+    :param rows: list of (key columns..., games, kills, deaths, wins, minutes, margin) tuples
+    :param cursor: cursor object for executing command
+    :return: void
+    """
+    if len(rows) == 0:
+        return
+    columns = ROLLUP_TABLES[table] + ROLLUP_COLUMNS
+    cursor.execute('insert into %s (%s) values %s on duplicate key update %s' %
+                   (table, ', '.join(columns), ', '.join(['(%s)' % ', '.join(['%s'] * len(columns))] * len(rows)),
+                    ', '.join('%s = %s + values(%s)' % (column, column, column) for column in ROLLUP_COLUMNS)),
+                   [value for row in rows for value in row])
+
+
+def sql_recompute_rollup(table, event_id, cursor):
+    """
+    Computes rollup rows straight from the performance table
+    :param table: name of the rollup table
+    :param event_id: only count this event's performance, None for every event
+    :param cursor: cursor object for executing command
+    :return: list of (key columns..., games, kills, deaths, wins, minutes, margin) tuples of ints (keys as fetched)
+    """
+    command = 'select %s, %s from performance inner join event on performance.event_id = event.event_id' % \
+              (ROLLUP_KEYS[table], ROLLUP_SUMS)
+    group = ' group by %s' % ', '.join(str(i + 1) for i in range(len(ROLLUP_TABLES[table])))
+    if event_id is None:
+        cursor.execute(command + group)
+    else:
+        cursor.execute(command + ' where performance.event_id = %s' + group, (event_id,))
+    keys = len(ROLLUP_TABLES[table])
+    return [tuple(row[:keys]) + tuple(int(value) for value in row[keys:]) for row in cursor.fetchall()]
+
+
+def sql_remove_event_rollups(event_id, cursor):
+    """
+    Subtracts an event's performance from the rollup tables, for an event that is about to be deleted, without
+    committing so the change lands with the deletion.  Bump removed_rollups once it is committed.
+    :param event_id: id of the event
+    :param cursor: cursor object for executing command
+    :return: void
+    """
+    for table, keys in ROLLUP_TABLES.items():
+        rows = sql_recompute_rollup(table, event_id, cursor)
+        sql_add_rollup_rows(table, [row[:len(keys)] + tuple(-value for value in row[len(keys):]) for row in rows],
+                            cursor)
+
+
+def sql_rebuild_rollups(cursor, cnx):
+    """
+    Recomputes the rollup tables from the whole performance table
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: dictionary of rollup table -> number of rows
+    """
+    counts = {}
+    for table in ROLLUP_TABLES:
+        rows = sql_recompute_rollup(table, None, cursor)
+        cursor.execute('delete from %s' % table)
+        for start in range(0, len(rows), REBUILD_CHUNK_SIZE):
+            sql_add_rollup_rows(table, rows[start:start + REBUILD_CHUNK_SIZE], cursor)
+        counts[table] = len(rows)
+    cnx.commit()
+    return counts
+
+
+def sql_check_rollups(cursor):
+    """
+    Compares the rollup tables against a full recompute from the performance table
+    :param cursor: cursor object for executing command
+    :return: dictionary of rollup table -> list of (key, stored totals, recomputed totals) for every key that
+    differs, totals being None where a row is missing
+    """
+    mismatches = {}
+    for table, keys in ROLLUP_TABLES.items():
+        cursor.execute('select %s from %s' % (', '.join(keys + ROLLUP_COLUMNS), table))
+        stored = {tuple(row[:len(keys)]): tuple(int(value) for value in row[len(keys):])
+                  for row in cursor.fetchall()}
+        recomputed = {row[:len(keys)]: row[len(keys):] for row in sql_recompute_rollup(table, None, cursor)}
+
+        empty = (0,) * len(ROLLUP_COLUMNS)      # rows whose contributions were all removed
+        mismatches[table] = [(key, stored.get(key), recomputed.get(key))
+                             for key in sorted(set(stored) | set(recomputed))
+                             if stored.get(key, empty) != recomputed.get(key, empty)]
+    return mismatches
@@ -0,0 +1,119 @@
+import re
+
+import numpy as np
+
+from backend.lib.perf_ingest import PERF_HEADER
+
+INT_MAX = 2 ** 31 - 1       # largest value of an INT column
+BIGINT_MAX = 2 ** 63 - 1        # largest value of a BIGINT column
+PERF_RANGES = {     # column -> (smallest, largest) allowed value
+    'user_id': (1, BIGINT_MAX),
+    'event_id': (1, BIGINT_MAX),
+    'kills': (0, INT_MAX),
+    'deaths': (0, INT_MAX),
+    'win': (0, 1),
+    'length': (0, INT_MAX),
+    'win_score': (0, INT_MAX),
+    'lose_score': (0, INT_MAX),
+}
+FIRST_ROW = 2       # sheet row of the first record (the header is row 1)
+ROWS_SHOWN = 5      # rows listed per problem in a report
+LOOKUP_CHUNK_SIZE = 1000        # ids per IN (...) lookup
+ASCII_DIGITS = re.compile(r'[0-9]+')        # str.isdigit also accepts digits int() cannot parse, such as '²'
+
+
+def check_perf_columns(records):
+    """
+    Loads a sheet's records column by column into integer arrays and checks every value at once: each must be a
+    whole number in its column's range, and no (user_id, event_id) pair may appear twice
+    :param records: list of record dictionaries of field strings
+    :return: (dictionary of column -> int64 array, list of problems), columns are None if there are problems
+    """
+    if len(records) == 0:
+        return {column: np.zeros(0, dtype=np.int64) for column in PERF_HEADER}, []
+
+    columns, problems = {}, []
+    for column in PERF_HEADER:
+        text = np.char.strip(np.array([record.get(column, '') for record in records], dtype=str))
+        digits = np.where(np.char.startswith(text, '-'), np.char.replace(text, '-', '', 1), text)
+        lengths = np.char.str_len(digits)
+        ascii_digits = np.array([ASCII_DIGITS.fullmatch(value) is not None for value in digits.tolist()], dtype=bool)
+        numeric = ascii_digits & ((lengths < 19) | ((lengths == 19) & (digits <= str(BIGINT_MAX))))
+
+        values = np.where(numeric, text, '0').astype(np.int64)
+        smallest, largest = PERF_RANGES[column]
+        in_range = (values >= smallest) & (values <= largest)
+
+        report(problems, column, 'is missing', text == '')
+        report(problems, column, 'is not a whole number', ~numeric & (text != ''))
+        report(problems, column, 'is not between %d and %d' % (smallest, largest), numeric & ~in_range)
+        columns[column] = values
+
+    if len(problems) == 0:
+        pairs = np.stack([columns['user_id'], columns['event_id']], axis=1)
+        _, inverse, counts = np.unique(pairs, axis=0, return_inverse=True, return_counts=True)
+        report(problems, 'user_id, event_id', 'appears more than once', counts[inverse.reshape(-1)] > 1)
+
+    return (columns if len(problems) == 0 else None), problems
+
+
+def sql_check_perf_references(columns, cursor):
+    """
+    Checks that every user and event of a sheet exists, looking ids up in batches
+    :param columns: dictionary of column -> int64 array from check_perf_columns
+    :param cursor: cursor object for executing command
+    :return: list of problems
+    """
+    problems = []
+    for column, table in (('user_id', 'user'), ('event_id', 'event')):
+        ids = np.unique(columns[column]).tolist()
+        found = []
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + LOOKUP_CHUNK_SIZE]
+            cursor.execute('select %s from %s where %s in (%s)' %
+                           (column, table, column, ', '.join(['%s'] * len(chunk))), chunk)
+            found.extend(row[0] for row in cursor.fetchall())
+        report(problems, column, 'does not exist', ~np.isin(columns[column], np.array(found, dtype=np.int64)))
+    return problems
+
+
+def perf_column_records(columns):
+    """
+    Turns checked columns back into performance records
+    :param columns: dictionary of column -> int64 array from check_perf_columns
+    :return: list of record dictionaries of ints
+    """
+    return [dict(zip(PERF_HEADER, row)) for row in zip(*(columns[column].tolist() for column in PERF_HEADER))]
+
+
+def sql_validate_perf_sheet(records, cursor):
+    """
+    Checks a whole sheet before anything is written
+    :param records: list of record dictionaries of field strings
+    :param cursor: cursor object for executing command
+    :return: (list of record dictionaries of ints or None, list of problems)
+    """
+    columns, problems = check_perf_columns(records)
+    if len(problems) == 0:
+        problems = sql_check_perf_references(columns, cursor)
+    if len(problems) > 0:
+        return None, problems
+    return perf_column_records(columns), problems
+
+
+def report(problems, column, problem, failed):
+    """
+    Adds a problem found in some rows to a report
+    :param problems: list of problems to add to
+    :param column: column the problem is in
+    :param problem: description of the problem
+    :param failed: boolean array, True for each record with the problem
+    :return: void
+    """
+    rows = np.flatnonzero(failed)
+    if len(rows) == 0:
+        return
+    shown = ', '.join(str(row + FIRST_ROW) for row in rows[:ROWS_SHOWN].tolist())
+    if len(rows) > ROWS_SHOWN:
+        shown += ' and %d more' % (len(rows) - ROWS_SHOWN)
+    problems.append('%s %s (row%s %s)' % (column, problem, 's' if len(rows) > 1 else '', shown))
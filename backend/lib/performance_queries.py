@@ -1,57 +1,340 @@
 from discord.ext import commands
 from discord import File as dFile
 from backend.lib.helper_commands import check_admin_status, get_id_from_title, get_registrations, InvalidEventTitleError, RegistrationEmptyError, AdminPermissionError
-from urllib import request
+from backend.lib.helper_commands import get_game_id, get_id_from_name, GameNotFoundError, UserNotFoundError
+from backend.lib.player_stats import StatsCache, format_stats, sql_game_stats, sql_user_stats, sql_get_event_games
+from backend.lib.perf_ingest import csv_rows, perf_records, read_perf_archive, MissingHeaderError
+from backend.lib.perf_validation import sql_validate_perf_sheet
+from backend.lib.perf_rollups import RollupDelta, sql_get_event_periods, sql_apply_rollup_delta, \
+    sql_rebuild_rollups, sql_check_rollups
+from backend.lib.ratings import sql_update_ratings, sql_recompute_ratings, sql_get_ratings
+from backend.lib.leaderboard import Leaderboards, LEADERBOARD_METRICS, LEADERBOARD_DEFAULT, sql_get_game_rollups, \
+    sql_get_player_rollups
+from backend.lib.match_history import PageCache, format_history_page, sql_history_page, HISTORY_TIMEOUT, \
+    PREVIOUS_PAGE, NEXT_PAGE
+from backend.lib.channel_sender import pack_lines
+from discord.errors import Forbidden
+from mysql.connector.errors import Error as DatabaseError
 from io import BytesIO
+import asyncio
+import aiohttp
+import csv
+import tempfile
+import zipfile
+
+PERF_COLUMNS = ('event_id', 'user_id', 'kills', 'deaths', 'win', 'length', 'win_score', 'lose_score')
+PERF_CHUNK_SIZE = 500       # performance records written per upsert statement
+DOWNLOAD_CHUNK_SIZE = 64 * 1024     # bytes read from an attachment at a time
+SPOOL_SIZE = 8 * 2 ** 20        # bytes of a downloaded archive kept in memory before it moves to disk
+INGEST_WORKERS = 4      # attachments downloaded and parsed at once
+DOWNLOAD_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) '
+                                  'Chrome/41.0.2228.0 Safari/537.3'}
 
 
 class PerformanceQueries(commands.Cog):
-    def __init__(self, bot, cursor, cnx):
+    def __init__(self, bot, db):
         self.bot = bot
-        self.cursor = cursor
-        self.cnx = cnx
+        self.db = db
+        self.stats = StatsCache()
+        self.leaderboards = Leaderboards()
+        self.history_pages = PageCache()
 
     @commands.command()
     async def perf_update(self, ctx):
         """
-               Update Performance
-               :return: number of records updated
+               Update Performance from every attached sheet (csv) and archive of sheets (zip)
+               :return: number of records updated and inserted per sheet
         """
-        user = str(ctx.author)
         try:
-            check_admin_status(user, True, self.cursor)
+            async with self.db.unit_of_work() as uow:
+                await uow.run(check_admin_status, ctx.author.id, True, uow.cursor)
             if len(ctx.message.attachments) > 0:
-                file_url = ctx.message.attachments[0].url
-                if file_url[-3:].lower() == 'csv':
-                    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) '
-                                             'Chrome/41.0.2228.0 Safari/537.3'}
-                    req = request.Request(url=file_url, headers=headers)
-                    file_pointer = request.urlopen(req)
-                    file = file_pointer.readlines()
-                    if file[0].index(b'user_id,event_id,kills,deaths,win,length,win_score,lose_score') > -1:
-                        records = csv2dicts(file)
-                        inserts, updates = 0, 0
-                        for record in records:
-                            u = sql_perf_update(record, self.cursor, self.cnx)
-                            if u:
-                                updates = updates+1
-                            else:
-                                inserts = inserts+1
-                        msg = "%s records were updated, %s new records were inserted" % (updates, inserts)
-                        await ctx.send(msg)
-                    else:
-                        await ctx.send("File has no header")
-                else:
-                    await ctx.send("File attached is not a csv")
+                slots = asyncio.Semaphore(INGEST_WORKERS)   # attachments downloaded and parsed at once
+                read = await asyncio.gather(*(read_attachment(attachment, slots)
+                                              for attachment in ctx.message.attachments))
+
+                summary = []
+                inserts, updates = 0, 0
+                self.leaderboards.begin()     # boards read before the commit must not be cached
+                try:
+                    async with self.db.unit_of_work() as uow:     # one transaction for every sheet
+                        sheets = []
+                        for name, records, error in [sheet for sheets in read for sheet in sheets]:
+                            if error is None:   # check every sheet before anything is written
+                                records, problems = await uow.run(sql_validate_perf_sheet, records, uow.cursor)
+                                if len(problems) > 0:
+                                    error = '%d problem%s: %s' % (len(problems), 's' if len(problems) > 1 else '',
+                                                                  '; '.join(problems))
+                            sheets.append((name, records, error))
+
+                        users, events = set(), set()     # touched by the written sheets
+                        for name, records, error in sheets:
+                            if error is None:
+                                try:
+                                    i, u = await uow.run(sql_perf_write_sheet, records, uow.cursor)
+                                except DatabaseError:
+                                    error = 'could not be written'
+                                else:
+                                    inserts, updates = inserts + i, updates + u
+                                    summary.append('%s: %s updated, %s inserted' % (name, u, i))
+                                    users.update(record['user_id'] for record in records)
+                                    events.update(record['event_id'] for record in records)
+                            if error is not None:
+                                summary.append('%s: skipped, %s' % (name, error))
+                        games = await uow.run(sql_get_event_games, list(events), uow.cursor)
+                        await uow.run(sql_update_ratings, list(events), uow.cursor)
+                        totals = await uow.run(sql_get_player_rollups, list(users),
+                                               list(games & self.leaderboards.games()), uow.cursor)
+                        await uow.run(uow.cnx.commit)
+                    self.stats.invalidate(users, games)
+                    self.leaderboards.update(totals)
+                    self.history_pages.invalidate(users)
+                finally:
+                    self.leaderboards.end()
+
+                summary.append("%s records were updated, %s new records were inserted" % (updates, inserts))
+                for msg in pack_lines(summary):
+                    await ctx.send(msg)
             else:
                 await ctx.send("No file attached")
         except AdminPermissionError:
             await ctx.send("You do not have the necessary permissions")
 
+    @commands.command()
+    async def game_stats(self, ctx, game_name):
+        """
+        Get the stats of every player of a game
+        :param game_name: game's title
+        :return: K/D, win rate, average score margin and per-minute rates of each player, best K/D first
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                game_id = await uow.run(get_game_id, game_name, uow.cursor)
+                stats = self.stats.get(('game', game_id))
+                if stats is None:
+                    version = self.stats.version
+                    stats = await uow.run(sql_game_stats, game_id, uow.cursor)
+                    self.stats.put(('game', game_id), stats, version)
+        except GameNotFoundError:
+            await ctx.send("No game found with the name '%s'" % game_name)
+        else:
+            if len(stats) == 0:
+                await ctx.send("No performance has been recorded for %s" % game_name)
+            for msg in pack_lines([format_stats(name, player) for name, player in stats]):
+                await ctx.send(msg)
+
+    @commands.command()
+    async def player_stats(self, ctx, display_name):
+        """
+        Get a player's stats in every game they played
+        :param display_name: player's display name
+        :return: K/D, win rate, average score margin and per-minute rates per game
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                user_id = await uow.run(get_id_from_name, display_name, uow.cursor)
+                stats = self.stats.get(('user', user_id))
+                if stats is None:
+                    version = self.stats.version
+                    stats = await uow.run(sql_user_stats, user_id, uow.cursor)
+                    self.stats.put(('user', user_id), stats, version)
+        except UserNotFoundError:
+            await ctx.send("No user found with the name '%s'" % display_name)
+        else:
+            if len(stats) == 0:
+                await ctx.send("No performance has been recorded for %s" % display_name)
+            for msg in pack_lines([format_stats(name, game) for name, game in stats]):
+                await ctx.send(msg)
+
+    @commands.command()
+    async def leaderboard(self, ctx, game_name, metric, k=str(LEADERBOARD_DEFAULT)):
+        """
+        Get the best players of a game in one metric
+        :param game_name: game's title
+        :param metric: stat to rank players by
+        :param k: (optional) number of players to list
+        :return: the k best players and their scores, best first
+        """
+        if metric not in LEADERBOARD_METRICS:
+            await ctx.send("Error: metric must be one of %s" % ', '.join(LEADERBOARD_METRICS))
+            return
+        if not k.isdigit() or not 0 < int(k) <= self.leaderboards.size:
+            await ctx.send("Error: k must be a number from 1 to %d" % self.leaderboards.size)
+            return
+
+        try:
+            async with self.db.unit_of_work() as uow:
+                game_id = await uow.run(get_game_id, game_name, uow.cursor)
+                board = self.leaderboards.get(game_id, metric)
+                if board is None:
+                    version = self.leaderboards.version
+                    rows = await uow.run(sql_get_game_rollups, game_id, uow.cursor)
+                    board = self.leaderboards.put(game_id, rows, version)[metric]
+        except GameNotFoundError:
+            await ctx.send("No game found with the name '%s'" % game_name)
+        else:
+            top = board.top(int(k))
+            if len(top) == 0:
+                await ctx.send("No performance has been recorded for %s" % game_name)
+            lines = ['%s leaderboard, %s:' % (game_name, metric)] if len(top) > 0 else []
+            lines.extend('%d. %s: %g' % (rank, name, round(score, 2)) for rank, (name, score) in enumerate(top, 1))
+            for msg in pack_lines(lines):
+                await ctx.send(msg)
+
+    @commands.command()
+    async def history(self, ctx, display_name, game_name=None):
+        """
+        Get a player's past events and performance, a page at a time
+        :param display_name: player's display name
+        :param game_name: (optional) only list this game's events
+        :return: newest events first; react with the arrows to turn pages
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                user_id = await uow.run(get_id_from_name, display_name, uow.cursor)
+                game_id = None if game_name is None else await uow.run(get_game_id, game_name, uow.cursor)
+        except UserNotFoundError:
+            await ctx.send("No user found with the name '%s'" % display_name)
+            return
+        except GameNotFoundError:
+            await ctx.send("No game found with the name '%s'" % game_name)
+            return
+
+        starts = [None]     # start of every page seen so far, so turning back needs no offset
+        number = 0
+        page = await self.history_page(user_id, game_id, None)
+        if len(page[0]) == 0:
+            await ctx.send("No past events found for %s" % display_name)
+            return
+        message = await ctx.send(format_history_page(display_name, page, 1))
+        if page[1] is None:     # only one page
+            return
+        await message.add_reaction(PREVIOUS_PAGE)
+        await message.add_reaction(NEXT_PAGE)
+
+        def turned(reaction, user):
+            return reaction.message.id == message.id and user.id == ctx.author.id and \
+                str(reaction.emoji) in (PREVIOUS_PAGE, NEXT_PAGE)
+
+        while True:
+            try:
+                reaction, user = await self.bot.wait_for('reaction_add', check=turned, timeout=HISTORY_TIMEOUT)
+            except asyncio.TimeoutError:
+                return
+
+            if str(reaction.emoji) == NEXT_PAGE and page[1] is not None:
+                number += 1
+                if number == len(starts):
+                    starts.append(page[1])
+            elif str(reaction.emoji) == PREVIOUS_PAGE and number > 0:
+                number -= 1
+            else:
+                continue
+
+            page = await self.history_page(user_id, game_id, starts[number])
+            await message.edit(content=format_history_page(display_name, page, number + 1))
+            try:
+                await message.remove_reaction(reaction.emoji, user)
+            except Forbidden:   # without manage messages the user removes their reaction themselves
+                pass
+
+    async def history_page(self, user_id, game_id, start):
+        """
+        Get a page of a player's history, from the page cache if it was read recently
+        :param user_id: id of the player
+        :param game_id: id of the game to list, None for every game
+        :param start: (date, event_id) the page starts after, None for the first page
+        :return: (list of rows, start of the next page or None)
+        """
+        key = (user_id, game_id, start)
+        page = self.history_pages.get(key)
+        if page is None:
+            version = self.history_pages.version
+            async with self.db.unit_of_work() as uow:
+                page = await uow.run(sql_history_page, user_id, game_id, start, uow.cursor)
+            self.history_pages.put(key, page, version)
+        return page
+
+    @commands.command()
+    async def ratings(self, ctx, game_name):
+        """
+        Get the ratings of a game's players, computed from recorded wins and losses
+        :param game_name: game's title
+        :return: every rated player's rating and number of rated events, best first
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                game_id = await uow.run(get_game_id, game_name, uow.cursor)
+                ratings = await uow.run(sql_get_ratings, game_id, uow.cursor)
+        except GameNotFoundError:
+            await ctx.send("No game found with the name '%s'" % game_name)
+        else:
+            if len(ratings) == 0:
+                await ctx.send("No ratings have been computed for %s" % game_name)
+            lines = ['%d. %s: %d (%d events)' % (rank, name, round(rating), games)
+                     for rank, (name, rating, games) in enumerate(ratings, 1)]
+            for msg in pack_lines(lines):
+                await ctx.send(msg)
+
+    @commands.command()
+    async def recompute_ratings(self, ctx):
+        """
+        Recompute every rating from all recorded performance
+        :return: number of results rated
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                await uow.run(check_admin_status, ctx.author.id, True, uow.cursor)
+                count = await uow.run(sql_recompute_ratings, None, uow.cursor)
+                await uow.run(uow.cnx.commit)
+        except AdminPermissionError:
+            await ctx.send("You do not have the necessary permissions")
+        else:
+            await ctx.send('Recomputed ratings from %d results' % count)
+
+    @commands.command()
+    async def rebuild_rollups(self, ctx):
+        """
+        Recompute the stats rollup tables from all recorded performance
+        :return: number of rollup rows written
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                await uow.run(check_admin_status, ctx.author.id, True, uow.cursor)
+                counts = await uow.run(sql_rebuild_rollups, uow.cursor, uow.cnx)
+        except AdminPermissionError:
+            await ctx.send("You do not have the necessary permissions")
+        else:
+            self.stats.invalidate_all()
+            self.leaderboards.invalidate_all()
+            await ctx.send('Rebuilt rollups: ' + ', '.join('%s rows in %s' % (count, table)
+                                                          for table, count in counts.items()))
+
+    @commands.command()
+    async def check_rollups(self, ctx):
+        """
+        Compare the stats rollup tables against a full recompute
+        :return: number of mismatched rollup rows, with a few examples
+        """
+        try:
+            async with self.db.unit_of_work() as uow:
+                await uow.run(check_admin_status, ctx.author.id, True, uow.cursor)
+                mismatches = await uow.run(sql_check_rollups, uow.cursor)
+        except AdminPermissionError:
+            await ctx.send("You do not have the necessary permissions")
+        else:
+            lines = []
+            for table, rows in mismatches.items():
+                lines.append('%s: %s mismatched rows' % (table, len(rows)))
+                lines.extend('    %s: stored %s, recomputed %s' % row for row in rows[:5])
+            for msg in pack_lines(lines):
+                await ctx.send(msg)
+
     @commands.command()
     async def perf_template(self, ctx, event_name):
         try:
-            filename, fil = sql_fetch_template(self, event_name)
+            async with self.db.unit_of_work() as uow:
+                filename, fil = await uow.run(sql_fetch_template, event_name, uow.cursor)
         except InvalidEventTitleError:
             await ctx.send("No event found with the title '%s'" % event_name)
         except RegistrationEmptyError:
@@ -61,10 +344,10 @@ class PerformanceQueries(commands.Cog):
             fil.close()
 
 
-def sql_fetch_template(self, event_name):
+def sql_fetch_template(event_name, cursor):
     try:
-        event_id = get_id_from_title(self.cursor, event_name)
-        registered = get_registrations(self.cursor, event_id)
+        event_id = get_id_from_title(event_name, cursor)
+        registered = get_registrations(cursor, event_id)
     except InvalidEventTitleError:
         raise InvalidEventTitleError
     except RegistrationEmptyError:
@@ -81,32 +364,123 @@ def sql_fetch_template(self, event_name):
         return filename, fil
 
 
-def sql_perf_update(data_insert, cursor, cnx):
-    cursor.execute('select count(*) from performance '
-                   'where event_id = %(event_id)s and user_id = %(user_id)s', data_insert)
-    qty = cursor.fetchall()
-    u = False
-    if qty[0][0] == 0:
-        cursor.execute('insert into performance '
-                       '(event_id, user_id, kills, deaths, win, length, win_score, lose_score) '
-                       'values (%(event_id)s, %(user_id)s, %(kills)s, %(deaths)s, %(win)s, %(length)s, '
-                       '%(win_score)s, %(lose_score)s)', data_insert)
-    else:
-        cursor.execute('update performance '
-                       'set kills = %(kills)s, deaths=%(deaths)s, win=%(win)s, length=%(length)s, '
-                       'win_score = %(win_score)s, lose_score=%(lose_score)s '
-                       'where event_id = %(event_id)s and user_id = %(user_id)s', data_insert)
-        u = True
-    cnx.commit()  # commit changes to database
-    return u
-
-def csv2dicts(csvlist):
-    head = csvlist[0]
-    head = head.decode().strip('\n').strip('\r').split(',')
-    dicts = []
-    for line in csvlist[1:]:
-        line = line.decode().strip('\n').strip('\r').split(',')
-        line = [int(x) if x.isnumeric() else x for x in line]
-        dicts.append(dict(zip(head, line)))
-    return dicts
+def sql_perf_upsert(records, cursor):
+    """
+    Inserts or updates a chunk of performance records with one multi-row upsert, without committing.  Records
+    written by earlier chunks of the same transaction already count as stored.  The rollup tables are updated in
+    the same transaction: a replaced record's old contribution is subtracted and the new one added.
+    :param records: list of performance record dictionaries
+    :param cursor: cursor object for executing command
+    :return: (number of records inserted, number of records that updated an existing record)
+    """
+    if len(records) == 0:
+        return 0, 0
+
+    keys = [(record['user_id'], record['event_id']) for record in records]
+    unique = list(set(keys))
+    cursor.execute('select %s from performance where (user_id, event_id) in (%s)' %
+                   (', '.join(PERF_COLUMNS), ', '.join(['(%s, %s)'] * len(unique))),
+                   [value for key in unique for value in key])
+    stored = {}     # key -> record as currently stored
+    for row in cursor.fetchall():
+        record = dict(zip(PERF_COLUMNS, row))
+        stored[(record['user_id'], record['event_id'])] = record
+
+    delta = RollupDelta(sql_get_event_periods(list({key[1] for key in unique}), cursor))
+    inserts, updates = 0, 0
+    for key, record in zip(keys, records):
+        if key in stored:   # stored before, or by an earlier record of this chunk
+            updates += 1
+            delta.remove(stored[key])
+        else:
+            inserts += 1
+        delta.add(record)
+        stored[key] = record
+    sql_apply_rollup_delta(delta, cursor)
+
+    cursor.execute('insert into performance '
+                   '(event_id, user_id, kills, deaths, win, length, win_score, lose_score) values %s '
+                   'on duplicate key update kills = values(kills), deaths = values(deaths), win = values(win), '
+                   'length = values(length), win_score = values(win_score), lose_score = values(lose_score)' %
+                   ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(records)),
+                   [record[column] for record in records for column in PERF_COLUMNS])
+    return inserts, updates
+
+
+async def read_attachment(attachment, slots):
+    """
+    Downloads and parses an attached sheet or archive of sheets
+    :param attachment: Attachment object
+    :param slots: semaphore limiting the attachments read at once
+    :return: list of (sheet name, list of records or None, error message or None)
+    """
+    name = attachment.filename
+    async with slots:
+        try:
+            if name.lower().endswith('.csv'):
+                records = [record async for record in perf_records(csv_rows(download(attachment.url)))]
+                return [(name, records, None)]
+            if name.lower().endswith('.zip'):
+                archive = await spool(download(attachment.url))
+                try:    # unpacking and parsing run on a worker thread
+                    return await asyncio.get_event_loop().run_in_executor(None, read_perf_archive, archive, name)
+                finally:
+                    archive.close()
+            return [(name, None, 'not a csv or zip file')]
+        except MissingHeaderError:
+            return [(name, None, 'no header')]
+        except (aiohttp.ClientError, asyncio.TimeoutError, csv.Error, UnicodeDecodeError, zipfile.BadZipFile):
+            return [(name, None, 'could not be read')]
+
+
+def sql_perf_write_sheet(records, cursor):
+    """
+    Writes the records of one sheet inside the current transaction.  If the sheet fails, only its own writes are
+    undone.
+    :param records: list of performance record dictionaries
+    :param cursor: cursor object for executing command
+    :return: (number of records inserted, number of records updated)
+    """
+    cursor.execute('savepoint perf_sheet')
+    inserts, updates = 0, 0
+    try:
+        for start in range(0, len(records), PERF_CHUNK_SIZE):
+            i, u = sql_perf_upsert(records[start:start + PERF_CHUNK_SIZE], cursor)
+            inserts, updates = inserts + i, updates + u
+    except Exception:
+        cursor.execute('rollback to savepoint perf_sheet')
+        raise
+    cursor.execute('release savepoint perf_sheet')
+    return inserts, updates
+
+
+async def spool(chunks):
+    """
+    Stores a download in a temporary file, in memory while it is small
+    :param chunks: async iterable of bytes chunks
+    :return: temporary file object positioned at its start
+    """
+    loop = asyncio.get_event_loop()
+    spooled = tempfile.SpooledTemporaryFile(SPOOL_SIZE)
+    try:
+        async for chunk in chunks:
+            await loop.run_in_executor(None, spooled.write, chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
 
+async def download(url, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Downloads a file without blocking the event loop
+    :param url: url of the file
+    :param chunk_size: bytes per chunk
+    :return: async generator of bytes chunks
+    """
+    async with aiohttp.ClientSession(headers=DOWNLOAD_HEADERS) as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
@@ -0,0 +1,169 @@
+import numpy as np
+
+from backend.lib.perf_rollups import ROLLUP_COLUMNS, removed_rollups
+
+
+class StatsCache:
+    def __init__(self, changes=removed_rollups):
+        """
+        Computed stats of games and users, kept until a performance write touches that game or user, or an event
+        is deleted
+        :param changes: RollupChanges object counting event deletions
+        """
+        self.entries = {}       # ('game', game_id) or ('user', user_id) -> stats
+        self.version = 0        # bumped by every invalidation
+        self.changes = changes
+        self.generation = changes.generation        # deletions the entries account for
+        self.hits = 0
+        self.misses = 0
+
+    def sync(self):
+        """
+        Drops every cached stat if an event was deleted since the last check
+        :return: void
+        """
+        generation = self.changes.generation
+        if generation != self.generation:
+            self.invalidate_all()
+            self.generation = generation
+
+    def get(self, key):
+        """
+        Gets cached stats
+        :param key: ('game', game_id) or ('user', user_id)
+        :return: stats, None if not cached
+        """
+        self.sync()
+        stats = self.entries.get(key)
+        if stats is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return stats
+
+    def put(self, key, stats, version):
+        """
+        Caches stats, unless performance changed while they were computed
+        :param key: ('game', game_id) or ('user', user_id)
+        :param stats: stats to cache
+        :param version: value of self.version before the stats were read from the database
+        :return: void
+        """
+        self.sync()
+        if version == self.version:
+            self.entries[key] = stats
+
+    def invalidate(self, user_ids, game_ids):
+        """
+        Drops the stats of users and games whose performance changed
+        :param user_ids: iterable of user ids
+        :param game_ids: iterable of game ids
+        :return: void
+        """
+        self.version += 1
+        for user_id in user_ids:
+            self.entries.pop(('user', user_id), None)
+        for game_id in game_ids:
+            self.entries.pop(('game', game_id), None)
+
+    def invalidate_all(self):
+        """
+        Drops every cached stat
+        :return: void
+        """
+        self.version += 1
+        self.entries.clear()
+
+
+def aggregate(keys, columns):
+    """
+    Sums rollup rows per key and derives each key's rates, all with vectorized group operations
+    :param keys: array of group keys, one per row
+    :param columns: dictionary of rollup column -> array, one value per row
+    :return: (array of distinct keys, dictionary of stat name -> array with one value per key)
+    """
+    groups, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    games, kills, deaths, wins, minutes, margin = (np.bincount(inverse, weights=columns[column], minlength=len(groups))
+                                                   .astype(np.float64) for column in ROLLUP_COLUMNS)     # empty is int
+
+    return groups, {
+        'games': games,
+        'kills': kills,
+        'deaths': deaths,
+        'kd': np.divide(kills, deaths, out=kills.copy(), where=deaths > 0),     # K/D is kills when never died
+        'win_rate': np.divide(wins, games, out=np.zeros(len(groups)), where=games > 0),
+        'avg_margin': np.divide(margin, games, out=np.zeros(len(groups)), where=games > 0),
+        'kills_per_minute': np.divide(kills, minutes, out=np.zeros(len(groups)), where=minutes > 0),
+        'deaths_per_minute': np.divide(deaths, minutes, out=np.zeros(len(groups)), where=minutes > 0),
+    }
+
+
+def stat_rows(rows):
+    """
+    Aggregates rollup rows per key
+    :param rows: list of (key, name, games, kills, deaths, wins, minutes, margin) rows
+    :return: list of (name, dictionary of stat name -> value) ordered by K/D, best first
+    """
+    if len(rows) == 0:
+        return []
+
+    table = np.array([row[2:] for row in rows], dtype=np.float64)
+    names = {row[0]: row[1] for row in rows}
+    keys = np.array([row[0] for row in rows], dtype=np.int64)
+    groups, stats = aggregate(keys, {column: table[:, i] for i, column in enumerate(ROLLUP_COLUMNS)})
+
+    order = np.argsort(-stats['kd'], kind='stable')
+    return [(names[int(groups[i])], {name: float(values[i]) for name, values in stats.items()}) for i in order]
+
+
+def format_stats(name, stats):
+    """
+    Formats one player's or game's stats as a line of text
+    :param name: display name or game name
+    :param stats: dictionary of stat name -> value
+    :return: line of text
+    """
+    return '%s: %d games, K/D %.2f (%d/%d), win rate %.0f%%, avg margin %+.1f, %.2f kills/min, %.2f deaths/min' % \
+           (name, stats['games'], stats['kd'], stats['kills'], stats['deaths'], stats['win_rate'] * 100,
+            stats['avg_margin'], stats['kills_per_minute'], stats['deaths_per_minute'])
+
+
+def sql_game_stats(game_id, cursor):
+    """
+    Gets the stats of every player of a game from the rollup table with one query
+    :param game_id: id of the game
+    :param cursor: cursor object for executing command
+    :return: list of (display name, stats) ordered by K/D
+    """
+    cursor.execute('select rollup.user_id, user.display_name, %s from perf_rollup_user_game rollup '
+                   'inner join user on rollup.user_id = user.user_id where rollup.game_id = %%s and rollup.games > 0' %
+                   ', '.join('rollup.' + column for column in ROLLUP_COLUMNS), (game_id,))
+    return stat_rows(cursor.fetchall())
+
+
+def sql_user_stats(user_id, cursor):
+    """
+    Gets the stats of a user in every game they played from the rollup table with one query
+    :param user_id: id of the user
+    :param cursor: cursor object for executing command
+    :return: list of (game name, stats) ordered by K/D
+    """
+    cursor.execute('select rollup.game_id, game.name, %s from perf_rollup_user_game rollup '
+                   'inner join game on rollup.game_id = game.game_id where rollup.user_id = %%s and rollup.games > 0' %
+                   ', '.join('rollup.' + column for column in ROLLUP_COLUMNS), (user_id,))
+    return stat_rows(cursor.fetchall())
+
+
+def sql_get_event_games(event_ids, cursor):
+    """
+    Gets the games of events
+    :param event_ids: list of event ids
+    :param cursor: cursor object for executing command
+    :return: set of game ids
+    """
+    if len(event_ids) == 0:
+        return set()
+    cursor.execute('select distinct game_id from event where event_id in (%s)' % ', '.join(['%s'] * len(event_ids)),
+                   list(event_ids))
+    return {row[0] for row in cursor.fetchall()}
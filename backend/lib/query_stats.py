@@ -0,0 +1,146 @@
+import contextvars
+import functools
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+SAMPLE_SIZE = 1024      # latest latencies kept per statement for percentiles
+SLOW_LOG_SIZE = 100     # slow statements kept
+SLOW_QUERY_MS = 100.0       # statements taking longer are logged as slow
+STATEMENT_TEXT = 200        # characters of a statement kept in reports
+
+current_command = contextvars.ContextVar('current_command', default=None)      # command or listener being handled
+
+VALUE_LISTS = re.compile(r'\(\s*%s(\s*,\s*%s)*\s*\)(\s*,\s*\(\s*%s(\s*,\s*%s)*\s*\))*')
+LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|\b\d+(?:\.\d+)?\b")
+SPACES = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize(statement):
+    """
+    Reduces a statement to its shape so executions that only differ in values are counted together: literals become
+    ?, lists of placeholders (IN lists and multi-row VALUES) collapse to one (...), whitespace to single spaces
+    :param statement: SQL statement as passed to execute
+    :return: normalized statement
+    """
+    statement = LITERALS.sub('?', statement)
+    statement = VALUE_LISTS.sub('(...)', statement)
+    return SPACES.sub(' ', statement).strip().lower()
+
+
+class StatementStats:
+    def __init__(self):
+        """
+        Timings of one normalized statement
+        """
+        self.count = 0
+        self.total = 0.0        # seconds
+        self.samples = deque(maxlen=SAMPLE_SIZE)        # latest durations in seconds
+
+
+class QueryStats:
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_log_size=SLOW_LOG_SIZE):
+        """
+        Per-statement timings of every SQL statement the cogs run, and a log of the slow ones.  Statements run on the
+        database worker threads, so recording takes a lock.
+        :param slow_ms: statements taking longer than this many milliseconds are logged as slow
+        :param slow_log_size: slow statements kept
+        """
+        self.slow_seconds = slow_ms / 1000
+        self.statements = {}        # normalized statement -> StatementStats
+        self.slow = deque(maxlen=slow_log_size)     # (time.time(), command, statement, seconds)
+        self.lock = threading.Lock()
+
+    def record(self, statement, seconds):
+        """
+        Records one execution, printing it to the console if it was slow
+        :param statement: SQL statement as passed to execute
+        :param seconds: time the execution took
+        :return: void
+        """
+        key = normalize(statement)
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.samples.append(seconds)
+            if seconds <= self.slow_seconds:
+                return
+            self.slow.append((time.time(), current_command.get(), key, seconds))
+        print('Slow query (%.1f ms, %s): %s' % (seconds * 1000, current_command.get() or '-', key[:STATEMENT_TEXT]))
+
+    def top(self, n):
+        """
+        Gets the statements that took the most time in total
+        :param n: number of statements
+        :return: list of (statement, count, total ms, p50 ms, p95 ms, p99 ms), most total time first
+        """
+        with self.lock:
+            ranked = sorted(self.statements.items(), key=lambda item: item[1].total, reverse=True)[:n]
+            samples = [(key, stats.count, stats.total, list(stats.samples)) for key, stats in ranked]
+        return [(key, count, total * 1000) + tuple(np.percentile(np.array(durations) * 1000, [50, 95, 99]).tolist())
+                for key, count, total, durations in samples]
+
+    def slow_queries(self):
+        """
+        Gets the slow statement log
+        :return: list of (time.time(), command, statement, seconds), oldest first
+        """
+        with self.lock:
+            return list(self.slow)
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, stats):
+        """
+        Cursor that times every statement it executes; everything else is passed to the wrapped cursor
+        :param cursor: MySQL cursor object
+        :param stats: QueryStats object to record timings in
+        """
+        self.cursor = cursor
+        self.stats = stats
+
+    def execute(self, operation, params=None, multi=False):
+        start = time.perf_counter()
+        try:
+            return self.cursor.execute(operation, params, multi)
+        finally:
+            self.stats.record(operation, time.perf_counter() - start)
+
+    def executemany(self, operation, seq_params):
+        start = time.perf_counter()
+        try:
+            return self.cursor.executemany(operation, seq_params)
+        finally:
+            self.stats.record(operation, time.perf_counter() - start)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def format_query_stats(stats, n):
+    """
+    Formats the statements that took the most time, and the latest slow ones, as lines of text
+    :param stats: QueryStats object
+    :param n: number of statements to list
+    :return: list of lines
+    """
+    lines = ['count  total ms  p50/p95/p99 ms  statement']
+    lines.extend('%d  %.1f  %.2f/%.2f/%.2f  %s' % (count, total, p50, p95, p99, key[:STATEMENT_TEXT])
+                 for key, count, total, p50, p95, p99 in stats.top(n))
+    slow = stats.slow_queries()
+    if len(slow) > 0:
+        lines.append('slow statements (over %d ms), latest last:' % round(stats.slow_seconds * 1000))
+        lines.extend('%s  %s  %.1f ms  %s' % (time.strftime('%m/%d %H:%M:%S', time.localtime(when)), command or '-',
+                                              seconds * 1000, key[:STATEMENT_TEXT])
+                     for when, command, key, seconds in slow[-n:])
+    return lines
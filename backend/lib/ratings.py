@@ -0,0 +1,214 @@
+import numpy as np
+
+RATING_START = 1500.0       # rating of a player's first game
+RATING_K = 32.0     # most rating a player can gain or lose in one event
+RATING_SCALE = 400.0        # rating difference at which the stronger team is expected to win 10 times out of 11
+RATING_CHUNK_SIZE = 500     # rows written per insert statement
+
+
+def event_rounds(events, players):
+    """
+    Groups events into rounds: an event's round comes after the rounds of every earlier event sharing one of its
+    players, so the events of a round share no players and can be rated together
+    :param events: int array of event positions (chronological), one per result, sorted
+    :param players: int array of player indices, one per result
+    :return: int array with the round of each result
+    """
+    starts = np.flatnonzero(np.diff(events, prepend=-1)).tolist() + [len(events)]
+    members = players.tolist()
+    last = [-1] * (max(members, default=-1) + 1)      # player -> round of their latest event
+    event_round = []
+    for start, end in zip(starts, starts[1:]):
+        current = max([last[player] for player in members[start:end]]) + 1
+        for player in members[start:end]:
+            last[player] = current
+        event_round.append(current)
+    return np.repeat(np.array(event_round, dtype=np.int64), np.diff(starts))
+
+
+def replay_ratings(events, players, wins, ratings):
+    """
+    Rates results in order with team Elo: each side's rating is the mean of its players', and every player gains
+    (or loses) what their side was not expected to win.  Events are rated a round at a time, every event of a round
+    in one vectorized step, which gives exactly the ratings of rating the events one by one.
+    :param events: int array of event positions (chronological), one per result, sorted
+    :param players: int array of player indices, one per result
+    :param wins: int array, 1 for each result on the winning side
+    :param ratings: float array of every player's rating before the first event, updated in place
+    :return: (float array of each result's rating before its event, float array of the rating after it)
+    """
+    before = np.empty(len(events))
+    after = np.empty(len(events))
+    if len(events) == 0:
+        return before, after
+
+    rounds = event_rounds(events, players)
+    order = np.argsort(rounds, kind='stable')
+    bounds = np.flatnonzero(np.diff(rounds[order])) + 1
+    for rows in np.split(order, bounds):
+        _, local = np.unique(events[rows], return_inverse=True)
+        local = local.reshape(-1)
+        won = wins[rows].astype(np.float64)
+        current = ratings[players[rows]]
+
+        winners = np.bincount(local, weights=won)
+        losers = np.bincount(local, weights=1 - won)
+        contested = (winners > 0) & (losers > 0)        # events with a single side are not rated
+        winning = np.divide(np.bincount(local, weights=current * won), winners, out=np.zeros(len(winners)),
+                            where=contested)
+        losing = np.divide(np.bincount(local, weights=current * (1 - won)), losers, out=np.zeros(len(losers)),
+                           where=contested)
+        gain = np.where(contested, RATING_K * (1 - 1 / (1 + 10 ** ((losing - winning) / RATING_SCALE))), 0)
+
+        before[rows] = current
+        after[rows] = current + np.where(won == 1, gain[local], -gain[local])
+        ratings[players[rows]] = after[rows]
+    return before, after
+
+
+def sql_get_results(game_id, event_ids, cursor):
+    """
+    Gets results in the order they are rated: by event date, then event id
+    :param game_id: only get this game's results, None for every game
+    :param event_ids: only get these events' results, None for every event
+    :param cursor: cursor object for executing command
+    :return: list of (event_id, user_id, game_id, win) rows
+    """
+    command = 'select performance.event_id, performance.user_id, event.game_id, performance.win from performance ' \
+              'inner join event on performance.event_id = event.event_id'
+    conditions, params = [], []
+    if game_id is not None:
+        conditions.append('event.game_id = %s')
+        params.append(game_id)
+    if event_ids is not None:
+        conditions.append('performance.event_id in (%s)' % ', '.join(['%s'] * len(event_ids)))
+        params.extend(event_ids)
+    if len(conditions) > 0:
+        command += ' where ' + ' and '.join(conditions)
+    cursor.execute(command + ' order by event.date, event.event_id, performance.user_id', params)
+    return cursor.fetchall()
+
+
+def sql_rate_results(results, ratings, cursor):
+    """
+    Rates results and stores the new ratings and their history, without committing
+    :param results: list of (event_id, user_id, game_id, win) rows in rating order
+    :param ratings: dictionary of (user_id, game_id) -> (rating, games) before the first result
+    :param cursor: cursor object for executing command
+    :return: dictionary of (user_id, game_id) -> (rating, games) after the last result
+    """
+    if len(results) == 0:
+        return ratings
+
+    keys = sorted({(user_id, game_id) for _, user_id, game_id, _ in results})
+    index = {key: i for i, key in enumerate(keys)}
+    event_ids = [row[0] for row in results]
+    events = np.cumsum([0] + [int(event_ids[i] != event_ids[i - 1]) for i in range(1, len(event_ids))])
+    players = np.array([index[(user_id, game_id)] for _, user_id, game_id, _ in results], dtype=np.int64)
+    wins = np.array([row[3] for row in results], dtype=np.int64)
+
+    current = np.array([ratings.get(key, (RATING_START, 0))[0] for key in keys])
+    before, after = replay_ratings(events, players, wins, current)
+    played = np.bincount(players, minlength=len(keys))
+
+    updated = dict(ratings)
+    updated.update((key, (float(current[i]), ratings.get(key, (RATING_START, 0))[1] + int(played[i])))
+                   for i, key in enumerate(keys))
+
+    insert_rows('rating_history', ('user_id', 'game_id', 'event_id', 'rating_before', 'rating_after'),
+                [(user_id, game_id, event_id, float(rating_before), float(rating_after)) for
+                 (event_id, user_id, game_id, _), rating_before, rating_after in zip(results, before, after)], cursor)
+    insert_rows('rating', ('user_id', 'game_id', 'rating', 'games'),
+                [key + updated[key] for key in keys], cursor, update=('rating', 'games'))
+    cursor.execute('update membership inner join rating on membership.user_id = rating.user_id '
+                   'and membership.game_id = rating.game_id set membership.skill_level = round(rating.rating) '
+                   'where membership.game_id in (%s)' % ', '.join(['%s'] * len({key[1] for key in keys})),
+                   sorted({key[1] for key in keys}))
+    return updated
+
+
+def sql_recompute_ratings(game_id, cursor):
+    """
+    Rates every recorded result from scratch, without committing.  The ratings only depend on the results, so a
+    recompute always gives the same ratings.
+    :param game_id: only rate this game, None for every game
+    :param cursor: cursor object for executing command
+    :return: number of results rated
+    """
+    if game_id is None:
+        cursor.execute('delete from rating_history')
+        cursor.execute('delete from rating')
+    else:
+        cursor.execute('delete from rating_history where game_id = %s', (game_id,))
+        cursor.execute('delete from rating where game_id = %s', (game_id,))
+    results = sql_get_results(game_id, None, cursor)
+    sql_rate_results(results, {}, cursor)
+    return len(results)
+
+
+def sql_update_ratings(event_ids, cursor):
+    """
+    Rates the results of events that were just written, without committing.  Events later than every rated event of
+    their game are rated on top of the current ratings; a game whose rated past changed is recomputed.
+    :param event_ids: list of event ids whose performance was written
+    :param cursor: cursor object for executing command
+    :return: void
+    """
+    if len(event_ids) == 0:
+        return
+    cursor.execute('select event_id, game_id, date from event where event_id in (%s)' %
+                   ', '.join(['%s'] * len(event_ids)), list(event_ids))
+    games = {}      # game id -> list of (date, event id)
+    for event_id, game_id, event_date in cursor.fetchall():
+        games.setdefault(game_id, []).append((event_date, event_id))
+
+    for game_id, events in games.items():
+        cursor.execute('select event.date, event.event_id from rating_history inner join event '
+                       'on rating_history.event_id = event.event_id where rating_history.game_id = %s '
+                       'order by event.date desc, event.event_id desc limit 1', (game_id,))
+        latest = cursor.fetchall()
+        if len(latest) > 0 and min(events) <= tuple(latest[0]):     # rewrites or precedes rated results
+            sql_recompute_ratings(game_id, cursor)
+            continue
+
+        results = sql_get_results(game_id, [event_id for _, event_id in events], cursor)
+        users = sorted({row[1] for row in results})
+        ratings = {}
+        if len(users) > 0:
+            cursor.execute('select user_id, game_id, rating, games from rating where game_id = %%s and user_id in (%s)'
+                           % ', '.join(['%s'] * len(users)), [game_id] + users)
+            ratings = {(user_id, game): (rating, played) for user_id, game, rating, played in cursor.fetchall()}
+        sql_rate_results(results, ratings, cursor)
+
+
+def sql_get_ratings(game_id, cursor):
+    """
+    Gets the ratings of a game's players
+    :param game_id: id of the game
+    :param cursor: cursor object for executing command
+    :return: list of (display name, rating, games) ordered by rating, best first
+    """
+    cursor.execute('select user.display_name, rating.rating, rating.games from rating '
+                   'inner join user on rating.user_id = user.user_id where rating.game_id = %s '
+                   'order by rating.rating desc, rating.user_id', (game_id,))
+    return cursor.fetchall()
+
+
+def insert_rows(table, columns, rows, cursor, update=()):
+    """
+    Inserts rows with multi-row statements
+    :param table: name of the table
+    :param columns: names of the columns
+    :param rows: list of tuples, one value per column
+    :param cursor: cursor object for executing command
+    :param update: columns overwritten when a row's key already exists
+    :return: void
+    """
+    placeholders = '(%s)' % ', '.join(['%s'] * len(columns))
+    suffix = '' if len(update) == 0 else \
+        ' on duplicate key update ' + ', '.join('%s = values(%s)' % (column, column) for column in update)
+    for start in range(0, len(rows), RATING_CHUNK_SIZE):
+        chunk = rows[start:start + RATING_CHUNK_SIZE]
+        cursor.execute('insert into %s (%s) values %s%s' % (table, ', '.join(columns),
+                                                            ', '.join([placeholders] * len(chunk)), suffix),
+                       [value for row in chunk for value in row])
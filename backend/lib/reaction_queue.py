@@ -0,0 +1,121 @@
+import asyncio
+import time
+import traceback
+
+from backend.lib.query_stats import current_command
+
+
+class ReactionQueue:
+    def __init__(self, workers=4, maxsize=256, tracer=None):
+        """
+        Bounded queue of reaction payloads drained by a fixed number of workers.  Gateway handlers only enqueue;
+        when the queue is full the handler waits for room.  discord.py runs every gateway event as its own task, so
+        this does not slow intake down: it only bounds the handlers running at once, and the handlers waiting for
+        room are counted in the metrics instead.  A payload whose key is already queued or being handled is dropped
+        as a duplicate.
+        :param workers: number of payloads handled at the same time
+        :param maxsize: number of payloads that may wait in the queue
+        :param tracer: Tracer object sampling handled payloads for tracing, None to not trace them
+        """
+        self.worker_count = workers
+        self.maxsize = maxsize
+        self.queue = None       # created on first use inside the running loop
+        self.workers = []
+        self.in_flight = set()      # keys of payloads queued or being handled
+        self.tracer = tracer
+
+        # metrics
+        self.received = 0
+        self.duplicates = 0
+        self.handled = 0
+        self.failed = 0
+        self.peak_depth = 0
+        self.waiting = 0        # gateway handlers waiting for room in a full queue
+        self.peak_waiting = 0
+        self.dequeued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        """
+        Create the queue and its workers if they are not running yet
+        :return: void
+        """
+        if self.queue is None:
+            self.queue = asyncio.Queue(self.maxsize)
+            self.workers = [asyncio.ensure_future(self.work()) for _ in range(self.worker_count)]
+
+    async def put(self, key, handler, payload):
+        """
+        Queue a payload for handling, waiting while the queue is full (counted in the waiting metric)
+        :param key: identity of the payload, e.g. (user id, message id, emoji)
+        :param handler: coroutine function that handles the payload
+        :param payload: gateway event payload
+        :return: True if queued, False if dropped as a duplicate
+        """
+        self.start()
+        self.received += 1
+        if key in self.in_flight:
+            self.duplicates += 1
+            return False
+
+        self.in_flight.add(key)
+        if not self.queue.full():
+            self.queue.put_nowait((time.monotonic(), key, handler, payload))
+        else:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                await self.queue.put((time.monotonic(), key, handler, payload))
+            except BaseException:
+                self.in_flight.discard(key)
+                raise
+            finally:
+                self.waiting -= 1
+
+        self.peak_depth = max(self.peak_depth, self.queue.qsize())
+        return True
+
+    async def work(self):
+        """
+        Worker loop: handle queued payloads one at a time
+        :return: void
+        """
+        while True:
+            queued_at, key, handler, payload = await self.queue.get()
+            wait = time.monotonic() - queued_at
+            self.dequeued += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            current_command.set(handler.__name__)     # statements are attributed to the handler in query stats
+            trace, token = self.tracer.start(handler.__name__, wait) if self.tracer is not None else (None, None)
+            try:
+                await handler(payload)
+                self.handled += 1
+            except Exception:
+                self.failed += 1
+                traceback.print_exc()
+            finally:
+                if self.tracer is not None:
+                    self.tracer.finish(trace, token)
+                self.in_flight.discard(key)
+                self.queue.task_done()
+
+    def stats(self):
+        """
+        Gets the queue's metrics
+        :return: dictionary of metric name to value
+        """
+        return {
+            'depth': self.queue.qsize() if self.queue is not None else 0,
+            'peak_depth': self.peak_depth,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'in_flight': len(self.in_flight),
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'handled': self.handled,
+            'failed': self.failed,
+            'avg_wait_ms': self.total_wait * 1000 / self.dequeued if self.dequeued else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
@@ -0,0 +1,366 @@
+import asyncio
+import heapq
+import re
+import traceback
+from datetime import datetime, timedelta, time
+
+from backend.lib.channel_sender import ChannelSender, pack_mentions
+from backend.lib.query_stats import current_command
+
+OFFSET_UNITS = {'d': 24 * 60, 'h': 60, 'm': 1}     # minutes per offset unit
+MAX_SLEEP = 3600        # seconds the scheduler sleeps at most before checking the clock again
+RETRY_DELAY = 60        # seconds before a reminder that failed to send is tried again
+MENTION = re.compile(r'<@(\d+)>')      # user mention in a reminder message
+
+
+class ReminderScheduler:
+    def __init__(self, bot, db, channel_id, offsets, event_time=time(0, 0), sender=None):
+        """
+        Sends reminders to registered players a fixed time before each event.  Every (event, offset) reminder has a
+        row in the reminder table, so restarts pick up where they left off, and due reminders wait in a min-heap so
+        the scheduler only ever sleeps until the next one.  Events are added, dropped and checked one at a time as
+        they are created, deleted and registered for.
+        :param bot: bot client
+        :param db: Database object
+        :param channel_id: id of the reminder channel
+        :param offsets: list of minutes before an event at which to remind its players
+        :param event_time: time of day events start (events only have a date)
+        :param sender: ChannelSender used to post reminders, a default one if None
+        """
+        self.bot = bot
+        self.db = db
+        self.channel_id = channel_id
+        self.offsets = offsets
+        self.event_time = event_time
+        self.sender = sender if sender is not None else ChannelSender()
+        self.heap = []      # (due, event_id, offset) entries, possibly stale
+        self.scheduled = {}     # (event_id, offset) -> due of reminders still to send
+        self.known = set()      # ids of events whose reminders are scheduled (or sent)
+        self.reminded = {}      # (event_id, offset) -> ids of players mentioned by a partly sent reminder
+        self.wake = None        # set when an earlier reminder is pushed, created on first use inside the running loop
+
+    def due_at(self, event_date, offset):
+        """
+        Gets when a reminder is due
+        :param event_date: date of the event
+        :param offset: minutes before the event
+        :return: datetime the reminder is due
+        """
+        return datetime.combine(event_date, self.event_time) - timedelta(minutes=offset)
+
+    def push(self, event_id, offset, due):
+        """
+        Schedules a reminder, replacing any earlier schedule of the same reminder
+        :param event_id: id of the event
+        :param offset: minutes before the event
+        :param due: datetime the reminder is due
+        :return: void
+        """
+        self.scheduled[(event_id, offset)] = due
+        self.known.add(event_id)
+        heapq.heappush(self.heap, (due, event_id, offset))
+        if self.wake is not None and self.heap[0][0] == due:   # new earliest reminder, shorten the current sleep
+            self.wake.set()
+
+    def cancel(self, event_id):
+        """
+        Drops every scheduled reminder of an event.  Its heap entries go stale and are skipped when they surface.
+        :param event_id: id of the event
+        :return: void
+        """
+        self.known.discard(event_id)
+        for offset in self.offsets:
+            self.scheduled.pop((event_id, offset), None)
+            self.reminded.pop((event_id, offset), None)
+
+        if len(self.heap) > 2 * len(self.scheduled) + 64:    # mostly stale entries, rebuild the heap
+            self.heap = [(due, event_id, offset) for (event_id, offset), due in self.scheduled.items()]
+            heapq.heapify(self.heap)
+
+    def pop_due(self, now):
+        """
+        Takes every reminder that is due off the schedule
+        :param now: current datetime
+        :return: list of (event_id, offset) reminders in due order
+        """
+        due = []
+        while len(self.heap) > 0 and self.heap[0][0] <= now:
+            when, event_id, offset = heapq.heappop(self.heap)
+            if self.scheduled.get((event_id, offset)) != when:    # cancelled, sent or rescheduled
+                continue
+            del self.scheduled[(event_id, offset)]
+            due.append((event_id, offset))
+        return due
+
+    def next_due(self):
+        """
+        Gets when the next reminder is due
+        :return: datetime, None if no reminder is scheduled
+        """
+        while len(self.heap) > 0:
+            when, event_id, offset = self.heap[0]
+            if self.scheduled.get((event_id, offset)) == when:
+                return when
+            heapq.heappop(self.heap)    # stale
+        return None
+
+    async def run(self):
+        """
+        Scheduler loop: load pending reminders, then send each one when it is due.  If loading fails (e.g. the
+        database is down at startup) it is retried with a growing delay, while reminders of events created or
+        registered for in the meantime are still sent.
+        :return: void
+        """
+        self.wake = asyncio.Event()
+        current_command.set('reminders')        # statements are attributed to the scheduler in query stats
+        await self.bot.wait_until_ready()
+        loaded = False
+        load_delay = RETRY_DELAY
+
+        while not self.bot.is_closed():
+            if not loaded:
+                try:
+                    await self.load()
+                    loaded = True
+                except Exception:
+                    traceback.print_exc()
+                    print('Could not load reminders, trying again in %d seconds' % load_delay)
+
+            due = self.pop_due(datetime.now())
+            results = await asyncio.gather(*(self.fire(event_id, offset) for event_id, offset in due),
+                                           return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    traceback.print_exception(type(result), result, result.__traceback__)
+
+            self.wake.clear()
+            next_due = self.next_due()
+            timeout = MAX_SLEEP
+            if next_due is not None:
+                timeout = min(MAX_SLEEP, max(0.0, (next_due - datetime.now()).total_seconds()))
+            if not loaded:
+                timeout = min(timeout, load_delay)
+                load_delay = min(MAX_SLEEP, load_delay * 2)
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def load(self):
+        """
+        Creates missing reminder rows for upcoming events and schedules every reminder not sent yet
+        :return: void
+        """
+        async with self.db.unit_of_work() as uow:
+            await uow.run(sql_add_upcoming_reminders, self.offsets, uow.cursor, uow.cnx)
+            pending = await uow.run(sql_get_pending_reminders, None, uow.cursor)
+
+        for event_id, offset, event_date in pending:
+            self.push(event_id, offset, self.due_at(event_date, offset))
+
+    async def schedule(self, event_id, event_date):
+        """
+        Schedules the reminders of a new event
+        :param event_id: id of the event
+        :param event_date: date of the event
+        :return: void
+        """
+        async with self.db.unit_of_work() as uow:
+            await uow.run(sql_add_reminders, event_id, self.offsets, uow.cursor, uow.cnx)
+
+        for offset in self.offsets:
+            self.push(event_id, offset, self.due_at(event_date, offset))
+
+    async def ensure(self, event_id):
+        """
+        Makes sure an event someone registered for has its reminders scheduled
+        :param event_id: id of the event
+        :return: void
+        """
+        if event_id in self.known:
+            return
+
+        async with self.db.unit_of_work() as uow:
+            await uow.run(sql_add_event_reminders, event_id, self.offsets, uow.cursor, uow.cnx)
+            pending = await uow.run(sql_get_pending_reminders, event_id, uow.cursor)
+
+        self.known.add(event_id)
+        for event_id, offset, event_date in pending:
+            self.push(event_id, offset, self.due_at(event_date, offset))
+
+    async def fire(self, event_id, offset):
+        """
+        Sends a due reminder.  The reminder is marked sent before the messages go out, so no restart or second
+        scheduler sends it twice; if sending fails it is unmarked and tried again later, mentioning only the players
+        the messages that did go out missed.
+        :param event_id: id of the event
+        :param offset: minutes before the event
+        :return: void
+        """
+        async with self.db.unit_of_work() as uow:
+            if not await uow.run(sql_claim_reminder, event_id, offset, uow.cursor, uow.cnx):
+                return      # already sent
+            rows = await uow.run(sql_get_reminder_recipients, event_id, uow.cursor)
+
+        if len(rows) == 0 or datetime.now() >= self.due_at(rows[0][4], 0):    # nobody to remind, or event started
+            self.reminded.pop((event_id, offset), None)
+            return
+
+        reminded = self.reminded.setdefault((event_id, offset), set())
+        rows = [row for row in rows if row[0] not in reminded]
+        try:
+            if len(rows) > 0:
+                await self.send(rows, reminded)
+            del self.reminded[(event_id, offset)]
+        except Exception:
+            async with self.db.unit_of_work() as uow:
+                await uow.run(sql_release_reminder, event_id, offset, uow.cursor, uow.cnx)
+            self.push(event_id, offset, datetime.now() + timedelta(seconds=RETRY_DELAY))
+            raise
+
+    async def send(self, rows, reminded):
+        """
+        Sends an event's reminder, mentioning its players in as few messages as possible
+        :param rows: list of (user_id, game name, event title, formatted date, date) rows of one event
+        :param reminded: set the ids of the players mentioned by each message that went out are added to
+        :return: void
+        """
+        _, game_name, title, date_text, _ = rows[0]
+        header = "Reminder: you are registered to play %s in '%s' on %s" % (game_name, title, date_text)
+        messages = pack_mentions(header, [row[0] for row in rows])
+
+        def sent(index):
+            text = messages[index][len(header):] if index == 0 else messages[index]     # the title is not a mention
+            reminded.update(int(user_id) for user_id in MENTION.findall(text))
+        await self.sender.send_many(self.bot.get_channel(self.channel_id), messages, sent)
+
+
+def parse_offsets(text):
+    """
+    Parses reminder offsets such as '24h, 1h' or '2d,30m'
+    :param text: comma separated offsets, each a number followed by d, h or m
+    :return: list of offsets in minutes, largest first
+    """
+    offsets = set()
+    for part in text.split(','):
+        part = part.strip().lower()
+        if len(part) < 2 or part[-1] not in OFFSET_UNITS or not part[:-1].isdigit():
+            raise ValueError('invalid reminder offset: %r' % part)
+        offsets.add(int(part[:-1]) * OFFSET_UNITS[part[-1]])
+    return sorted(offsets, reverse=True)
+
+
+def sql_add_reminders(event_id, offsets, cursor, cnx):
+    """
+    Adds the reminder rows of an event
+    :param event_id: id of the event
+    :param offsets: list of minutes before the event
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: void
+    """
+    cursor.executemany('insert ignore into reminder (event_id, offset_minutes) values (%s, %s)',
+                       [(event_id, offset) for offset in offsets])
+    cnx.commit()
+
+
+def sql_add_event_reminders(event_id, offsets, cursor, cnx):
+    """
+    Adds missing reminder rows of an event, if the event exists
+    :param event_id: id of the event
+    :param offsets: list of minutes before the event
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: void
+    """
+    for offset in offsets:
+        cursor.execute('insert ignore into reminder (event_id, offset_minutes) '
+                       'select event_id, %s from event where event_id = %s', (offset, event_id))
+    cnx.commit()
+
+
+def sql_add_upcoming_reminders(offsets, cursor, cnx):
+    """
+    Adds missing reminder rows of every upcoming event
+    :param offsets: list of minutes before an event
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: void
+    """
+    for offset in offsets:
+        cursor.execute('insert ignore into reminder (event_id, offset_minutes) '
+                       'select event_id, %s from event where date >= CURDATE()', (offset,))
+    cnx.commit()
+
+
+def sql_get_pending_reminders(event_id, cursor):
+    """
+    Gets reminders of upcoming events that have not been sent
+    :param event_id: id of the event to get reminders for, None for every event
+    :param cursor: cursor object for executing command
+    :return: list of (event_id, offset_minutes, event date) rows
+    """
+    command = 'select reminder.event_id, reminder.offset_minutes, event.date from reminder ' \
+              'inner join event on reminder.event_id = event.event_id ' \
+              'where reminder.sent_at is null and event.date >= CURDATE()'
+    if event_id is None:
+        cursor.execute(command)
+    else:
+        cursor.execute(command + ' and reminder.event_id = %s', (event_id,))
+    return cursor.fetchall()
+
+
+def sql_claim_reminder(event_id, offset, cursor, cnx):
+    """
+    Marks a reminder sent, unless it already is
+    :param event_id: id of the event
+    :param offset: minutes before the event
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: True if this call marked it, False if it was already sent or does not exist
+    """
+    cursor.execute('update reminder set sent_at = NOW() '
+                   'where event_id = %s and offset_minutes = %s and sent_at is null', (event_id, offset))
+    claimed = cursor.rowcount == 1
+    cnx.commit()
+    return claimed
+
+
+def sql_release_reminder(event_id, offset, cursor, cnx):
+    """
+    Marks a reminder not sent again
+    :param event_id: id of the event
+    :param offset: minutes before the event
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: void
+    """
+    cursor.execute('update reminder set sent_at = null where event_id = %s and offset_minutes = %s',
+                   (event_id, offset))
+    cnx.commit()
+
+
+def sql_delete_reminders(event_id, cursor, cnx):
+    """
+    Deletes the reminders of an event
+    :param event_id: id of the event
+    :param cursor: cursor object for executing command
+    :param cnx: connection object for committing change
+    :return: void
+    """
+    cursor.execute('delete from reminder where event_id = %s', (event_id,))
+    cnx.commit()
+
+
+def sql_get_reminder_recipients(event_id, cursor):
+    """
+    Gets the players to remind of an event
+    :param event_id: id of the event
+    :param cursor: cursor object for executing command
+    :return: list of (user_id, game name, event title, formatted date, date) rows
+    """
+    cursor.execute('select registration.user_id, game.name, event.title, DATE_FORMAT(event.date,"%M %d %Y"), '
+                   'event.date from event inner join game on event.game_id = game.game_id '
+                   'inner join registration on registration.event_id = event.event_id '
+                   'where event.event_id = %s order by registration.date, registration.user_id', (event_id,))
+    return cursor.fetchall()
@@ -0,0 +1,140 @@
+class Roster:
+    __slots__ = ('team_count', 'team_size', 'slots', 'index', 'free', 'counts')
+
+    def __init__(self, team_count, team_size):
+        """
+        Players split over a fixed number of teams with a fixed number of slots each.  Slots are numbered
+        team * team_size + position; a player -> slot index and a stack of free positions per team make adding,
+        removing, membership tests and team counts O(1) (choosing the emptiest team is O(number of teams)).
+        :param team_count: number of teams
+        :param team_size: number of slots on each team
+        """
+        self.team_count = team_count
+        self.team_size = team_size
+        self.clear()
+
+    def clear(self):
+        """
+        Removes every player
+        :return: void
+        """
+        self.slots = [None] * (self.team_count * self.team_size)      # player in each slot, None if empty
+        self.index = {}     # player -> slot number
+        self.free = [list(range(self.team_size - 1, -1, -1)) for _ in range(self.team_count)]   # free positions stack
+        self.counts = [0] * self.team_count      # players on each team
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, player):
+        return player in self.index
+
+    def count(self, team):
+        """
+        Gets the number of players on a team
+        :param team: index of team
+        :return: count of players on team
+        """
+        return self.counts[team]
+
+    def team_of(self, player):
+        """
+        Gets the team and position of a player
+        :param player: player to look up
+        :return: (team, position), None if player is not on a team
+        """
+        slot = self.index.get(player)
+        if slot is None:
+            return None
+        return divmod(slot, self.team_size)
+
+    def next_slot(self):
+        """
+        Gets the slot the next added player would take on the team with the fewest players: the most recently freed
+        position, or else the lowest position never taken
+        :return: (team, position), None if every team is full
+        """
+        team = min(range(self.team_count), key=self.counts.__getitem__)
+        free = self.free[team]
+        while free and self.slots[team * self.team_size + free[-1]] is not None:   # taken by place()
+            free.pop()
+        if not free:
+            return None
+        return team, free[-1]
+
+    def add(self, player):
+        """
+        Adds a player to the team with the fewest players
+        :param player: player to add
+        :return: (team, position) the player took, None if every team is full
+        """
+        placement = self.next_slot()
+        if placement is not None:
+            self.place(player, placement[0], placement[1])
+        return placement
+
+    def place(self, player, team, position):
+        """
+        Puts a player in a specific empty slot
+        :param player: player to place
+        :param team: index of team
+        :param position: position on that team
+        :return: True if placed, False if the slot does not exist or is taken
+        """
+        if not (0 <= team < self.team_count and 0 <= position < self.team_size):
+            return False
+        slot = team * self.team_size + position
+        if self.slots[slot] is not None:
+            return False
+
+        self.remove(player)
+        self.slots[slot] = player
+        self.index[player] = slot
+        self.counts[team] += 1
+        free = self.free[team]
+        if free and free[-1] == position:
+            free.pop()      # other taken positions are skipped lazily by next_slot
+        return True
+
+    def remove(self, player):
+        """
+        Removes a player from their team
+        :param player: player to remove
+        :return: (team, position) the player left, None if player was not on a team
+        """
+        slot = self.index.pop(player, None)
+        if slot is None:
+            return None
+
+        team, position = divmod(slot, self.team_size)
+        self.slots[slot] = None
+        self.counts[team] -= 1
+        self.free[team].append(position)
+        return team, position
+
+    def players(self, team):
+        """
+        Gets the players of a team in position order
+        :param team: index of team
+        :return: list of players
+        """
+        start = team * self.team_size
+        return [player for player in self.slots[start:start + self.team_size] if player is not None]
+
+    def arrange(self, teams):
+        """
+        Replaces every team, filling each from its first position
+        :param teams: list of player lists, one per team
+        :return: void
+        """
+        self.clear()
+        for team, players in enumerate(teams):
+            for position, player in enumerate(players):
+                self.place(player, team, position)
+
+    def assignments(self):
+        """
+        Gets the team and position of every player
+        :return: list of (team, position, player) tuples
+        """
+        return [divmod(slot, self.team_size) + (player,) for player, slot in self.index.items()]
@@ -0,0 +1,216 @@
+from backend.lib.edit_coalescer import EditCoalescer
+from backend.lib.event_locks import EventLocks
+from backend.lib.roster import Roster
+from backend.lib.event_queries import sql_get_event_details, sql_get_event_players, sql_get_upcoming_event_details, \
+    sql_get_upcoming_event_players, sql_set_team_slots, create_embed_message, rebase_team, EventNotFoundError
+
+
+class EventRoster:
+    def __init__(self, event_id, channel_id, title, event_date, game_name, team_size):
+        """
+        Teams of one event, loaded from the database and kept up to date in memory
+        :param event_id: id of the event (and of its message)
+        :param channel_id: id of the channel holding the event message
+        :param title: event's title
+        :param event_date: event's date
+        :param game_name: name of the event's game
+        :param team_size: size of individual teams
+        """
+        self.event_id = event_id
+        self.channel_id = channel_id
+        self.title = title
+        self.event_date = event_date
+        self.game_name = game_name
+        self.team_size = team_size
+        self.roster = Roster(2, team_size)     # user ids in their team slots
+        self.names = {}     # user id -> display name
+        self.rendered = self.snapshot()     # teams currently shown in the event message
+
+    def load_players(self, players):
+        """
+        Places registered players in their stored team slots.  Players without a (valid) stored slot get a free one.
+        :param players: list of (user_id, display_name, team, slot) rows
+        :return: list of (team, slot, user_id) placements that were not stored yet
+        """
+        unplaced = []
+        for user_id, display_name, team, slot in players:
+            self.names[user_id] = display_name
+            if team is None or slot is None or not self.roster.place(user_id, team, slot):
+                unplaced.append(user_id)
+
+        placements = []
+        for user_id in unplaced:
+            placement = self.roster.add(user_id)
+            if placement is None:   # more registrations than slots
+                break
+            placements.append(placement + (user_id,))
+
+        self.rendered = self.snapshot()
+        return placements
+
+    def free_slot(self):
+        """
+        Gets the slot a new player would take on the team with the fewest players
+        :return: (team, slot), None if teams are full
+        """
+        return self.roster.next_slot()
+
+    def place(self, user_id, display_name, team, slot):
+        """
+        Puts a player in a team slot
+        :param user_id: id of player
+        :param display_name: display name of player
+        :param team: index of team
+        :param slot: index of slot on that team
+        :return: void
+        """
+        self.names[user_id] = display_name
+        self.roster.place(user_id, team, slot)
+
+    def remove_player(self, user_id):
+        """
+        Removes a player from whichever team they are on
+        :param user_id: id of player to remove
+        :return: void
+        """
+        self.roster.remove(user_id)
+        self.names.pop(user_id, None)
+
+    def players(self, team):
+        """
+        Gets the players of a team in slot order
+        :param team: index of team
+        :return: list of user ids
+        """
+        return self.roster.players(team)
+
+    def arrange(self, teams):
+        """
+        Replaces the teams, filling each from its first slot
+        :param teams: list of user id lists, one per team
+        :return: void
+        """
+        self.roster.arrange(teams)
+
+    def assignments(self):
+        """
+        Gets the team slot of every player, ready to be stored
+        :return: list of (team, slot, user_id) tuples
+        """
+        return self.roster.assignments()
+
+    def display_teams(self):
+        """
+        Gets the teams as shown in the event message: display names in slot order, empty slots at the end
+        :return: list of display name lists
+        """
+        return [rebase_team([self.names[user_id] for user_id in self.players(team)], self.team_size)
+                for team in range(self.roster.team_count)]
+
+    def snapshot(self):
+        """
+        Gets an immutable copy of the teams as shown, for comparing against what the event message shows
+        :return: tuple of team tuples
+        """
+        return tuple(tuple(team) for team in self.display_teams())
+
+    def embed(self):
+        """
+        Renders the event's embeded message with the current teams filled in
+        :return: embeded message ready to be sent in Discord
+        """
+        return create_embed_message(self.title, self.event_date, self.game_name, self.display_teams(), None)
+
+
+class RosterCache:
+    def __init__(self, bot, db, event_channel_id, edit_delay=1.0):
+        """
+        Authoritative in-memory rosters of events, keyed by event id (the id of the event's message).  Rosters are
+        loaded from the database (in bulk by load_all, or the first time they are needed) and then changed in place,
+        so neither reactions nor restarts need to download and parse event messages.  Hold locks.hold(event_id) while
+        reading and changing a roster.
+        :param bot: bot client
+        :param db: Database object
+        :param event_channel_id: id of the event channel
+        :param edit_delay: seconds over which roster changes are collected into a single message edit
+        """
+        self.bot = bot
+        self.db = db
+        self.event_channel_id = event_channel_id
+        self.rosters = {}
+        self.edits = EditCoalescer(bot, edit_delay)
+        self.locks = EventLocks()
+
+    async def get(self, event_id):
+        """
+        Gets the roster of an event, loading it on first touch
+        :param event_id: id of the event
+        :return: EventRoster object, None if the event does not exist
+        """
+        roster = self.rosters.get(event_id)
+        if roster is not None:
+            return roster
+
+        async with self.db.unit_of_work() as uow:
+            try:
+                details = await uow.run(sql_get_event_details, event_id, uow.cursor)
+            except EventNotFoundError:
+                return None
+            players = await uow.run(sql_get_event_players, event_id, uow.cursor)
+
+            roster = EventRoster(event_id, self.event_channel_id, *details)
+            placements = roster.load_players(players)
+            if len(placements) > 0:     # store slots given to players registered before slots were stored
+                await uow.run(sql_set_team_slots, event_id, placements, uow.cursor, uow.cnx)
+
+        self.rosters[event_id] = roster
+        return roster
+
+    async def load_all(self):
+        """
+        Caches the rosters of all upcoming events that are not cached yet.  The rows are read before any event lock
+        is taken, and slots are stored on a connection taken under the event's lock, the same order reactions use.
+        :return: void
+        """
+        async with self.db.unit_of_work() as uow:
+            events = await uow.run(sql_get_upcoming_event_details, uow.cursor)
+            rows = await uow.run(sql_get_upcoming_event_players, uow.cursor)
+
+        players = {}
+        for event_id, user_id, display_name, team, slot in rows:
+            players.setdefault(event_id, []).append((user_id, display_name, team, slot))
+
+        for event_id, title, event_date, game_name, team_size in events:
+            async with self.locks.hold(event_id):
+                if event_id in self.rosters:    # a reaction loaded it already
+                    continue
+
+                roster = EventRoster(event_id, self.event_channel_id, title, event_date, game_name, team_size)
+                placements = roster.load_players(players.get(event_id, []))
+                if len(placements) > 0:
+                    async with self.db.unit_of_work() as uow:
+                        await uow.run(sql_set_team_slots, event_id, placements, uow.cursor, uow.cnx)
+                self.rosters[event_id] = roster
+
+    def create(self, event_id, title, event_date, game_name, team_size):
+        """
+        Caches the empty roster of a newly created event
+        :param event_id: id of the event
+        :param title: event's title
+        :param event_date: event's date
+        :param game_name: name of the event's game
+        :param team_size: size of individual teams
+        :return: EventRoster object
+        """
+        roster = EventRoster(event_id, self.event_channel_id, title, event_date, game_name, team_size)
+        self.rosters[event_id] = roster
+        return roster
+
+    def discard(self, event_id):
+        """
+        Drops an event's roster from the cache
+        :param event_id: id of the event
+        :return: the dropped EventRoster object, None if it was not cached
+        """
+        self.edits.cancel(event_id)
+        return self.rosters.pop(event_id, None)
@@ -0,0 +1,86 @@
+import heapq
+
+EXACT_LIMIT = 16        # largest lobby split by the exact search, bigger ones use the differencing heuristic
+
+
+def balance_teams(skills):
+    """
+    Splits players into two teams whose sizes differ by at most one and whose skill totals are as close as possible
+    :param skills: dictionary of player -> skill level (int)
+    :return: (first team, second team) lists of players, the first never smaller than the second
+    """
+    players = sorted(skills, key=lambda player: skills[player], reverse=True)
+    if len(players) <= EXACT_LIMIT:
+        return exact_split(players, skills)
+    return differencing_split(players, skills)
+
+
+def exact_split(players, skills):
+    """
+    Finds the best split by dynamic programming over (team size, skill total) pairs, tracking one team that reaches
+    each pair.  Only as fast as the number of distinct totals allows, so meant for small lobbies.
+    :param players: list of players
+    :param skills: dictionary of player -> skill level (int)
+    :return: (first team, second team) lists of players, the first never smaller than the second
+    """
+    half = len(players) // 2
+    reachable = [{} for _ in range(half + 1)]       # team size -> skill total -> bitmask of a team reaching it
+    reachable[0][0] = 0
+    for i, player in enumerate(players):
+        for size in range(min(i, half - 1), -1, -1):    # largest first so each player joins a team at most once
+            for total, team in list(reachable[size].items()):
+                reachable[size + 1].setdefault(total + skills[player], team | 1 << i)
+
+    target = sum(skills[player] for player in players) / 2
+    team = reachable[half][min(reachable[half], key=lambda total: (abs(target - total), total))]
+    smaller = [player for i, player in enumerate(players) if team >> i & 1]
+    larger = [player for i, player in enumerate(players) if not team >> i & 1]
+    return larger, smaller
+
+
+def differencing_split(players, skills):
+    """
+    Splits with the balanced largest differencing method (Karmarkar-Karp keeping team sizes equal): players sorted
+    by skill are paired off, then the two pairings with the largest differences are repeatedly merged, each placing
+    the stronger side of one against the stronger side of the other
+    :param players: list of players sorted by skill, best first
+    :param skills: dictionary of player -> skill level (int)
+    :return: (first team, second team) lists of players, the first never smaller than the second
+    """
+    if len(players) == 0:
+        return [], []
+    padded = players + [None] if len(players) % 2 == 1 else players     # None is a skill 0 stand-in
+    level = [skills[player] if player is not None else 0 for player in padded]
+
+    heap = []       # (-difference, tiebreak, stronger side, weaker side)
+    for i in range(0, len(padded), 2):
+        heapq.heappush(heap, (level[i + 1] - level[i], i, [padded[i]], [padded[i + 1]]))
+    while len(heap) > 1:
+        difference, tiebreak, stronger, weaker = heapq.heappop(heap)
+        other, _, other_stronger, other_weaker = heapq.heappop(heap)
+        heapq.heappush(heap, (difference - other, tiebreak, stronger + other_weaker, weaker + other_stronger))
+
+    _, _, first, second = heap[0]
+    first = [player for player in first if player is not None]
+    second = [player for player in second if player is not None]
+    return (first, second) if len(first) >= len(second) else (second, first)
+
+
+def sql_get_event_skills(event_id, players, cursor):
+    """
+    Gets the skill level of every player of an event in the event's game, players without a membership counting
+    as the average of the others
+    :param event_id: id of the event
+    :param players: list of user ids of the event's players
+    :param cursor: cursor object for executing command
+    :return: dictionary of user id -> skill level
+    """
+    cursor.execute('select membership.user_id, membership.skill_level from membership '
+                   'inner join registration on registration.user_id = membership.user_id '
+                   'inner join event on event.event_id = registration.event_id and event.game_id = membership.game_id '
+                   'where registration.event_id = %s', (event_id,))
+    skills = dict(cursor.fetchall())
+
+    known = [skills[player] for player in players if player in skills]
+    average = sum(known) // len(known) if len(known) > 0 else 0
+    return {player: skills.get(player, average) for player in players}
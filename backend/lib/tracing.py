@@ -0,0 +1,261 @@
+import contextvars
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+TRACE_SAMPLE_RATE = 0.1     # share of commands and reactions traced
+TRACE_FILE = 'traces.jsonl'     # file traces are appended to, one JSON object per line
+TRACES_KEPT = 1000      # latest traces kept in memory for summaries
+SPAN_KINDS = ('dispatch', 'queue', 'db', 'discord')      # summarized kinds of span
+
+# Discord REST routes (method, path template) named after the discord.py calls that use them
+ROUTE_NAMES = {
+    ('GET', '/channels/{channel_id}/messages/{message_id}'): 'fetch_message',
+    ('POST', '/channels/{channel_id}/messages'): 'send',
+    ('PATCH', '/channels/{channel_id}/messages/{message_id}'): 'edit',
+    ('DELETE', '/channels/{channel_id}/messages/{message_id}'): 'delete',
+    ('PUT', '/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me'): 'add_reaction',
+    ('DELETE', '/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me'): 'remove_reaction',
+    ('DELETE', '/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{member_id}'): 'remove_reaction',
+}
+
+current_trace = contextvars.ContextVar('current_trace', default=None)      # trace of the command being handled
+
+
+class Trace:
+    def __init__(self, name, started):
+        """
+        Timeline of one command or reaction: spans of the time spent on each database and Discord call
+        :param name: command or handler name
+        :param started: time.perf_counter() value the trace starts at
+        """
+        self.trace_id = os.urandom(8).hex()
+        self.name = name
+        self.timestamp = time.time() - (time.perf_counter() - started)      # wall clock time of the start
+        self.started = started
+        self.ended = None       # time.perf_counter() value once finished
+        self.spans = []     # (kind, name, start, end) in time.perf_counter() values
+
+    def record(self, kind, name, start, end):
+        """
+        Adds a span, unless the trace already finished (work it scheduled for later, such as batched edits)
+        :param kind: 'dispatch', 'queue', 'db' or 'discord'
+        :param name: what the span timed, e.g. the sql function or the Discord call
+        :param start: time.perf_counter() value the span started at
+        :param end: time.perf_counter() value the span ended at
+        :return: void
+        """
+        if self.ended is None:
+            self.spans.append((kind, name, start, end))
+
+    def to_record(self):
+        """
+        Converts a finished trace to a JSON serializable dictionary, times in milliseconds from its start
+        :return: dictionary
+        """
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration_ms': (self.ended - self.started) * 1000,
+            'spans': [{'kind': kind, 'name': name, 'start_ms': (start - self.started) * 1000,
+                       'duration_ms': (end - start) * 1000} for kind, name, start, end in self.spans],
+        }
+
+
+class Span:
+    def __init__(self, trace, kind, name):
+        """
+        Context manager timing one span of a trace
+        :param trace: Trace object to add the span to
+        :param kind: 'dispatch', 'queue', 'db' or 'discord'
+        :param name: what the span times
+        """
+        self.trace = trace
+        self.kind = kind
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.trace.record(self.kind, self.name, self.start, time.perf_counter())
+
+
+class NullSpan:
+    """
+    Span of an untraced command, which records nothing
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(kind, name):
+    """
+    Times a block as a span of the current trace, if the current command is traced
+    :param kind: 'dispatch', 'queue', 'db' or 'discord'
+    :param name: what the block does
+    :return: context manager
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, kind, name)
+
+
+def mark_dispatched():
+    """
+    Records the time from the start of the current trace until now as its dispatch span
+    :return: void
+    """
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record('dispatch', 'dispatch', trace.started, time.perf_counter())
+
+
+class Tracer:
+    def __init__(self, path=TRACE_FILE, sample_rate=TRACE_SAMPLE_RATE, keep=TRACES_KEPT, sample=random.random):
+        """
+        Samples commands and reactions for tracing, appends finished traces to a JSONL file and keeps the latest
+        ones for per-command summaries
+        :param path: file traces are appended to, None to only keep them in memory
+        :param sample_rate: share of commands and reactions traced, from 0 to 1
+        :param keep: latest traces kept in memory
+        :param sample: function returning a random number in [0, 1)
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.sample = sample
+        self.traces = deque(maxlen=keep)        # records of the latest traces
+        self.file = None        # opened on the first trace
+
+    def start(self, name, waited=0.0):
+        """
+        Starts tracing the current task, if it is sampled
+        :param name: command or handler name, None if not known yet
+        :param waited: seconds the work waited in a queue before it started, recorded as a queue span
+        :return: (Trace object or None if not sampled, token to pass to finish)
+        """
+        if self.sample_rate <= 0 or self.sample() >= self.sample_rate:
+            return None, None
+        now = time.perf_counter()
+        trace = Trace(name, now - waited)
+        if waited > 0:
+            trace.record('queue', 'queue', trace.started, now)
+        return trace, current_trace.set(trace)
+
+    def finish(self, trace, token):
+        """
+        Finishes a trace and exports it
+        :param trace: Trace object from start, or None
+        :param token: token from start
+        :return: void
+        """
+        if trace is None:
+            return
+        current_trace.reset(token)
+        trace.ended = time.perf_counter()
+        if trace.name is None:      # turned out not to be a command
+            return
+        record = trace.to_record()
+        self.traces.append(record)
+        if self.path is not None:
+            if self.file is None:
+                self.file = open(self.path, 'a')
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+
+    def close(self):
+        """
+        Closes the trace file
+        :return: void
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def trace_requests(http):
+    """
+    Times every Discord REST call made through a discord.py HTTP client as a span of the current trace, including
+    the time spent waiting on rate limits
+    :param http: discord.http.HTTPClient object, e.g. bot.http
+    :return: void
+    """
+    request = http.request
+
+    async def traced_request(route, **kwargs):
+        with span('discord', route_name(route)):
+            return await request(route, **kwargs)
+    http.request = traced_request
+
+
+def route_name(route):
+    """
+    Names a Discord REST route after the call that uses it
+    :param route: discord.http.Route object
+    :return: call name, or method and path template for routes without one
+    """
+    return ROUTE_NAMES.get((route.method, route.path), '%s %s' % (route.method, route.path))
+
+
+def summarize(records):
+    """
+    Summarizes traces per command: how long they took and how much of it was spent on each kind of span
+    :param records: iterable of trace records (Trace.to_record dictionaries)
+    :return: list of (name, traces, p50 ms, p99 ms, {kind: (p50 ms, p99 ms)}) rows, slowest p99 first
+    """
+    durations = {}      # name -> list of durations
+    kinds = {}      # name -> kind -> list of each trace's total time in spans of that kind
+    for record in records:
+        durations.setdefault(record['name'], []).append(record['duration_ms'])
+        totals = dict.fromkeys(SPAN_KINDS, 0.0)
+        for item in record['spans']:
+            totals[item['kind']] = totals.get(item['kind'], 0.0) + item['duration_ms']
+        for kind, total in totals.items():
+            kinds.setdefault(record['name'], {}).setdefault(kind, []).append(total)
+
+    rows = []
+    for name, times in durations.items():
+        p50, p99 = np.percentile(times, [50, 99]).tolist()
+        rows.append((name, len(times), p50, p99, {kind: tuple(np.percentile(totals, [50, 99]).tolist())
+                                                  for kind, totals in kinds[name].items()}))
+    return sorted(rows, key=lambda row: row[3], reverse=True)
+
+
+def format_summary(rows):
+    """
+    Formats a per-command summary as lines of text
+    :param rows: rows from summarize
+    :return: list of lines
+    """
+    lines = ['command  traces  p50/p99 ms  ' + '  '.join('%s p50/p99' % kind for kind in SPAN_KINDS)]
+    lines.extend('%s  %d  %.1f/%.1f  ' % (name, count, p50, p99) +
+                 '  '.join('%.1f/%.1f' % kinds.get(kind, (0.0, 0.0)) for kind in SPAN_KINDS)
+                 for name, count, p50, p99, kinds in rows)
+    return lines
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE
+    with open(path) as traces:
+        records = [json.loads(line) for line in traces if line.strip()]
+    for line in format_summary(summarize(records)):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
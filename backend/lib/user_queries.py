@@ -1,12 +1,12 @@
 from discord.ext import commands
-from backend.lib.helper_commands import check_admin_status, AdminPermissionError, check_user_exists
+from backend.lib.helper_commands import check_admin_status, AdminPermissionError, check_user_exists, entities, \
+    admins
 
 
 class UserQueries(commands.Cog):
-    def __init__(self, bot, cursor, cnx):
+    def __init__(self, bot, db):
         self.bot = bot
-        self.cursor = cursor
-        self.cnx = cnx
+        self.db = db
 
     @commands.command()
     async def add_user(self, ctx, user_id, admin):
@@ -25,8 +25,9 @@ class UserQueries(commands.Cog):
             return
 
         try:
-            #                          auth_user, user_id, display_name, is_admin, cursor, cnx
-            message = sql_add_user(ctx.author.id, user_id, str(user), admin, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                #                          auth_user, user_id, display_name, is_admin, cursor, cnx
+                message = await uow.run(sql_add_user, ctx.author.id, user_id, str(user), admin, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission error encountered.  Only admins can add users to the backend.")
         except ExistingUserError:
@@ -44,7 +45,8 @@ class UserQueries(commands.Cog):
         :return:  a message displaying the new user table or an error message
         """
         try:
-            message = sql_delete_user(ctx.author.id, user_id, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                message = await uow.run(sql_delete_user, ctx.author.id, user_id, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission Error encountered.  Either you are not an admin or are attempting to delete an "
                            "admin.")
@@ -62,7 +64,8 @@ class UserQueries(commands.Cog):
         :return: the updated user table or an error message
         """
         try:
-            message = sql_set_admin_status(ctx.author.id, user_id, status, self.cursor, self.cnx)
+            async with self.db.unit_of_work() as uow:
+                message = await uow.run(sql_set_admin_status, ctx.author.id, user_id, status, uow.cursor, uow.cnx)
         except AdminPermissionError:
             await ctx.send("Permission Error encountered.  You do not have permission to edit the database")
         except UserNotFoundError:
@@ -79,7 +82,9 @@ class UserQueries(commands.Cog):
         :param user: ALL|DISPLAY_NAME
         :return: result of query
         """
-        await ctx.send(sql_query_user(user, self.cursor))
+        async with self.db.unit_of_work() as uow:
+            result = await uow.run(sql_query_user, user, uow.cursor)
+        await ctx.send(result)
 
 
 # SQL FUNCTIONS #
@@ -118,6 +123,8 @@ def sql_delete_user(auth_user, user_id, cursor, cnx):
 
     cursor.execute('delete from user where user_id = %s', (user_id,))  # execute deletion query
     cnx.commit()  # commit changes to database
+    entities.invalidate('user', entity_id=user_id)
+    admins.set(user_id, None)
     cursor.execute('select * from user')  # get new user table
     return cursor.fetchall()
 
@@ -146,6 +153,8 @@ def sql_add_user(auth_user, user_id, display_name, is_admin, cursor, cnx):
                    '(user_id, display_name, admin) '
                    'values (%s, %s, %s)', (user_id, display_name, 1 if is_admin == "true" else 0))
     cnx.commit()  # commit changes to database
+    entities.invalidate('user', display_name, user_id)
+    admins.set(user_id, 1 if is_admin == "true" else 0)
 
     cursor.execute('select * from user where user_id = %s', (user_id,))  # get new user table
     return cursor.fetchall()
@@ -173,6 +182,7 @@ def sql_set_admin_status(auth_user, user_id, new_status, cursor, cnx):
                    'set admin = %s '
                    'where user_id = %s', (1 if new_status == "true" else 0, user_id))
     cnx.commit()  # commit changes to user table
+    admins.set(user_id, 1 if new_status == "true" else 0)
     cursor.execute('select * from user where user_id = %s', (user_id,))  # get new user table
     return cursor.fetchall()
 
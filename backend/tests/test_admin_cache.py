@@ -0,0 +1,34 @@
+import unittest
+from backend.lib.admin_cache import AdminCache, UNKNOWN
+
+
+class AdminCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = AdminCache(ttl=60, clock=lambda: self.now)
+
+    def test_load(self):
+        self.assertIs(self.cache.get(1), UNKNOWN)
+        self.cache.load([(1, 1), (2, 0)], self.cache.generation)
+        self.assertEqual([self.cache.get(1), self.cache.get(2), self.cache.get(3)], [1, 0, None])
+
+        self.now = 60       # the load expired
+        self.assertIs(self.cache.get(1), UNKNOWN)
+
+    def test_write_through(self):
+        self.cache.load([(1, 1)], self.cache.generation)
+        self.cache.set('2', 0)      # added user, id given as text
+        self.cache.set(1, None)     # deleted user
+        self.assertEqual([self.cache.get(1), self.cache.get(2)], [None, 0])
+
+        generation = self.cache.generation
+        self.cache.set(2, 1)        # admin status changed while the table was read
+        self.cache.load([(2, 0)], generation)
+        self.assertEqual(self.cache.get(2), 1)
+
+        self.cache.set('name#1234', 1)
+        self.assertIs(self.cache.get(2), UNKNOWN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import asyncio
+import time
+from backend.lib.channel_sender import ChannelSender, pack_mentions, pack_lines
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append((time.monotonic(), content))
+        await asyncio.sleep(0)
+
+
+class ChannelSenderTestCase(unittest.TestCase):
+    def test_pack_mentions(self):
+        user_ids = list(range(10 ** 17, 10 ** 17 + 300))
+        messages = pack_mentions('Reminder: event', user_ids)
+        self.assertTrue(all(len(message) <= 2000 for message in messages))
+        self.assertTrue(messages[0].startswith('Reminder: event <@'))
+        self.assertEqual(' '.join(messages).split()[2:], ['<@%d>' % user_id for user_id in user_ids])
+        self.assertEqual(len(messages), 4)      # 300 mentions of 21 characters (and spaces) need four messages
+
+    def test_pack_mentions_nobody(self):
+        self.assertEqual(pack_mentions('Reminder: event', []), ['Reminder: event'])
+
+    def test_pack_lines(self):
+        lines = ['sheet%d.csv: 10 updated, 2 inserted' % i for i in range(100)]
+        messages = pack_lines(lines)
+        self.assertTrue(all(len(message) <= 2000 for message in messages))
+        self.assertEqual('\n'.join(messages).split('\n'), lines)
+        self.assertEqual(pack_lines([]), [])
+
+    def test_channel_rate_limit(self):
+        sender = ChannelSender(channel_rate=2, channel_per=0.1)
+        channel = FakeChannel(1)
+        asyncio.run(sender.send_many(channel, ['a', 'b', 'c', 'd', 'e']))
+        times = [sent_at for sent_at, _ in channel.sent]
+        self.assertEqual([content for _, content in channel.sent], ['a', 'b', 'c', 'd', 'e'])
+        self.assertGreaterEqual(times[2] - times[0], 0.09)   # no more than 2 messages in any 0.1 seconds
+        self.assertGreaterEqual(times[4] - times[2], 0.09)
+
+    def test_channels_concurrent(self):
+        sender = ChannelSender(channel_rate=1, channel_per=0.1)
+        channels = [FakeChannel(channel_id) for channel_id in range(4)]
+        start = time.monotonic()
+        results = asyncio.run(sender.send_all([(channel, ['a', 'b']) for channel in channels]))
+        self.assertEqual(results, [None] * 4)
+        self.assertLess(time.monotonic() - start, 0.3)      # 4 channels side by side, not 0.4 seconds in a row
+        self.assertTrue(all(len(channel.sent) == 2 for channel in channels))
+
+
+if __name__ == '__main__':
+    unittest.main()
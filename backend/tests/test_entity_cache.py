@@ -0,0 +1,39 @@
+import unittest
+from backend.lib.entity_cache import BiMap, EntityCache, as_id
+
+
+class EntityCacheTestCase(unittest.TestCase):
+    def test_bimap(self):
+        pairs = BiMap(2)
+        pairs.put('alice', 1)
+        pairs.put('bob', 2)
+        self.assertEqual((pairs.get_id('alice'), pairs.get_name(2)), (1, 'bob'))
+        pairs.get_name(1)       # alice is now the most recently used
+        pairs.put('carol', 3)
+        self.assertIsNone(pairs.get_id('bob'))
+        self.assertEqual(pairs.get_name(1), 'alice')
+
+        pairs.put('alice', 4)       # an id changed: the old pair goes
+        self.assertIsNone(pairs.get_name(1))
+        self.assertEqual(pairs.get_id('alice'), 4)
+        self.assertEqual(len(pairs.ids), len(pairs.names))
+
+    def test_invalidate(self):
+        cache = EntityCache()
+        cache.put('event', 'scrim', 42, cache.generation)
+        self.assertEqual(cache.get_name('event', 42), 'scrim')
+        cache.invalidate('event', entity_id='42')       # ids from commands arrive as text
+        self.assertIsNone(cache.get_id('event', 'scrim'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        generation = cache.generation
+        cache.invalidate('user', 'alice')       # written while a lookup was reading
+        cache.put('user', 'alice', 7, generation)
+        self.assertIsNone(cache.get_id('user', 'alice'))
+
+    def test_as_id(self):
+        self.assertEqual([as_id(7), as_id('7'), as_id('name#1234'), as_id(None)], [7, 7, None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import asyncio
+from backend.lib.event_locks import EventLocks
+
+
+class EventLocksTestCase(unittest.TestCase):
+    def setUp(self):
+        self.locks = EventLocks()
+        self.log = []
+
+    async def change(self, event_id, name):
+        async with self.locks.hold(event_id):
+            self.log.append((event_id, name, 'start'))
+            await asyncio.sleep(0.01)
+            self.log.append((event_id, name, 'end'))
+
+    async def run_all(self, *changes):
+        await asyncio.gather(*changes)
+
+    def test_same_event_serialized(self):
+        asyncio.run(self.run_all(self.change(1, 'a'), self.change(1, 'b')))
+        self.assertEqual([entry[2] for entry in self.log], ['start', 'end', 'start', 'end'])     # no interleaving
+
+    def test_different_events_parallel(self):
+        asyncio.run(self.run_all(self.change(1, 'a'), self.change(2, 'b')))
+        self.assertEqual([entry[2] for entry in self.log], ['start', 'start', 'end', 'end'])     # both ran at once
+
+    def test_locks_released(self):
+        asyncio.run(self.run_all(self.change(1, 'a'), self.change(1, 'b'), self.change(2, 'c')))
+        self.assertEqual(self.locks.locks, {})      # no lock kept for idle events
+
+
+if __name__ == '__main__':
+    unittest.main()
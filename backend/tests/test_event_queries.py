@@ -2,7 +2,7 @@ import unittest
 import mysql.connector
 import configparser
 from backend.lib import event_queries as eq
-from backend.lib.helper_commands import AdminPermissionError
+from backend.lib.helper_commands import AdminPermissionError, entities, admins
 from backend.lib.game_queries import get_game_id
 import time
 import datetime
@@ -44,6 +44,7 @@ class UserTestCase(unittest.TestCase):
         self.admin = int(config['Testing']['admin'])
 
         self.new_user = 'test#69420'
+        self.new_id = 69420
         event_date = '04/09/2020'
         self.data_insert = {'event_id': 1,
                             'date': datetime.date.fromtimestamp
@@ -84,9 +85,40 @@ class UserTestCase(unittest.TestCase):
 
         self.assertEqual(eq.sql_query_event(self.data_insert['event_id'], self.cursor),
                          [(self.data_insert['event_id'], datetime.date(2020, 4, 9), 1, 'a test event', 5)])
+
+    def test_create_registration(self):
+        self.assertEqual(eq.sql_create_event(self.data_insert, self.cursor, self.cnx),
+                         [(self.data_insert['event_id'], datetime.date(2020, 4, 9), 1, 'a test event', 5)])
+
+        self.assertEqual(eq.sql_create_registration(self.data_insert['event_id'], self.new_id, self.new_user, 0, 0,
+                                                    self.cursor, self.cnx),
+                         (5, 1))       # registering a new user adds them and returns team size and count
+
+        with self.assertRaises(eq.ExistingRegistrationError):       # registering twice
+            eq.sql_create_registration(self.data_insert['event_id'], self.new_id, self.new_user, 1, 0,
+                                       self.cursor, self.cnx)
+
+        with self.assertRaises(eq.EventNotFoundError):      # registering for a non-existent event
+            eq.sql_create_registration(2, self.new_id, self.new_user, 0, 0, self.cursor, self.cnx)
+
+        self.assertEqual(eq.sql_create_registration(self.data_insert['event_id'], self.new_id + 1, 'test#69421', 1, 0,
+                                                    self.cursor, self.cnx),
+                         (5, 2))       # registration count includes every registered user
+
+        self.assertEqual(eq.sql_get_event_players(self.data_insert['event_id'], self.cursor),
+                         [(self.new_id, self.new_user, 0, 0), (self.new_id + 1, 'test#69421', 1, 0)])  # stored slots
+
+        eq.sql_set_team_slots(self.data_insert['event_id'], [(1, 1, self.new_id)], self.cursor, self.cnx)
+        self.assertEqual(eq.sql_get_event_players(self.data_insert['event_id'], self.cursor)[0],
+                         (self.new_id, self.new_user, 1, 1))     # moved by a sort
+
     def tearDown(self):
+        self.cursor.execute('delete from registration where event_id = %s', (self.data_insert['event_id'],))
+        self.cursor.execute('delete from user where user_id in (%s, %s)', (self.new_id, self.new_id + 1))
         self.cursor.execute('delete from event where title = %s', (self.data_insert['title'],))
         self.cnx.commit()  # commit changes to database
+        entities.clear()    # rows were deleted behind the caches' back
+        admins.clear()
         self.cnx.close()
         self.cursor.close()
 
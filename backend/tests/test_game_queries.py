@@ -2,7 +2,8 @@ import unittest
 import mysql.connector
 import configparser
 from backend.lib import game_queries as gq
-from backend.lib.helper_commands import AdminPermissionError
+from backend.lib.helper_commands import AdminPermissionError, GameNotFoundError, entities, admins, get_game_id, \
+    get_game_name
 
 
 class UserTestCase(unittest.TestCase):
@@ -50,15 +51,15 @@ class UserTestCase(unittest.TestCase):
             gq.sql_add_game(self.new_user, self.new_game_id, self.new_game_name, self.cursor, self.cnx)
 
         with self.assertRaises(mysql.connector.errors.IntegrityError):
-            gq.sql_add_game(self.display_name, 1,
+            gq.sql_add_game(self.id, 1,
                             self.new_game_name, self.cursor, self.cnx)
 
-        self.assertEqual(gq.sql_add_game(self.display_name, self.new_game_id,
+        self.assertEqual(gq.sql_add_game(self.id, self.new_game_id,
                                          self.new_game_name, self.cursor, self.cnx),
                          [(self.new_game_id, self.new_game_name)])      # test adding to database
 
         with self.assertRaises(gq.ExistingGameError):       # adding a duplicate game
-            gq.sql_add_game(self.display_name, self.new_game_id,
+            gq.sql_add_game(self.id, self.new_game_id,
                             self.new_game_name, self.cursor, self.cnx)
 
     def test_delete_game(self):
@@ -66,13 +67,13 @@ class UserTestCase(unittest.TestCase):
             gq.sql_delete_game(self.new_user, self.new_game_name, self.cursor, self.cnx)
 
         with self.assertRaises(gq.GameNotFoundError):       # deleting a game that does not exist
-            gq.sql_delete_game(self.display_name, self.new_game_name, self.cursor, self.cnx)
+            gq.sql_delete_game(self.id, self.new_game_name, self.cursor, self.cnx)
 
-        self.assertEqual(gq.sql_add_game(self.display_name, self.new_game_id,
+        self.assertEqual(gq.sql_add_game(self.id, self.new_game_id,
                                          self.new_game_name, self.cursor, self.cnx),
                          [(self.new_game_id, self.new_game_name)])  # safe add new game
 
-        self.assertEqual(gq.sql_delete_game(self.display_name, self.new_game_name, self.cursor, self.cnx),
+        self.assertEqual(gq.sql_delete_game(self.id, self.new_game_name, self.cursor, self.cnx),
                          [(0, 'League of Legends'), (1, 'CSGO'), (2, 'Rocket League')])
 
     def test_edit_name(self):
@@ -80,16 +81,16 @@ class UserTestCase(unittest.TestCase):
             gq.sql_edit_name(self.new_user, self.new_game_name, "a faker game", self.cursor, self.cnx)
 
         with self.assertRaises(gq.GameNotFoundError):
-            gq.sql_edit_name(self.display_name, self.new_game_name, "a faker game", self.cursor, self.cnx)
+            gq.sql_edit_name(self.id, self.new_game_name, "a faker game", self.cursor, self.cnx)
 
-        self.assertEqual(gq.sql_add_game(self.display_name, self.new_game_id,
+        self.assertEqual(gq.sql_add_game(self.id, self.new_game_id,
                                          self.new_game_name, self.cursor, self.cnx),
                          [(self.new_game_id, self.new_game_name)])  # safe add new game
 
         with self.assertRaises(gq.ExistingGameError):
-            gq.sql_edit_name(self.display_name, self.new_game_name, "CSGO", self.cursor, self.cnx)
+            gq.sql_edit_name(self.id, self.new_game_name, "CSGO", self.cursor, self.cnx)
 
-        self.assertEqual(gq.sql_edit_name(self.display_name, self.new_game_name, "a faker game", self.cursor,
+        self.assertEqual(gq.sql_edit_name(self.id, self.new_game_name, "a faker game", self.cursor,
                                           self.cnx),
                          [(69420, "a faker game")])
 
@@ -98,23 +99,23 @@ class UserTestCase(unittest.TestCase):
             gq.sql_edit_id(self.new_user, self.new_game_name, self.new_game_id + 1, self.cursor, self.cnx)
 
         with self.assertRaises(gq.GameNotFoundError):       # editing a non-existent game
-            gq.sql_edit_id(self.display_name, self.new_game_name, self.new_game_id + 1, self.cursor, self.cnx)
+            gq.sql_edit_id(self.id, self.new_game_name, self.new_game_id + 1, self.cursor, self.cnx)
 
-        self.assertEqual(gq.sql_add_game(self.display_name, self.new_game_id,
+        self.assertEqual(gq.sql_add_game(self.id, self.new_game_id,
                                          self.new_game_name, self.cursor, self.cnx),
                          [(self.new_game_id, self.new_game_name)])  # safe add new game
 
         with self.assertRaises(mysql.connector.errors.IntegrityError):      # changing ID into an existing ID
-            gq.sql_edit_id(self.display_name, self.new_game_name, 1, self.cursor, self.cnx)
+            gq.sql_edit_id(self.id, self.new_game_name, 1, self.cursor, self.cnx)
 
-        self.assertEqual(gq.sql_edit_id(self.display_name, self.new_game_name, self.new_game_id + 1,
+        self.assertEqual(gq.sql_edit_id(self.id, self.new_game_name, self.new_game_id + 1,
                                         self.cursor, self.cnx),
                          [(self.new_game_id + 1, self.new_game_name)])
 
     def test_query_game(self):
         self.assertEqual(gq.sql_query_game(self.new_game_name, self.cursor), [])
 
-        self.assertEqual(gq.sql_add_game(self.display_name, self.new_game_id,
+        self.assertEqual(gq.sql_add_game(self.id, self.new_game_id,
                                          self.new_game_name, self.cursor, self.cnx),
                          [(self.new_game_id, self.new_game_name)])      # safe add new game
 
@@ -125,10 +126,27 @@ class UserTestCase(unittest.TestCase):
                          [(0, 'League of Legends'), (1, 'CSGO'),
                           (2, 'Rocket League'), (self.new_game_id, self.new_game_name)])
 
+    def test_cached_casing(self):
+        gq.sql_add_game(self.id, self.new_game_id, self.new_game_name, self.cursor, self.cnx)
+        self.assertEqual(get_game_id(self.new_game_name.upper(), self.cursor), self.new_game_id)
+        self.assertEqual(get_game_name(self.new_game_id, self.cursor), self.new_game_name)     # stored casing
+
+        gq.sql_edit_name(self.id, self.new_game_name.upper(), "a faker game", self.cursor, self.cnx)
+        self.assertEqual(get_game_name(self.new_game_id, self.cursor), "a faker game")
+        with self.assertRaises(GameNotFoundError):      # the renamed game is not found by its old name
+            get_game_id(self.new_game_name, self.cursor)
+
+        get_game_id("A FAKER GAME", self.cursor)
+        gq.sql_delete_game(self.id, "A Faker Game", self.cursor, self.cnx)
+        with self.assertRaises(GameNotFoundError):      # the deleted game is not found under any casing
+            get_game_id("a faker game", self.cursor)
+
     def tearDown(self):
         self.cursor.execute('delete from game where game_id = %s', (self.new_game_id,))  # execute deletion query
         self.cursor.execute('delete from game where game_id = %s', (self.new_game_id + 1,))  # execute deletion query
         self.cnx.commit()  # commit changes to database
+        entities.clear()    # rows were deleted behind the caches' back
+        admins.clear()
         self.cnx.close()
         self.cursor.close()
 
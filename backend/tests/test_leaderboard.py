@@ -0,0 +1,72 @@
+import unittest
+from backend.lib.leaderboard import TopK, Leaderboards
+from backend.lib.perf_rollups import RollupChanges
+
+
+class LeaderboardTestCase(unittest.TestCase):
+    def rows(self, kills):
+        # (user_id, name, games, kills, deaths, wins, minutes, margin)
+        return [(user_id, 'player%d' % user_id, 1, count, 1, 0, 30, 0) for user_id, count in kills.items()]
+
+    def test_offer(self):
+        board = TopK(3, [(5, 1, 'a'), (4, 2, 'b'), (3, 3, 'c')])
+        self.assertTrue(board.offer(4, 'd', 2))     # below the board: ignored
+        self.assertTrue(board.offer(5, 'e', 6))     # pushes out c
+        self.assertEqual(board.top(3), [('e', 6), ('a', 5), ('b', 4)])
+        self.assertTrue(board.offer(2, 'b', 7))     # a kept player improving stays exact
+        self.assertEqual(board.top(2), [('b', 7), ('e', 6)])
+        self.assertFalse(board.offer(1, 'a', 1))        # a kept player dropping needs a rebuild
+
+    def test_complete_board(self):
+        board = TopK(3, [(5, 1, 'a')])      # fewer players than the board holds: it has all of them
+        self.assertTrue(board.offer(1, 'a', 1))
+        self.assertTrue(board.offer(2, 'b', 3))
+        self.assertEqual(board.top(3), [('b', 3), ('a', 1)])
+
+    def test_leaderboards(self):
+        boards = Leaderboards(size=2)
+        boards.put(7, self.rows({1: 10, 2: 20, 3: 30}), boards.version)
+        self.assertEqual(boards.get(7, 'kills').top(2), [('player3', 30.0), ('player2', 20.0)])
+        self.assertEqual(len(boards.boards[(7, 'kills')].heap), 2)      # bounded by size
+
+        boards.update([(1, 7, 'player1', 2, 40, 2, 0, 60, 0)])
+        self.assertEqual(boards.get(7, 'kills').top(1), [('player1', 40.0)])
+        boards.update([(1, 7, 'player1', 3, 5, 2, 0, 90, 0)])      # player1's kills dropped: board rebuilt lazily
+        self.assertIsNone(boards.get(7, 'kills'))
+
+        version = boards.version
+        boards.update([])       # a write landed while the rows were read
+        boards.put(8, self.rows({1: 1}), version)
+        self.assertEqual(boards.games(), {7})
+
+    def test_event_deleted(self):
+        changes = RollupChanges()
+        boards = Leaderboards(size=2, changes=changes)
+        boards.put(7, self.rows({1: 10, 2: 20}), boards.version)
+        changes.bump()      # an event was deleted
+        self.assertIsNone(boards.get(7, 'kills'))
+
+        version = boards.version
+        changes.bump()      # deleted while the rows were read
+        boards.put(7, self.rows({1: 10, 2: 20}), version)
+        self.assertEqual(boards.games(), set())
+
+    def test_put_during_write(self):
+        boards = Leaderboards(size=2)
+        version = boards.version        # rows read before the write commits
+        boards.begin()
+        self.assertEqual(boards.games(), set())     # so the write does not update game 7's board
+        boards.put(7, self.rows({1: 10, 2: 20}), version)
+        boards.put(7, self.rows({1: 10, 2: 20}), boards.version)
+        boards.update([])
+        self.assertEqual(boards.games(), set())     # neither board is cached
+        boards.end()
+
+        boards.put(7, self.rows({1: 10, 2: 20}), version)
+        self.assertEqual(boards.games(), set())
+        boards.put(7, self.rows({1: 10, 2: 30}), boards.version)
+        self.assertEqual(boards.get(7, 'kills').top(1), [('player2', 30.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from datetime import date
+from backend.lib.match_history import PageCache, format_history_row, format_history_page
+
+
+class MatchHistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.row = (1, date(2020, 4, 3), 'scrim', 'CS:GO', 20, 10, 1, 30, 16, 12)
+
+    def test_format(self):
+        self.assertEqual(format_history_row(self.row), '04/03/2020  scrim (CS:GO): won 16-12, 20/10 K/D, 30 min')
+        self.assertEqual(format_history_row(self.row[:4] + (None,) * 6),
+                         '04/03/2020  scrim (CS:GO): no performance recorded')
+        self.assertEqual(format_history_page('alice', ([self.row], (date(2020, 4, 3), 1)), 2).split('\n')[0],
+                         'History of alice, page 2 (▶ for more):')
+
+    def test_cache(self):
+        cache = PageCache(ttl=10, clock=lambda: self.now)
+        cache.put((7, None, None), 'first page', cache.version)
+        self.now = 5
+        cache.put((7, None, (date(2020, 4, 3), 1)), 'second page', cache.version)
+        self.assertEqual(cache.get((7, None, None)), 'first page')
+
+        self.now = 12       # the first page expired
+        self.assertIsNone(cache.get((7, None, None)))
+        self.assertEqual(list(cache.pages), [(7, None, (date(2020, 4, 3), 1))])
+
+        version = cache.version
+        cache.invalidate([7])
+        self.assertEqual(len(cache.pages), 0)
+        cache.put((7, None, None), 'stale page', version)      # read before the invalidation
+        self.assertIsNone(cache.get((7, None, None)))
+
+
+if __name__ == '__main__':
+    unittest.main()
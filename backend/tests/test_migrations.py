@@ -0,0 +1,111 @@
+import unittest
+import os
+import tempfile
+import mysql.connector
+import configparser
+from backend.lib import migrations, helper_commands, event_queries, reminders
+
+HOT_QUERIES = [     # (query function, call on a cursor and connection); their statements are explained as run
+    ('get_id_from_title', lambda cursor, cnx: helper_commands.get_id_from_title('a title', cursor)),
+    ('get_id_from_name', lambda cursor, cnx: helper_commands.get_id_from_name('test#69420', cursor)),
+    ('get_game_id', lambda cursor, cnx: helper_commands.get_game_id('a game', cursor)),
+    ('get_registrations', lambda cursor, cnx: helper_commands.get_registrations(cursor, 69420)),
+    ('sql_delete_registration', lambda cursor, cnx: event_queries.sql_delete_registration(69420, 69420, cursor, cnx)),
+    ('sql_get_events', lambda cursor, cnx: event_queries.sql_get_events(cursor)),
+    ('sql_get_pending_reminders', lambda cursor, cnx: reminders.sql_get_pending_reminders(None, cursor)),
+    ('sql_get_pending_reminders', lambda cursor, cnx: reminders.sql_get_pending_reminders(69420, cursor)),
+    ('sql_claim_reminder', lambda cursor, cnx: reminders.sql_claim_reminder(69420, 60, cursor, cnx)),
+    ('sql_get_reminder_recipients', lambda cursor, cnx: reminders.sql_get_reminder_recipients(69420, cursor)),
+]
+
+
+class RecordingCursor:
+    def __init__(self, cursor):
+        """
+        Cursor that keeps every statement it executes, so the test explains the statements the bot actually runs
+        :param cursor: MySQL cursor object
+        """
+        self.cursor = cursor
+        self.statements = []        # (statement, parameters)
+
+    def execute(self, operation, params=None):
+        self.statements.append((operation, params))
+        return self.cursor.execute(operation, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class MigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        config = configparser.ConfigParser()  # read and parse configuration file
+        config.read(r'backend/tests/test_configuration.conf')
+
+        username = config['Database']['username']  # get details for signing in to database
+        password = config['Database']['password']
+        host = config['Database']['host']
+        database = config['Database']['database']
+
+        try:        # for CI testing
+            self.cnx = mysql.connector.connect(user=username,
+                                               password=password,
+                                               host=host,
+                                               database=database)  # connect to the database
+        except mysql.connector.errors.DatabaseError:        # for local testing
+            config.read(r'configuration.conf')
+
+            username = config['Database']['username']  # get details for signing in to database
+            password = config['Database']['password']
+            host = config['Database']['host']
+            database = config['Database']['database']
+
+            self.cnx = mysql.connector.connect(user=username,
+                                               password=password,
+                                               host=host,
+                                               database=database)  # connect to the database
+
+        self.cursor = self.cnx.cursor()  # create cursor object for executing queries
+        migrations.sql_migrate(self.cursor, self.cnx)
+
+    def test_migrate_is_idempotent(self):
+        self.assertEqual(migrations.sql_migrate(self.cursor, self.cnx), [])
+        self.assertEqual(migrations.sql_applied_migrations(self.cursor),
+                         {version for version, _, _ in migrations.list_migrations()})
+
+    def test_hot_queries_use_indexes(self):
+        helper_commands.entities.clear()        # lookups must reach the database
+        for command, query in HOT_QUERIES:
+            cursor = RecordingCursor(self.cursor)
+            try:
+                query(cursor, self.cnx)
+            except helper_commands.Error:      # nothing found, the statements still ran
+                pass
+            self.assertGreater(len(cursor.statements), 0, '%s ran no statement' % command)
+            for statement, params in cursor.statements:
+                self.cursor.execute('explain ' + statement, params)
+                columns = self.cursor.column_names
+                for row in self.cursor.fetchall():
+                    plan = dict(zip(columns, row))
+                    self.assertNotEqual(plan['type'], 'ALL', '%s scans %s' % (command, plan['table']))
+                    if plan['type'] is not None:        # None: answered without reading the table (no matching row)
+                        self.assertIsNotNone(plan['key'], '%s reads %s without an index' % (command, plan['table']))
+
+    def test_split_statements(self):
+        text = '-- a comment; with a semicolon\nALTER TABLE a ADD INDEX b (c);\n\nALTER TABLE d ADD INDEX e (f);\n'
+        self.assertEqual(migrations.split_statements(text),
+                         ['ALTER TABLE a ADD INDEX b (c)', 'ALTER TABLE d ADD INDEX e (f)'])
+
+    def test_duplicate_versions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for filename in ('001_first.sql', '001_second.sql', 'notes.txt'):
+                open(os.path.join(directory, filename), 'w').close()
+            with self.assertRaises(migrations.DuplicateMigrationError):
+                migrations.list_migrations(directory)
+
+    def tearDown(self):
+        self.cnx.close()
+        self.cursor.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+import io
+import zipfile
+from backend.lib.perf_ingest import csv_rows, perf_records, read_perf_archive, MissingHeaderError
+
+SHEET = ('\ufeffdisplay_name,user_id,event_id,kills,deaths,win,length,win_score,lose_score\r\n'
+         '"smith, john",1,7,10,2,1,30,16,10\r\n'
+         '"multi\nline ""name""",2,7,3,5,0,30,10,16\r\n'
+         '\r\n'
+         'jane,3,7,8,8,1,30,16,12').encode('utf-8')
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(iterable):
+    return [item async for item in iterable]
+
+
+class PerfIngestTestCase(unittest.TestCase):
+    def test_csv_rows(self):
+        expected = [['display_name', 'user_id', 'event_id', 'kills', 'deaths', 'win', 'length', 'win_score',
+                     'lose_score'],
+                    ['smith, john', '1', '7', '10', '2', '1', '30', '16', '10'],
+                    ['multi\nline "name"', '2', '7', '3', '5', '0', '30', '10', '16'],
+                    ['jane', '3', '7', '8', '8', '1', '30', '16', '12']]
+        for size in (1, 2, 7, 64, len(SHEET)):     # records and characters split across chunks
+            self.assertEqual(asyncio.run(collect(csv_rows(chunked(SHEET, size)))), expected)
+
+    def test_perf_records(self):
+        records = asyncio.run(collect(perf_records(csv_rows(chunked(SHEET, 16)))))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0], {'display_name': 'smith, john', 'user_id': '1', 'event_id': '7', 'kills': '10',
+                                      'deaths': '2', 'win': '1', 'length': '30', 'win_score': '16',
+                                      'lose_score': '10'})
+
+    def test_missing_header(self):
+        with self.assertRaises(MissingHeaderError):
+            asyncio.run(collect(perf_records(csv_rows(chunked(b'user_id,kills\n1,2\n', 4)))))
+        with self.assertRaises(MissingHeaderError):
+            asyncio.run(collect(perf_records(csv_rows(chunked(b'', 4)))))
+
+    def test_read_perf_archive(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zipped:
+            zipped.writestr('match1.csv', SHEET)
+            zipped.writestr('notes.txt', b'gg')
+            zipped.writestr('round2/match2.csv', b'user_id,event_id,kills,deaths,win,length,win_score,lose_score\n'
+                                                 b'4,7,1,1,1,20,16,3\n')
+            zipped.writestr('broken.csv', b'kills\n1\n')
+            zipped.writestr('locked.csv', SHEET)
+            zipped.getinfo('locked.csv').flag_bits |= 0x1     # marked encrypted
+            zipped.writestr('deflate64.csv', SHEET)
+            zipped.getinfo('deflate64.csv').compress_type = 9      # deflate64, not supported by zipfile
+        archive.seek(0)
+
+        sheets = read_perf_archive(archive, 'weekend.zip')
+        self.assertEqual([(name, error) for name, _, error in sheets],
+                         [('weekend.zip/match1.csv', None), ('weekend.zip/notes.txt', 'not a csv file'),
+                          ('weekend.zip/round2/match2.csv', None), ('weekend.zip/broken.csv', 'no header'),
+                          ('weekend.zip/locked.csv', 'could not be read'),
+                          ('weekend.zip/deflate64.csv', 'could not be read')])
+        self.assertEqual([len(records) for _, records, error in sheets if error is None], [3, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
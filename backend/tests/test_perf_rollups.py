@@ -0,0 +1,29 @@
+import unittest
+from datetime import date
+from backend.lib.perf_rollups import RollupDelta
+
+
+class PerfRollupsTestCase(unittest.TestCase):
+    def record(self, user_id, event_id, kills, win):
+        return {'user_id': user_id, 'event_id': event_id, 'kills': kills, 'deaths': 2, 'win': win,
+                'length': 30, 'win_score': 16, 'lose_score': 10}
+
+    def test_add(self):
+        delta = RollupDelta({1: (7, date(2020, 4, 1)), 2: (7, date(2020, 5, 1))})
+        delta.add(self.record(10, 1, 5, 1))
+        delta.add(self.record(10, 2, 3, 0))
+        delta.add(self.record(11, 3, 9, 1))     # event 3 was deleted: not rolled up
+
+        self.assertEqual(delta.tables['perf_rollup_user_game'], {(10, 7): [2, 8, 4, 1, 60, 0]})     # +6 then -6
+        self.assertEqual(delta.tables['perf_rollup_game_period'], {(7, date(2020, 4, 1)): [1, 5, 2, 1, 30, 6],
+                                                                   (7, date(2020, 5, 1)): [1, 3, 2, 0, 30, -6]})
+
+    def test_replace(self):
+        delta = RollupDelta({1: (7, date(2020, 4, 1))})
+        delta.remove(self.record(10, 1, 5, 1))      # stored row overwritten by an update
+        delta.add(self.record(10, 1, 8, 1))
+        self.assertEqual(delta.tables['perf_rollup_user_game'], {(10, 7): [0, 3, 0, 0, 0, 0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
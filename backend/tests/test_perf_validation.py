@@ -0,0 +1,53 @@
+import unittest
+from backend.lib.perf_validation import check_perf_columns, perf_column_records
+
+
+def record(user_id='1', event_id='7', kills='10', deaths='2', win='1', length='30', win_score='16', lose_score='10'):
+    return {'user_id': user_id, 'event_id': event_id, 'kills': kills, 'deaths': deaths, 'win': win,
+            'length': length, 'win_score': win_score, 'lose_score': lose_score}
+
+
+class PerfValidationTestCase(unittest.TestCase):
+    def test_valid_sheet(self):
+        records = [record(), record(user_id=' 2 ', kills='0'), record(user_id='480122056114044939')]
+        columns, problems = check_perf_columns(records)
+        self.assertEqual(problems, [])
+        self.assertEqual(perf_column_records(columns)[1], {'user_id': 2, 'event_id': 7, 'kills': 0, 'deaths': 2,
+                                                           'win': 1, 'length': 30, 'win_score': 16,
+                                                           'lose_score': 10})
+        self.assertEqual(columns['user_id'].tolist(), [1, 2, 480122056114044939])
+
+    def test_empty_sheet(self):
+        columns, problems = check_perf_columns([])
+        self.assertEqual(problems, [])
+        self.assertEqual(perf_column_records(columns), [])
+
+    def test_bad_values(self):
+        records = [record(kills='-3'), record(user_id='2', deaths='two'), record(user_id='3', win='2'),
+                   record(user_id='4', length=''), record(user_id='99999999999999999999')]
+        del records[1]['lose_score']
+        columns, problems = check_perf_columns(records)
+        self.assertIsNone(columns)
+        self.assertEqual(problems, ['user_id is not a whole number (row 6)',
+                                    'kills is not between 0 and 2147483647 (row 2)',
+                                    'deaths is not a whole number (row 3)',
+                                    'win is not between 0 and 1 (row 4)',
+                                    'length is missing (row 5)',
+                                    'lose_score is missing (row 3)'])
+
+    def test_unicode_digits(self):
+        records = [record(lose_score='²'), record(user_id='2', kills='١٢'), record(user_id='3', deaths='１')]
+        columns, problems = check_perf_columns(records)
+        self.assertIsNone(columns)
+        self.assertEqual(problems, ['kills is not a whole number (row 3)',
+                                    'deaths is not a whole number (row 4)',
+                                    'lose_score is not a whole number (row 2)'])
+
+    def test_duplicates(self):
+        records = [record(user_id=str(user_id % 7 + 1)) for user_id in range(1, 15)]
+        _, problems = check_perf_columns(records)
+        self.assertEqual(problems, ['user_id, event_id appears more than once (rows 2, 3, 4, 5, 6 and 9 more)'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import mysql.connector
+import configparser
+from backend.lib import performance_queries as pq
+from backend.lib.perf_validation import sql_validate_perf_sheet
+from backend.lib.match_history import sql_history_page
+from backend.lib.ratings import sql_update_ratings, RATING_START
+from backend.lib.perf_rollups import sql_rebuild_rollups, sql_check_rollups, sql_remove_event_rollups
+
+
+class PerformanceTestCase(unittest.TestCase):
+    def setUp(self):
+        config = configparser.ConfigParser()  # read and parse configuration file
+        config.read(r'backend/tests/test_configuration.conf')
+
+        username = config['Database']['username']  # get details for signing in to database
+        password = config['Database']['password']
+        host = config['Database']['host']
+        database = config['Database']['database']
+
+        try:        # for CI testing
+            self.cnx = mysql.connector.connect(user=username,
+                                               password=password,
+                                               host=host,
+                                               database=database)  # connect to the database
+        except mysql.connector.errors.DatabaseError:        # for local testing
+            config.read(r'configuration.conf')
+
+            username = config['Database']['username']  # get details for signing in to database
+            password = config['Database']['password']
+            host = config['Database']['host']
+            database = config['Database']['database']
+
+            self.cnx = mysql.connector.connect(user=username,
+                                               password=password,
+                                               host=host,
+                                               database=database)  # connect to the database
+
+        self.cursor = self.cnx.cursor()  # create cursor object for executing queries
+
+        self.event_id = 69420
+        self.user_ids = [69420, 69421]
+
+    def record(self, user_id, kills):
+        return {'user_id': user_id, 'event_id': self.event_id, 'kills': kills, 'deaths': 1, 'win': 1,
+                'length': 30, 'win_score': 16, 'lose_score': 10}
+
+    def test_perf_upsert(self):
+        records = [self.record(self.user_ids[0], 1), self.record(self.user_ids[1], 2), self.record(self.user_ids[0], 3)]
+        self.assertEqual(pq.sql_perf_upsert(records, self.cursor), (2, 1))     # repeated row counts as update
+        self.cnx.commit()
+
+        self.assertEqual(pq.sql_perf_upsert([self.record(self.user_ids[1], 5)], self.cursor), (0, 1))
+        self.assertEqual(pq.sql_perf_upsert([], self.cursor), (0, 0))
+        self.cnx.commit()
+
+        self.cursor.execute('select user_id, kills from performance where event_id = %s order by user_id',
+                            (self.event_id,))
+        self.assertEqual(self.cursor.fetchall(), [(self.user_ids[0], 3), (self.user_ids[1], 5)])
+
+    def test_validate_perf_sheet(self):
+        self.cursor.execute('select user_id from user limit 1')
+        user_id = self.cursor.fetchall()[0][0]
+        sheet = [{'user_id': str(user_id), 'event_id': str(self.event_id), 'kills': '1', 'deaths': '1', 'win': '0',
+                  'length': '30', 'win_score': '10', 'lose_score': '16'}]
+
+        records, problems = sql_validate_perf_sheet(sheet, self.cursor)     # test event does not exist
+        self.assertIsNone(records)
+        self.assertEqual(problems, ['event_id does not exist (row 2)'])
+
+        self.cursor.execute('insert into event (event_id, date, game_id, title, team_size) '
+                            'values (%s, CURDATE(), 1, %s, 5)', (self.event_id, 'a test performance event'))
+        records, problems = sql_validate_perf_sheet(sheet, self.cursor)
+        self.assertEqual(problems, [])
+        self.assertEqual(records[0]['user_id'], user_id)
+
+    def test_rollups(self):
+        self.cursor.execute('insert into event (event_id, date, game_id, title, team_size) '
+                            'values (%s, CURDATE(), 1, %s, 5)', (self.event_id, 'a test performance event'))
+        sql_rebuild_rollups(self.cursor, self.cnx)
+
+        pq.sql_perf_upsert([self.record(self.user_ids[0], 1), self.record(self.user_ids[1], 2)], self.cursor)
+        pq.sql_perf_upsert([self.record(self.user_ids[0], 4)], self.cursor)     # update replaces the old row
+        self.cnx.commit()
+        self.assertEqual(sql_check_rollups(self.cursor), {'perf_rollup_user_game': [], 'perf_rollup_game_period': []})
+
+        self.cursor.execute('select games, kills from perf_rollup_user_game where user_id = %s and game_id = 1',
+                            (self.user_ids[0],))
+        self.assertEqual(self.cursor.fetchall(), [(1, 4)])
+
+        sql_remove_event_rollups(self.event_id, self.cursor)
+        self.cursor.execute('delete from event where event_id = %s', (self.event_id,))
+        self.cnx.commit()
+        self.assertEqual(sql_check_rollups(self.cursor), {'perf_rollup_user_game': [], 'perf_rollup_game_period': []})
+
+    def test_history_page(self):
+        self.cursor.execute('insert into event (event_id, date, game_id, title, team_size) '
+                            'values (%s, CURDATE() - INTERVAL 1 DAY, 1, %s, 5)',
+                            (self.event_id, 'a test performance event'))
+        self.cursor.execute('insert into registration (user_id, event_id) values (%s, %s)',
+                            (self.user_ids[0], self.event_id))
+        pq.sql_perf_upsert([self.record(self.user_ids[0], 7)], self.cursor)
+        self.cnx.commit()
+
+        rows, start = sql_history_page(self.user_ids[0], None, None, self.cursor)
+        self.assertEqual([(row[0], row[4]) for row in rows], [(self.event_id, 7)])
+        self.assertIsNone(start)
+
+        rows, start = sql_history_page(self.user_ids[0], 1, (rows[0][1], rows[0][0]), self.cursor)      # after it
+        self.assertEqual((rows, start), ([], None))
+
+    def test_update_ratings(self):
+        self.cursor.execute('insert into event (event_id, date, game_id, title, team_size) '
+                            'values (%s, CURDATE(), 1, %s, 5)', (self.event_id, 'a test performance event'))
+        loser = self.record(self.user_ids[1], 2)
+        loser['win'] = 0
+        pq.sql_perf_upsert([self.record(self.user_ids[0], 1), loser], self.cursor)
+        sql_update_ratings([self.event_id], self.cursor)
+        self.cnx.commit()
+
+        self.cursor.execute('select user_id, rating_before, rating_after from rating_history where event_id = %s '
+                            'order by user_id', (self.event_id,))
+        (winner_id, winner_before, winner_after), (loser_id, loser_before, loser_after) = self.cursor.fetchall()
+        self.assertGreater(winner_after, winner_before)
+        self.assertAlmostEqual(winner_after - winner_before, loser_before - loser_after)
+        if winner_before == loser_before == RATING_START:       # first rated event of both test users
+            self.assertAlmostEqual(winner_after, RATING_START + 16)
+
+    def tearDown(self):
+        self.cursor.execute('delete from event where event_id = %s', (self.event_id,))
+        self.cursor.execute('delete from performance where event_id = %s', (self.event_id,))
+        self.cursor.execute('delete from registration where event_id = %s', (self.event_id,))
+        self.cursor.execute('delete from rating_history where event_id = %s', (self.event_id,))
+        self.cursor.execute('delete from rating where user_id in (%s, %s)', tuple(self.user_ids))
+        self.cnx.commit()
+        sql_rebuild_rollups(self.cursor, self.cnx)  # commit changes to database
+        self.cnx.close()
+        self.cursor.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
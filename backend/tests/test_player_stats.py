@@ -0,0 +1,58 @@
+import unittest
+from backend.lib.perf_rollups import RollupChanges
+from backend.lib.player_stats import StatsCache, stat_rows, format_stats
+
+
+class PlayerStatsTestCase(unittest.TestCase):
+    def test_stat_rows(self):
+        rows = [(1, 'alice', 2, 30, 10, 1, 60, 2),      # (key, name, games, kills, deaths, wins, minutes, margin)
+                (2, 'bob', 1, 3, 0, 1, 20, 2)]
+        stats = stat_rows(rows)
+        self.assertEqual([name for name, _ in stats], ['alice', 'bob'])     # best K/D first
+        alice = stats[0][1]
+        self.assertEqual((alice['games'], alice['kills'], alice['deaths']), (2, 30, 10))
+        self.assertAlmostEqual(alice['kd'], 3.0)
+        self.assertAlmostEqual(alice['win_rate'], 0.5)
+        self.assertAlmostEqual(alice['avg_margin'], 1.0)
+        self.assertAlmostEqual(alice['kills_per_minute'], 0.5)
+        self.assertAlmostEqual(stats[1][1]['kd'], 3.0)      # never died: K/D is kills
+        self.assertAlmostEqual(stats[1][1]['deaths_per_minute'], 0.0)
+        self.assertEqual(stat_rows([]), [])
+
+    def test_format_stats(self):
+        line = format_stats('alice', stat_rows([(1, 'alice', 1, 10, 5, 1, 30, 6)])[0][1])
+        self.assertEqual(line, 'alice: 1 games, K/D 2.00 (10/5), win rate 100%, avg margin +6.0, 0.33 kills/min, '
+                               '0.17 deaths/min')
+
+    def test_cache(self):
+        cache = StatsCache()
+        cache.put(('game', 1), ['game stats'], cache.version)
+        cache.put(('user', 7), ['user stats'], cache.version)
+        self.assertEqual(cache.get(('game', 1)), ['game stats'])
+        cache.invalidate([7], [])
+        self.assertIsNone(cache.get(('user', 7)))
+        self.assertEqual(cache.get(('game', 1)), ['game stats'])
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        cache.invalidate_all()
+        self.assertEqual(cache.entries, {})
+
+        version = cache.version
+        cache.invalidate([], [1])       # a write landed while stats were computed
+        cache.put(('game', 1), ['stale stats'], version)
+        self.assertIsNone(cache.get(('game', 1)))
+
+    def test_event_deleted(self):
+        changes = RollupChanges()
+        cache = StatsCache(changes)
+        cache.put(('game', 1), ['game stats'], cache.version)
+        changes.bump()      # an event was deleted
+        self.assertIsNone(cache.get(('game', 1)))
+
+        version = cache.version
+        changes.bump()      # deleted while stats were computed
+        cache.put(('game', 1), ['stale stats'], version)
+        self.assertIsNone(cache.get(('game', 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
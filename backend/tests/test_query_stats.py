@@ -0,0 +1,62 @@
+import contextvars
+import unittest
+from backend.lib.query_stats import QueryStats, InstrumentedCursor, current_command, normalize, format_query_stats
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, operation, params=None, multi=False):
+        self.statements.append((operation, params))
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class QueryStatsTestCase(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("select * from user where display_name = 'a''b' and user_id = 12"),
+                         normalize('select *  from user\nwhere display_name = "x" and user_id = 3'))
+        self.assertEqual(normalize('select * from event where event_id in (%s, %s, %s)'),
+                         normalize('select * from event where event_id in (%s)'))
+        self.assertEqual(normalize('insert into rating (a, b) values (%s, %s), (%s, %s)'),
+                         'insert into rating (a, b) values (...)')
+        self.assertNotEqual(normalize('select * from user'), normalize('select * from game'))
+
+    def test_percentiles(self):
+        stats = QueryStats(slow_ms=1000)
+        for i in range(1, 101):
+            stats.record('select * from user where user_id = %s', i / 1000)
+        stats.record('select 1', 0.5)
+
+        (statement, count, total, p50, p95, p99), (other, *_) = stats.top(2)
+        self.assertEqual((statement, count), ('select * from user where user_id = %s', 100))
+        self.assertAlmostEqual(total, 5050)
+        self.assertAlmostEqual(p50, 50.5)
+        self.assertAlmostEqual(p95, 95.05)
+        self.assertAlmostEqual(p99, 99.01)
+        self.assertEqual(other, 'select ?')
+        self.assertEqual(stats.slow_queries(), [])
+
+    def test_slow_log(self):
+        stats = QueryStats(slow_ms=10, slow_log_size=2)
+        cursor = InstrumentedCursor(FakeCursor(), stats)
+
+        def run():
+            current_command.set('history')
+            stats.record('select * from event', 0.02)
+            cursor.execute('select * from game where game_id = %s', (1,))
+        contextvars.copy_context().run(run)
+        stats.record('select * from performance', 0.05)
+        stats.record('select * from rating', 0.001)
+
+        self.assertEqual([(command, statement) for _, command, statement, _ in stats.slow_queries()],
+                         [('history', 'select * from event'), (None, 'select * from performance')])
+        self.assertEqual(cursor.fetchall(), [(1,)])
+        self.assertEqual(cursor.cursor.statements, [('select * from game where game_id = %s', (1,))])
+        self.assertEqual(len(format_query_stats(stats, 10)), 1 + 4 + 1 + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from backend.lib.ratings import event_rounds, replay_ratings, RATING_START
+
+
+class RatingsTestCase(unittest.TestCase):
+    def test_rounds(self):
+        events = np.array([0, 0, 1, 1, 2, 2, 3])
+        players = np.array([0, 1, 2, 3, 1, 2, 4])
+        self.assertEqual(event_rounds(events, players).tolist(), [0, 0, 0, 0, 1, 1, 0])
+
+    def test_replay(self):
+        events = np.array([0, 0, 1, 1])
+        players = np.array([0, 1, 0, 1])
+        wins = np.array([1, 0, 1, 0])
+        ratings = np.full(2, RATING_START)
+        before, after = replay_ratings(events, players, wins, ratings)
+        self.assertAlmostEqual(after[0] - before[0], 16.0)      # even sides: half of K
+        self.assertAlmostEqual(after[1], RATING_START - 16.0)
+        self.assertEqual(before[2:].tolist(), after[:2].tolist())
+        self.assertLess(after[2] - before[2], 16.0)     # the favourite gains less
+        self.assertAlmostEqual(ratings.sum(), 2 * RATING_START)
+
+    def test_matches_one_by_one(self):
+        rng = np.random.RandomState(0)
+        events, players, wins = [], [], []
+        for event in range(200):
+            lobby = rng.choice(30, 6, replace=False)
+            events.extend([event] * 6)
+            players.extend(lobby.tolist())
+            wins.extend([1, 1, 1, 0, 0, 0] if event % 10 else [1] * 6)     # one sided events are not rated
+        events, players, wins = np.array(events), np.array(players), np.array(wins)
+
+        together = np.full(30, RATING_START)
+        replay_ratings(events, players, wins, together)
+        one_by_one = np.full(30, RATING_START)
+        for event in range(200):
+            rows = events == event
+            replay_ratings(events[rows], players[rows], wins[rows], one_by_one)
+        np.testing.assert_allclose(together, one_by_one)
+
+
+if __name__ == '__main__':
+    unittest.main()
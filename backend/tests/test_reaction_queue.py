@@ -0,0 +1,55 @@
+import unittest
+import asyncio
+from backend.lib.reaction_queue import ReactionQueue
+
+
+class ReactionQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.handled = []
+        self.running = 0
+        self.most_running = 0
+
+    async def handler(self, payload):
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        await asyncio.sleep(0.01)
+        self.handled.append(payload)
+        self.running -= 1
+
+    async def drain(self, reactions, keys):
+        for key in keys:
+            await reactions.put(key, self.handler, key)
+        await reactions.queue.join()
+        for worker in reactions.workers:
+            worker.cancel()
+
+    def test_duplicates_dropped(self):
+        reactions = ReactionQueue(workers=2, maxsize=4)
+        asyncio.run(self.drain(reactions, [(1, 1, '☑'), (1, 1, '☑'), (2, 1, '☑')]))
+        self.assertEqual(sorted(self.handled), [(1, 1, '☑'), (2, 1, '☑')])
+        self.assertEqual(reactions.stats()['duplicates'], 1)
+
+    def test_workers_bounded(self):
+        reactions = ReactionQueue(workers=3, maxsize=2)
+        asyncio.run(self.drain(reactions, [(user, 1, '☑') for user in range(20)]))
+        self.assertEqual(len(self.handled), 20)
+        self.assertEqual(self.most_running, 3)      # never more handlers than workers
+        self.assertLessEqual(reactions.stats()['peak_depth'], 2)        # never more waiting than the queue holds
+        self.assertEqual(reactions.stats()['in_flight'], 0)
+
+    def test_waiting_counted(self):
+        async def burst(reactions):     # every gateway event is its own task, so puts happen at once
+            await asyncio.gather(*(reactions.put((user, 1, '☑'), self.handler, user) for user in range(10)))
+            await reactions.queue.join()
+            for worker in reactions.workers:
+                worker.cancel()
+
+        reactions = ReactionQueue(workers=1, maxsize=2)
+        asyncio.run(burst(reactions))
+        self.assertEqual(len(self.handled), 10)
+        self.assertEqual(reactions.stats()['peak_waiting'], 8)      # two queued, the rest waiting for room
+        self.assertEqual(reactions.stats()['waiting'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import asyncio
+from unittest import mock
+from datetime import date, datetime, time, timedelta
+from backend.lib.channel_sender import ChannelSender
+from backend.lib.reminders import ReminderScheduler, parse_offsets, MENTION
+
+
+class FlakyChannel:
+    def __init__(self, failures):
+        self.id = 0
+        self.failures = failures        # indexes of the sends that fail
+        self.sends = 0
+        self.sent = []
+
+    async def send(self, content):
+        self.sends += 1
+        if self.sends - 1 in self.failures:
+            raise ConnectionError
+        self.sent.append(content)
+
+
+class FakeBot:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+    async def wait_until_ready(self):
+        pass
+
+    def is_closed(self):
+        return False
+
+
+class FakeUnitOfWork:
+    def __init__(self, db):
+        self.db = db
+        self.cursor = self.cnx = None
+
+    async def __aenter__(self):
+        self.db.attempts += 1
+        if self.db.attempts <= self.db.failures:
+            raise ConnectionError
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def run(self, func, *args):
+        return []
+
+
+class DownDatabase:
+    def __init__(self, failures):
+        self.failures = failures        # units of work that fail to open before the database is up
+        self.attempts = 0
+
+    def unit_of_work(self):
+        return FakeUnitOfWork(self)
+
+
+class ReminderSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = ReminderScheduler(None, None, 0, [24 * 60, 60], time(20, 0))
+        self.start = datetime(2020, 5, 1, 20, 0)
+
+    def test_parse_offsets(self):
+        self.assertEqual(parse_offsets('1h, 24h'), [1440, 60])
+        self.assertEqual(parse_offsets('2d,30m,48h'), [2880, 30])
+        self.assertRaises(ValueError, parse_offsets, '1w')
+        self.assertRaises(ValueError, parse_offsets, 'h')
+
+    def test_due_at(self):
+        self.assertEqual(self.scheduler.due_at(date(2020, 5, 1), 24 * 60), datetime(2020, 4, 30, 20, 0))
+        self.assertEqual(self.scheduler.due_at(date(2020, 5, 1), 60), datetime(2020, 5, 1, 19, 0))
+
+    def test_pop_due_in_order(self):
+        for event_id, days in ((1, 3), (2, 1), (3, 2)):
+            for offset in self.scheduler.offsets:
+                event_date = (self.start + timedelta(days)).date()
+                self.scheduler.push(event_id, offset, self.scheduler.due_at(event_date, offset))
+
+        self.assertEqual(self.scheduler.next_due(), datetime(2020, 5, 1, 20, 0))
+        self.assertEqual(self.scheduler.pop_due(self.start), [(2, 1440)])
+        self.assertEqual(self.scheduler.pop_due(self.start + timedelta(days=2)),
+                         [(2, 60), (3, 1440), (3, 60), (1, 1440)])
+        self.assertEqual(self.scheduler.pop_due(self.start + timedelta(days=2)), [])    # nothing sent twice
+
+    def test_cancel(self):
+        self.scheduler.push(1, 60, self.start)
+        self.scheduler.push(2, 60, self.start + timedelta(hours=1))
+        self.scheduler.cancel(1)
+        self.assertNotIn(1, self.scheduler.known)
+        self.assertEqual(self.scheduler.next_due(), self.start + timedelta(hours=1))
+        self.assertEqual(self.scheduler.pop_due(self.start + timedelta(days=1)), [(2, 60)])
+
+    def test_reschedule(self):
+        self.scheduler.push(1, 60, self.start)
+        self.scheduler.push(1, 60, self.start + timedelta(minutes=5))     # e.g. retry after a failed send
+        self.assertEqual(self.scheduler.pop_due(self.start), [])
+        self.assertEqual(self.scheduler.pop_due(self.start + timedelta(minutes=5)), [(1, 60)])
+
+    def test_partial_send_retried(self):
+        channel = FlakyChannel({1})     # the second message fails
+        scheduler = ReminderScheduler(FakeBot(channel), None, 0, [60], sender=ChannelSender(100, 1.0, 100, 1.0))
+        rows = [(10 ** 17 + user, 'CSGO', '<@1> scrim', 'May 01 2020', date(2020, 5, 1)) for user in range(200)]
+        reminded = set()
+        with self.assertRaises(ConnectionError):
+            asyncio.run(scheduler.send(rows, reminded))
+        first = [int(user_id) for user_id in MENTION.findall(channel.sent[0])]
+        self.assertEqual(reminded, set(first) - {1})        # a mention in the title is not a player
+
+        asyncio.run(scheduler.send([row for row in rows if row[0] not in reminded], reminded))
+        mentioned = [int(user_id) for text in channel.sent for user_id in MENTION.findall(text) if user_id != '1']
+        self.assertEqual(sorted(mentioned), [row[0] for row in rows])       # everyone once, nobody twice
+
+    def test_load_retried(self):
+        db = DownDatabase(2)
+        scheduler = ReminderScheduler(FakeBot(None), db, 0, [60])
+
+        async def start():
+            task = asyncio.ensure_future(scheduler.run())
+            while db.attempts < 3:
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.01)
+            self.assertFalse(task.done())       # the failed loads did not end the scheduler
+            task.cancel()
+        with mock.patch('backend.lib.reminders.RETRY_DELAY', 0), mock.patch('traceback.print_exc'), \
+                mock.patch('builtins.print'):
+            asyncio.run(start())
+        self.assertEqual(db.attempts, 3)        # two failed loads, then one that worked
+
+
+if __name__ == '__main__':
+    unittest.main()
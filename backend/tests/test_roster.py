@@ -0,0 +1,64 @@
+import unittest
+from backend.lib.roster import Roster
+
+
+class RosterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.roster = Roster(2, 3)
+
+    def test_add_alternates_teams(self):
+        placements = [self.roster.add(player) for player in 'abcd']
+        self.assertEqual(placements, [(0, 0), (1, 0), (0, 1), (1, 1)])
+        self.assertEqual(self.roster.players(0), ['a', 'c'])
+        self.assertEqual(self.roster.players(1), ['b', 'd'])
+
+    def test_add_full(self):
+        for player in 'abcdef':
+            self.roster.add(player)
+        self.assertIsNone(self.roster.next_slot())
+        self.assertIsNone(self.roster.add('g'))
+        self.assertNotIn('g', self.roster)
+
+    def test_remove_frees_slot(self):
+        for player in 'abcd':
+            self.roster.add(player)
+        self.assertEqual(self.roster.remove('a'), (0, 0))
+        self.assertIsNone(self.roster.remove('a'))
+        self.assertNotIn('a', self.roster)
+        self.assertEqual((self.roster.count(0), self.roster.count(1), len(self.roster)), (1, 2, 3))
+        self.assertEqual(self.roster.add('e'), (0, 0))     # the freed slot is reused
+
+    def test_place(self):
+        self.assertTrue(self.roster.place('a', 1, 2))
+        self.assertFalse(self.roster.place('b', 1, 2))      # taken
+        self.assertFalse(self.roster.place('b', 2, 0))      # no such team
+        self.assertFalse(self.roster.place('b', 0, 3))      # no such position
+        self.assertEqual(self.roster.team_of('a'), (1, 2))
+        self.assertEqual(self.roster.add('b'), (0, 0))
+        self.assertEqual(self.roster.add('c'), (0, 1))
+
+        self.assertTrue(self.roster.place('a', 0, 2))       # moves the player
+        self.assertEqual((self.roster.count(0), self.roster.count(1)), (3, 0))
+        self.assertEqual(self.roster.add('d'), (1, 2))     # the slot it left is reused first
+
+    def test_arrange(self):
+        for player in 'abcd':
+            self.roster.add(player)
+        self.roster.arrange([['d', 'c', 'b'], ['a']])
+        self.assertEqual(self.roster.players(0), ['d', 'c', 'b'])
+        self.assertEqual(self.roster.players(1), ['a'])
+        self.assertEqual(sorted(self.roster.assignments()), [(0, 0, 'd'), (0, 1, 'c'), (0, 2, 'b'), (1, 0, 'a')])
+        self.assertEqual(self.roster.add('e'), (1, 1))
+
+    def test_many_teams(self):
+        roster = Roster(4, 250)
+        for player in range(1000):
+            roster.add(player)
+        self.assertEqual([roster.count(team) for team in range(4)], [250] * 4)
+        self.assertIsNone(roster.next_slot())
+        roster.remove(999)
+        self.assertEqual(roster.next_slot(), (3, 249))
+
+
+if __name__ == '__main__':
+    unittest.main()
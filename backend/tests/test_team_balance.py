@@ -0,0 +1,37 @@
+import unittest
+from itertools import combinations
+from backend.lib.team_balance import balance_teams, exact_split, differencing_split
+
+
+class TeamBalanceTestCase(unittest.TestCase):
+    def difference(self, skills, teams):
+        return abs(sum(skills[player] for player in teams[0]) - sum(skills[player] for player in teams[1]))
+
+    def assertSplit(self, skills, teams):
+        self.assertIn(len(teams[0]) - len(teams[1]), (0, 1))
+        self.assertEqual(sorted(teams[0] + teams[1]), sorted(skills))
+
+    def test_exact(self):
+        skills = {'a': 100, 'b': 90, 'c': 60, 'd': 45, 'e': 30, 'f': 5, 'g': 1}
+        teams = balance_teams(skills)
+        self.assertSplit(skills, teams)
+        best = min(abs(2 * sum(skills[player] for player in team) - sum(skills.values()))
+                   for team in combinations(skills, len(skills) // 2))
+        self.assertEqual(self.difference(skills, teams), best)
+
+    def test_differencing(self):
+        skills = {player: (player * 37) % 101 for player in range(301)}
+        players = sorted(skills, key=lambda player: skills[player], reverse=True)
+        teams = differencing_split(players, skills)
+        self.assertSplit(skills, teams)
+        self.assertLessEqual(self.difference(skills, teams), max(skills.values()))
+
+    def test_small(self):
+        self.assertEqual(balance_teams({}), ([], []))
+        self.assertEqual(balance_teams({'a': 5}), (['a'], []))
+        self.assertEqual(exact_split(['a', 'b'], {'a': 5, 'b': 3}), (['a'], ['b']))
+        self.assertEqual(differencing_split([], {}), ([], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
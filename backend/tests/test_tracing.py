@@ -0,0 +1,104 @@
+import asyncio
+import contextvars
+import json
+import os
+import tempfile
+import unittest
+from backend.lib.reaction_queue import ReactionQueue
+from backend.lib.tracing import Tracer, span, mark_dispatched, trace_requests, summarize, format_summary, \
+    current_trace
+
+
+class Route:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+
+
+class FakeHTTP:
+    async def request(self, route, **kwargs):
+        await asyncio.sleep(0.001)
+        return route.method
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'traces.jsonl')
+        self.tracer = Tracer(self.path, sample_rate=1.0)
+
+    def tearDown(self):
+        self.tracer.close()
+
+    def read(self):
+        with open(self.path) as traces:
+            return [json.loads(line) for line in traces]
+
+    def test_spans_exported(self):
+        http = FakeHTTP()
+        trace_requests(http)
+
+        async def command():
+            trace, token = self.tracer.start('create_event')
+            mark_dispatched()
+            with span('db', 'sql_create_event'):
+                await asyncio.sleep(0.001)
+            await http.request(Route('POST', '/channels/{channel_id}/messages'))
+            await http.request(Route('GET', '/users/@me'))
+            self.tracer.finish(trace, token)
+            trace.record('discord', 'edit', 0.0, 1.0)       # scheduled work that outlived the command
+            self.assertIsNone(current_trace.get())
+        asyncio.run(command())
+
+        record, = self.read()
+        self.assertEqual(record['name'], 'create_event')
+        self.assertEqual([(item['kind'], item['name']) for item in record['spans']],
+                         [('dispatch', 'dispatch'), ('db', 'sql_create_event'), ('discord', 'send'),
+                          ('discord', 'GET /users/@me')])
+        self.assertGreaterEqual(record['duration_ms'], sum(item['duration_ms'] for item in record['spans']))
+        self.assertEqual(list(self.tracer.traces), [record])
+
+    def test_sampling(self):
+        samples = iter([0.5, 0.05, 0.2])
+        tracer = Tracer(None, sample_rate=0.1, sample=lambda: next(samples))
+        traces = [contextvars.copy_context().run(tracer.start, 'history')[0] for _ in range(3)]
+        self.assertEqual([trace is not None for trace in traces], [False, True, False])
+        with span('db', 'sql_history_page'):        # untraced work records nothing
+            pass
+
+    def test_reaction_traced(self):
+        async def handle_reaction_add(payload):
+            with span('db', 'sql_create_registration'):
+                await asyncio.sleep(0.001)
+
+        async def drain():
+            reactions = ReactionQueue(workers=1, maxsize=4, tracer=self.tracer)
+            for user in range(3):
+                await reactions.put((user, 1, '☑'), handle_reaction_add, user)
+            await reactions.queue.join()
+            for worker in reactions.workers:
+                worker.cancel()
+        asyncio.run(drain())
+
+        records = self.read()
+        self.assertEqual([record['name'] for record in records], ['handle_reaction_add'] * 3)
+        self.assertEqual([item['kind'] for item in records[2]['spans']], ['queue', 'db'])
+
+    def test_summarize(self):
+        records = [{'name': 'history', 'duration_ms': duration,
+                    'spans': [{'kind': 'db', 'name': 'sql_history_page', 'duration_ms': duration / 2},
+                              {'kind': 'discord', 'name': 'edit', 'duration_ms': duration / 4}]}
+                   for duration in range(1, 101)]
+        records.append({'name': 'ratings', 'duration_ms': 5.0, 'spans': []})
+
+        (name, count, p50, p99, kinds), (other, *_) = summarize(records)
+        self.assertEqual((name, count, other), ('history', 100, 'ratings'))
+        self.assertAlmostEqual(p50, 50.5)
+        self.assertAlmostEqual(p99, 99.01)
+        self.assertAlmostEqual(kinds['db'][1], 99.01 / 2)
+        self.assertEqual(kinds['queue'], (0.0, 0.0))
+        self.assertEqual(len(format_summary(summarize(records))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import mysql.connector
 import configparser
 from backend.lib import user_queries as uq
-from backend.lib.helper_commands import AdminPermissionError
+from backend.lib.helper_commands import AdminPermissionError, entities, admins
 
 
 class UserTestCase(unittest.TestCase):
@@ -107,6 +107,8 @@ class UserTestCase(unittest.TestCase):
     def tearDown(self):
         self.cursor.execute('delete from user where user_id = %s', (self.new_id,))  # execute deletion query
         self.cnx.commit()  # commit changes to database
+        entities.clear()    # rows were deleted behind the caches' back
+        admins.clear()
         self.cnx.close()
         self.cursor.close()
 
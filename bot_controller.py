@@ -1,15 +1,20 @@
 import configparser
 import discord
-import asyncio
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta
-import mysql.connector
+from datetime import datetime
+from backend.lib.database import Database
 from backend.lib.user_queries import UserQueries
 from backend.lib.game_queries import GameQueries
 from backend.lib.event_queries import EventQueries
 from backend.lib.helper_commands import HelperCommands
 from backend.lib.performance_queries import PerformanceQueries
 from backend.lib.event_actions import EventActions
+from backend.lib.roster_cache import RosterCache
+from backend.lib.reaction_queue import ReactionQueue
+from backend.lib.reminders import ReminderScheduler, parse_offsets
+from backend.lib.migrations import migrate
+from backend.lib.query_stats import current_command
+from backend.lib.tracing import Tracer, trace_requests, mark_dispatched
 
 
 def main():
@@ -20,19 +25,29 @@ def main():
     event_channel_id = int(config['Discord']['event_channel_id'])     # id of the event channel
     reminder_channel_id = int(config['Discord']['reminder_channel_id'])     # id of the reminder channel
     command_prefix = config['Discord']['prefix']
+    edit_delay = config['Discord'].getfloat('edit_delay', fallback=1.0)     # seconds to batch event message edits
+    reaction_workers = config['Discord'].getint('reaction_workers', fallback=4)     # reactions handled at once
+    reaction_queue_size = config['Discord'].getint('reaction_queue_size', fallback=256)     # reactions left waiting
+    reminder_offsets = parse_offsets(config['Discord'].get('reminder_offsets', fallback='24h'))    # before events
+    event_time = datetime.strptime(config['Discord'].get('event_time', fallback='00:00'), '%H:%M').time()
+    trace_sample_rate = config['Discord'].getfloat('trace_sample_rate', fallback=0.1)     # share of commands traced
+    trace_file = config['Discord'].get('trace_file', fallback='traces.jsonl')     # file traces are appended to
 
     username = config['Database']['username']       # get details for signing in to database
     password = config['Database']['password']
     host = config['Database']['host']
     database = config['Database']['database']
+    pool_size = config['Database'].getint('pool_size', fallback=5)     # number of pooled database connections
+    slow_query_ms = config['Database'].getfloat('slow_query_ms', fallback=100.0)      # statements logged as slow
 
-    cnx = mysql.connector.connect(user=username,
-                                  password=password,
-                                  host=host,
-                                  database=database)        # connect to the database
-    cursor = cnx.cursor()       # create cursor object for executing queries
+    db = Database(username, password, host, database, pool_size, slow_query_ms)        # connect to the database
 
     client = commands.Bot(command_prefix=command_prefix, case_insensitive=True)       # create the bot client
+    tracer = Tracer(trace_file, trace_sample_rate)
+    trace_requests(client.http)     # Discord REST calls become spans of the traced command
+
+    for name in client.loop.run_until_complete(migrate(db)):      # bring the schema up to date before any command
+        print('Applied migration ' + name)
 
     # BOT EVENTS #
 
@@ -45,38 +60,47 @@ def main():
         await client.change_presence(activity=discord.Game(name='Event Management'))
         print('We have logged in as {0.user}'.format(client))
 
-    async def sendreminders():
-        remchan = client.get_channel(reminder_channel_id)
-        command = 'select registration.user_id, game.name, event.title, DATE_FORMAT(event.date,"%M %d %Y")' \
-                  ' from event inner join game on event.game_id = game.game_id'\
-                  ' inner join registration on registration.event_id = event.event_id '\
-                  ' where event.date > CURDATE() and event.date <= DATE_ADD(CURDATE(),INTERVAL 1 DAY)'
-        cursor.execute(command)
-        for line in cursor.fetchall():
-            message = "Reminding <@%d> you are registered to play %s in '%s' on %s " % (line[0], line[1], line[2], line[3])
-            await remchan.send(message)
+    @client.event
+    async def on_message(message):
+        """
+        on_message() is called for every message the bot can see; commands in it are run, a sample of them traced
+        :param message: message object
+        :return: void
+        """
+        if message.author.bot:
+            return
+        trace, token = tracer.start(None)
+        try:
+            ctx = await client.get_context(message)
+            if trace is not None and ctx.command is not None:
+                trace.name = ctx.command.qualified_name
+            await client.invoke(ctx)
+        finally:
+            tracer.finish(trace, token)
 
-    async def remindertask():
-        hour = 23
-        minute = 58
-        await client.wait_until_ready()
-        while not client.is_closed():
-            now = datetime.now()
-            future = datetime(now.year, now.month, now.day, hour, minute)
-            if now.hour >= hour and now.minute > minute:
-                future += timedelta(days=1)
-            await asyncio.sleep((future - now).seconds)
-            await sendreminders()
+    @client.before_invoke
+    async def name_command(ctx):
+        """
+        name_command() is called before every command so the statements it runs are attributed to it in query stats,
+        and ends the dispatch span of its trace
+        :param ctx: context of the command
+        :return: void
+        """
+        current_command.set(ctx.command.qualified_name)
+        mark_dispatched()
 
-    client.loop.create_task(remindertask())
+    rosters = RosterCache(client, db, event_channel_id, edit_delay)     # in-memory event rosters shared by the event cogs
+    reactions = ReactionQueue(reaction_workers, reaction_queue_size, tracer)
+    reminders = ReminderScheduler(client, db, reminder_channel_id, reminder_offsets, event_time)
+    client.loop.create_task(reminders.run())
 
     # RUN THE BOT #
-    client.add_cog(HelperCommands(client, cursor, cnx))
-    client.add_cog(UserQueries(client, cursor, cnx))
-    client.add_cog(GameQueries(client, cursor, cnx))
-    client.add_cog(EventQueries(client, cursor, cnx, event_channel_id))
-    client.add_cog(PerformanceQueries(client, cursor, cnx))
-    client.add_cog(EventActions(client, cursor, cnx, event_channel_id))
+    client.add_cog(HelperCommands(client, db, tracer))
+    client.add_cog(UserQueries(client, db))
+    client.add_cog(GameQueries(client, db))
+    client.add_cog(EventQueries(client, db, event_channel_id, rosters, reminders))
+    client.add_cog(PerformanceQueries(client, db))
+    client.add_cog(EventActions(client, db, event_channel_id, rosters, reactions, reminders))
     client.run(token)
 
 